@@ -0,0 +1,144 @@
+"""
+מטמון ניתוחים לפי תוכן הפוסט
+LRU בזיכרון + טבלה קבועה ב-SQLite, לפי (hash של הטקסט, טביעת אצבע של הכללים)
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+# טביעת האצבע שהטבלה הקבועה נוקתה לפיה לאחרונה (בטבלת bot_state)
+FINGERPRINT_STATE_KEY = "analysis_cache_fingerprint"
+
+
+def text_hash(text: str) -> str:
+    """hash של טקסט הפוסט (sha256)"""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def rules_fingerprint(*rule_sets) -> str:
+    """
+    טביעת אצבע של סט הכללים - כל שינוי בהם מייצר מפתח מטמון חדש
+
+    Example:
+        rules_fingerprint(config.CANDIDATE_KEYWORDS, config.OPEN_POSITIONS)
+    """
+    payload = json.dumps(rule_sets, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class AnalysisCache:
+    """
+    מטמון דו-שכבתי לתוצאות ניתוח
+
+    שכבה 1: LRU בזיכרון התהליך
+    שכבה 2 (אופציונלי): טבלת analysis_cache במסד הנתונים
+
+    תוצאות חדשות לא נכתבות למסד מיד - הן נצברות ונכתבות ב-flush(),
+    שהסורק מריץ בתוך ה-unit_of_work של הקבוצה (אותה טרנזקציה, אותו fsync).
+
+    כששינוי ב-config מחליף את טביעת האצבע, השורות הישנות נמחקות פעם אחת
+    (טביעת האצבע האחרונה נשמרת ב-bot_state), כך שמטמון שעדיין תקף לא נסרק בכל אתחול.
+    """
+
+    def __init__(self, fingerprint: str, db=None, max_entries: int = 10000):
+        self.fingerprint = fingerprint
+        self.db = db
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._pending: Dict[str, str] = {}
+        self._pending_lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+        if self.db is not None and self.db.get_state(FINGERPRINT_STATE_KEY) != fingerprint:
+            with self.db.transaction():
+                self.db.prune_analysis_cache(fingerprint)
+                self.db.set_state(FINGERPRINT_STATE_KEY, fingerprint)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """חיפוש תוצאה לפי hash הטקסט (None אם לא קיים)"""
+        payload = self._memory.get(key)
+        if payload is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return json.loads(payload)
+
+        if self.db is not None:
+            payload = self.db.get_cached_analysis(key, self.fingerprint)
+            if payload is not None:
+                self._remember(key, payload)
+                self.persistent_hits += 1
+                return json.loads(payload)
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, result: Dict):
+        """שמירת תוצאה בזיכרון ובתור הכתיבה למסד (נכתב ב-flush)"""
+        payload = json.dumps(result, ensure_ascii=False)
+        self._remember(key, payload)
+        if self.db is not None:
+            with self._pending_lock:
+                self._pending[key] = payload
+
+    @property
+    def pending(self) -> int:
+        """מספר התוצאות שעוד לא נכתבו למסד"""
+        return len(self._pending)
+
+    def flush(self, db=None) -> int:
+        """
+        כתיבת התוצאות שנצברו לטבלה הקבועה
+
+        Args:
+            db: המנהל שדרכו כותבים (למשל זה של ה-unit_of_work) - ברירת מחדל self.db
+
+        Returns:
+            int: מספר התוצאות שנכתבו
+        """
+        db = db or self.db
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if db is None or not pending:
+            return 0
+
+        with db.transaction():
+            try:
+                db.put_cached_analyses(self.fingerprint, pending)
+            except Exception:
+                self._requeue(pending)
+                raise
+            # אם הטרנזקציה החיצונית (ה-unit_of_work) תתבטל - חזרה לתור
+            db.on_rollback(lambda: self._requeue(pending))
+        return len(pending)
+
+    def _requeue(self, pending: Dict[str, str]):
+        """החזרת תוצאות שלא נשמרו לתור (תוצאות שנוספו בינתיים חדשות יותר)"""
+        with self._pending_lock:
+            self._pending = {**pending, **self._pending}
+
+    def _remember(self, key: str, payload: str):
+        """הכנסה ל-LRU בזיכרון עם פינוי הישן ביותר"""
+        self._memory[key] = payload
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """מוני פגיעות/החטאות"""
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        hits = self.memory_hits + self.persistent_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups * 100, 2) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "pending_writes": len(self._pending),
+        }
@@ -0,0 +1,224 @@
+"""
+גישה למסד הנתונים מתוך asyncio בלי לחסום את הלולאה
+כל הכתיבות עוברות ב-thread כותב יחיד (תור), והקריאות רצות על חיבור נפרד
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+from database import DatabaseManager, get_db
+from statsAggregator import StatsAggregator
+
+
+T = TypeVar("T")
+
+
+class AsyncDatabase:
+    """
+    חזית אסינכרונית ל-DatabaseManager
+
+    - כתיבות: executor עם thread יחיד - התור שלו שומר על סדר הכתיבות,
+      ורק ה-thread הזה כותב דרך החיבור של מנהל המסד המשותף.
+    - קריאות: DatabaseManager נוסף עם חיבור משלו ו-thread משלו; ב-WAL
+      קריאה לא ממתינה ל-commit של הכותב.
+
+    מסנן ה-post_ids (SeenFilter) משותף לשניהם - הכותב מעדכן אותו בכל הכנסה.
+    הוא נטען ב-refresh_seen_filter() (הסורק - בתחילת כל סשן); עד אז הבדיקות
+    הולכות ישר למסד.
+
+    שגיאות נצברות ב-StatsAggregator ונכתבות כשעוברים את סף הזמן/הכמות,
+    יחד עם כל unit_of_work, וב-close(). המונים (פוסטים, מועמדים, תגובות,
+    שגיאות) נספרים ב-hourly_rollups מהשורות עצמן.
+
+    Example:
+        adb = AsyncDatabase()
+        unprocessed = await adb.filter_unprocessed(post_ids)
+        await adb.log_error("scan_error", "timeout")
+    """
+
+    def __init__(self, db: DatabaseManager = None):
+        self.db = db or get_db()
+        self.reader = DatabaseManager(self.db.db_path, self.db.settings, with_seen_filter=False)
+        self.reader.seen_filter = self.db.seen_filter
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-reader")
+        self.stats = StatsAggregator(self.db)
+
+    async def _write(self, work: Callable[[DatabaseManager], T]) -> T:
+        """הרצת פעולת כתיבה ב-thread הכותב"""
+        def run():
+            try:
+                return work(self.db)
+            finally:
+                # המסנן נבנה מחדש כשהוא מתמלא - הקורא צריך את המופע החדש
+                self.reader.seen_filter = self.db.seen_filter
+        return await asyncio.get_running_loop().run_in_executor(self._writer, run)
+
+    async def _read(self, work: Callable[[DatabaseManager], T]) -> T:
+        """הרצת שאילתת קריאה על חיבור הקריאה"""
+        return await asyncio.get_running_loop().run_in_executor(self._reader, work, self.reader)
+
+    async def refresh_seen_filter(self):
+        """טעינת מסנן ה-post_ids מחדש מהמסד (כולל פוסטים שנכתבו בתהליך אחר)"""
+        await self._write(lambda db: db.refresh_seen_filter())
+
+    # ---------- קריאות ----------
+
+    async def filter_unprocessed(self, post_ids: List[str]) -> set:
+        return await self._read(lambda db: db.filter_unprocessed(post_ids))
+
+    async def is_post_processed(self, post_id: str) -> bool:
+        return await self._read(lambda db: db.is_post_processed(post_id))
+
+    async def has_responded_to_post(self, post_id: str) -> bool:
+        return await self._read(lambda db: db.has_responded_to_post(post_id))
+
+    async def get_daily_response_count(self, date: str = None) -> int:
+        return await self._read(lambda db: db.get_daily_response_count(date))
+
+    async def get_statistics(self, days: int = 7, **options) -> Dict:
+        return await self._read(lambda db: db.get_statistics(days, **options))
+
+    # ---------- כתיבות ----------
+
+    async def unit_of_work(self, work: Callable[[DatabaseManager], T]) -> T:
+        """
+        כמה כתיבות בטרנזקציה אחת, ב-thread הכותב
+
+        אם הטרנזקציה נכשלת, השגיאות שנכתבו בה חוזרות למצבר.
+
+        Example:
+            await adb.unit_of_work(lambda db: db.add_scanned_posts(posts))
+        """
+        def run(db: DatabaseManager) -> T:
+            with db.unit_of_work():
+                result = work(db)
+                # שגיאות שנצברו נכתבות באותה טרנזקציה, בלי fsync נוסף
+                self.stats.flush(db)
+                return result
+        return await self._write(run)
+
+    async def _flush_if_due(self):
+        if self.stats.should_flush():
+            await self._write(self.stats.flush)
+
+    async def add_scanned_posts(self, posts: List[Dict]) -> Optional[int]:
+        return await self._write(lambda db: db.add_scanned_posts(posts))
+
+    async def add_response(self, response_data: Dict) -> bool:
+        return await self._write(lambda db: db.add_response(response_data))
+
+    async def reserve_response(self, post_id: str) -> Tuple[int, int]:
+        return await self._write(lambda db: db.reserve_response(post_id))
+
+    async def confirm_response(self, reservation_id: int, response_data: Dict) -> None:
+        return await self._write(lambda db: db.confirm_response(reservation_id, response_data))
+
+    async def release_response(self, reservation_id: int) -> None:
+        return await self._write(lambda db: db.release_response(reservation_id))
+
+    async def log_error(self, error_type: str, error_message: str, context: str = "") -> None:
+        """רישום שגיאה (שגיאות זהות מקובצות, נכתב ב-flush הבא)"""
+        self.stats.record_error(error_type, error_message, context)
+        await self._flush_if_due()
+
+    async def close(self):
+        """flush אחרון, המתנה לכתיבות שבתור וסגירת ה-threads וחיבור הקריאה"""
+        await self._write(lambda db: self.stats.close())
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._writer.shutdown, True)
+        await loop.run_in_executor(None, self._reader.shutdown, True)
+        self.reader.close()
+
+
+class LoopLagMonitor:
+    """
+    מדידת עיכוב לולאת האירועים (event loop lag)
+
+    משימת רקע שישנה interval שניות ומודדת כמה זמן באמת עבר - כל עודף
+    הוא זמן שבו הלולאה הייתה חסומה (למשל ב-commit סינכרוני).
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def start(self):
+        """הפעלת המדידה (חייב לרוץ בתוך לולאה פעילה)"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """עצירת המדידה"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        """ממוצע, p99 ומקסימום של העיכוב (ms)"""
+        samples = sorted(self.samples)
+        if not samples:
+            return {"samples": 0, "avg_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        return {
+            "samples": len(samples),
+            "avg_ms": round(sum(samples) / len(samples) * 1000, 2),
+            "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 2),
+            "max_ms": round(samples[-1] * 1000, 2),
+        }
+
+
+if __name__ == "__main__":
+    # השוואת עיכוב הלולאה: כתיבות סינכרוניות מול AsyncDatabase
+    import tempfile
+    from pathlib import Path
+
+    async def measure(label: str, write_posts):
+        monitor = LoopLagMonitor(interval=0.005)
+        monitor.start()
+        started = time.perf_counter()
+        await write_posts()
+        elapsed = time.perf_counter() - started
+        await monitor.stop()
+        stats = monitor.stats()
+        print(f"{label}: {elapsed:.2f}s | lag avg {stats['avg_ms']}ms, p99 {stats['p99_ms']}ms, max {stats['max_ms']}ms")
+
+    async def demo():
+        with tempfile.TemporaryDirectory() as tmp:
+            # synchronous=FULL כדי לראות את מחיר ה-fsync כמו בדיסק אמיתי
+            db = DatabaseManager(Path(tmp) / "lag.db", {"synchronous": "FULL"})
+            adb = AsyncDatabase(db)
+
+            def batch(prefix: str, i: int):
+                return [{"post_id": f"{prefix}{i}_{j}", "group_name": "demo", "post_text": "x" * 500}
+                        for j in range(50)]
+
+            async def sync_writes():
+                for i in range(100):
+                    db.add_scanned_posts(batch("sync", i))
+                    db.log_error("demo", "sync")
+                    await asyncio.sleep(0)
+
+            async def async_writes():
+                for i in range(100):
+                    await adb.add_scanned_posts(batch("async", i))
+                    await adb.log_error("demo", "async")
+
+            await measure("sync  ", sync_writes)
+            await measure("async ", async_writes)
+            await adb.close()
+            db.close()
+
+    asyncio.run(demo())
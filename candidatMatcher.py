@@ -5,20 +5,28 @@ Production Ready - עם לוגיקה חכמה וזיהוי הקשר
 """
 
 import re
-from typing import Dict, List, Tuple, Optional
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
 from datetime import datetime, timedelta
 import config
+from database import get_db
+from keywordEngine import KeywordAutomaton
+from textNormalizer import NORMALIZER_VERSION, normalize_text
+from analysisCache import AnalysisCache, rules_fingerprint, text_hash
 
 
 def analyze_with_llm(post_text: str) -> Optional[Dict]:
     """
     ניתוח פוסט באמצעות LLM לדיוק מקסימלי
 
+    נקודת החיבור למודל מקומי בשכבה היקרה של classifierCascade -
+    נקרא רק לפוסטים שציון הכללים שלהם באזור האפור, ולא לכל פוסט.
+
     Args:
         post_text: טקסט הפוסט לניתוח
 
     Returns:
-        dict עם תוצאות הניתוח או None אם לא זמין
+        dict עם תוצאות הניתוח (is_candidate, score, keywords) או None אם לא זמין
 
     TODO: להוסיף קריאת API ל-OpenAI/Gemini בעתיד
     כדי לקבל ניתוח מדויק יותר של:
@@ -79,6 +87,67 @@ def analyze_text_semantic(text: str, api_key: str = None) -> Optional[Dict]:
     return None
 
 
+# הקשרים שמעידים על מעסיק
+EMPLOYER_PREFIXES = [
+    "אנחנו מציעים", "אנו מציעים", "החברה מציעה",
+    "נותנים", "מציעים", "כולל", "עם אפשרות",
+    "המשרה כוללת", "התפקיד כולל",
+    "אנחנו משלמים", "משלמים", "שכר של",
+]
+
+# כמה תווים לפני מילת המפתח נבדקים לחיפוש הקשר של מעסיק
+EMPLOYER_CONTEXT_WINDOW = 50
+
+
+def _prefix_spans(prefix_positions: Dict[str, List[int]]) -> List[Tuple[int, int]]:
+    """המרת מיקומי קידומות (תבנית -> התחלות) לרשימת (התחלה, סוף) ממוינת"""
+    return sorted(
+        (start, start + len(prefix))
+        for prefix, starts in prefix_positions.items()
+        for start in starts
+    )
+
+
+# כל הקידומות בביטוי אחד; lookahead כדי לתפוס גם הופעות חופפות, הקצרה קודם
+_EMPLOYER_PREFIX_SCAN = re.compile(
+    "(?=(" + "|".join(re.escape(normalize_text(prefix))
+                      for prefix in sorted(EMPLOYER_PREFIXES, key=len)) + "))"
+)
+
+
+def index_employer_prefixes(normalized_text: str) -> List[Tuple[int, int]]:
+    """
+    אינדוקס חד-פעמי של כל הופעות הקשרי המעסיק בטקסט מנורמל
+
+    Returns:
+        list: (התחלה, סוף) לכל הופעה, ממוין לפי התחלה
+    """
+    return [(match.start(), match.start() + len(match.group(1)))
+            for match in _EMPLOYER_PREFIX_SCAN.finditer(normalized_text)]
+
+
+def has_employer_context(keyword_positions: List[int],
+                         prefix_spans: List[Tuple[int, int]]) -> bool:
+    """
+    בדיקה אם לפני הופעה כלשהי של מילת המפתח יש הקשר של מעסיק
+
+    קידומת נחשבת רק אם היא כולה בתוך החלון של EMPLOYER_CONTEXT_WINDOW
+    התווים שלפני ההופעה. נבדקות כל ההופעות, לא רק הראשונה.
+
+    Args:
+        keyword_positions: מיקומי ההתחלה של מילת המפתח
+        prefix_spans: פלט index_employer_prefixes / _prefix_spans
+    """
+    span_starts = [start for start, _end in prefix_spans]
+    for keyword_pos in keyword_positions:
+        index = bisect_left(span_starts, max(0, keyword_pos - EMPLOYER_CONTEXT_WINDOW))
+        while index < len(prefix_spans) and prefix_spans[index][0] < keyword_pos:
+            if prefix_spans[index][1] <= keyword_pos:
+                return True
+            index += 1
+    return False
+
+
 def is_employer_context(text: str, keyword: str) -> bool:
     """
     בדיקה אם מילת מפתח מופיעה בהקשר של מעסיק
@@ -87,37 +156,200 @@ def is_employer_context(text: str, keyword: str) -> bool:
         "אנחנו משלמים משכורת גבוהה" -> True (מעסיק)
         "אני מחפש משכורת גבוהה" -> False (מועמד)
     """
-    # הקשרים שמעידים על מעסיק
-    employer_prefixes = [
-        "אנחנו מציעים", "אנו מציעים", "החברה מציעה",
-        "נותנים", "מציעים", "כולל", "עם אפשרות",
-        "המשרה כוללת", "התפקיד כולל",
-        "אנחנו משלמים", "משלמים", "שכר של",
-    ]
-
-    text_lower = text.lower()
-    keyword_pos = text_lower.find(keyword.lower())
-
-    if keyword_pos == -1:
+    text_normalized = normalize_text(text)
+    keyword = normalize_text(keyword)
+    if not keyword:
         return False
 
-    # בדוק 50 תווים לפני המילה
-    context_before = text_lower[max(0, keyword_pos - 50):keyword_pos]
+    keyword_positions = []
+    keyword_pos = text_normalized.find(keyword)
+    while keyword_pos != -1:
+        keyword_positions.append(keyword_pos)
+        keyword_pos = text_normalized.find(keyword, keyword_pos + 1)
 
-    for prefix in employer_prefixes:
-        if prefix in context_before:
-            return True
+    if not keyword_positions:
+        return False
 
-    return False
+    return has_employer_context(keyword_positions, index_employer_prefixes(text_normalized))
+
+
+# מילים שתמיד פוסלות (לא תלויות הקשר) - נבדקות רק אם נמצאה מילה שלילית
+ALWAYS_DISQUALIFY = [
+    "דרושים", "דרוש/ה", "דרושה", "מגייסים", "מגייסת",
+    "חברתנו מחפשת", "החברה מחפשת", "אנחנו מחפשים",
+    "hiring", "we are looking for", "recruiting"
+]
+
+# סימנים של מודעת דרושים שתלויים בהקשר
+CONTEXT_DEPENDENT_PATTERNS = [
+    "משכורת", "שכר גבוה", "בונוסים", "תנאים מעולים", "תנאים טובים"
+]
+
+# סימנים שתמיד מעידים על מעסיק (לא תלויים בהקשר)
+EMPLOYER_ONLY_PATTERNS = [
+    "📞",  # טלפון בפוסט = כנראה מודעה
+    "☎",
+    "קו\"ח ל",
+    "שלחו ל",
+    "פנו ל",
+    "צרו קשר",
+    "נא לפנות",
+    "יש לשלוח",
+    "לשליחת",
+    "ניתן לפנות",
+    "מספר טלפון",
+    "להגיש מועמדות",
+    "לשלוח קורות חיים ל",
+    # מגייסים/חברות מחפשות עובדים
+    "מחפש מישהו",
+    "מחפשת מישהו",
+    "מחפשים את",
+    "מחפשת את ה",
+    "מחפש אותך",
+    "מחפשת אותך",
+    "בואו לעבוד",
+    "בוא לעבוד",
+    "הצטרפו לצוות",
+    "הצטרפו אל",
+    "מיזם",
+    "שותפות",
+    "שותפים",
+    "עובדים/ות",
+    "מומחי",
+    "מומחיות",
+]
+
+# ביטויים נוספים שמעידים על מחפש עבודה (לא מעסיק) - (ביטוי, תווית)
+SEEKER_PHRASES = [
+    ("דרושה לי", "דרושה לי"),
+    ("חצי משרה", "חצי משרה"),
+    ("עבודה מהבית", "עבודה מהבית"),
+    ("ללא ניסיון", "ללא ניסיון"),
+    ("בלי ניסיון", "בלי ניסיון"),
+    ("מחפש עבודה", "מחפש עבודה (ביטוי)"),
+    ("מחפשת עבודה", "מחפשת עבודה (ביטוי)"),
+    ("מחפש משרה", "מחפש משרה (ביטוי)"),
+    ("מחפשת משרה", "מחפשת משרה (ביטוי)"),
+    ("מחפשת הזדמנות", "מחפשת הזדמנות"),
+    ("מחפש הזדמנות", "מחפש הזדמנות"),
+]
+
+# מיקומים שמזכים בבונוס ניקוד
+BONUS_LOCATIONS = ["פתח תקווה", "הוד השרון", "כפר סבא", "רעננה", "המרכז", "השרון"]
+
+# פוסט בגוף ראשון (אני מחפש, אני צריך)
+FIRST_PERSON_PATTERNS = ["אני מחפש", "אני צריך", "אני רוצה", "אני מעוניין", "אני זמין",
+                         "אני מחפשת", "אני מעוניינת", "אני זמינה"]
+
+# גיל (בן/בת XX) - מחפשי עבודה מציינים גיל
+AGE_PATTERN = re.compile(r'\bבן\s+\d{2}\b|\bבת\s+\d{2}\b')
+
+# חילוץ מידע על המועמד
+PHONE_PATTERN = re.compile(r'0\d{1,2}[-\s]?\d{7}')
+EXPERIENCE_KEYWORDS = ["ניסיון", "עבדתי", "התנסות", "שנים", "שנות"]
+INFO_LOCATIONS = ["פתח תקווה", "הוד השרון", "כפר סבא", "רעננה", "המרכז", "השרון", "תל אביב"]
+SKILLS = ["מכירות", "שירות", "ביטוח", "לקוחות", "מחשב", "משרד", "טלפון"]
 
 
 class CandidateMatcher:
     """מזהה ומתאים מועמדים למשרות"""
     
-    def __init__(self):
+    def __init__(self, cache: AnalysisCache = None):
+        """
+        Args:
+            cache: מטמון ניתוחים אופציונלי (ראה get_matcher)
+        """
         self.positive_keywords = config.CANDIDATE_KEYWORDS['positive']
         self.negative_keywords = config.CANDIDATE_KEYWORDS['negative']
         self.open_positions = config.OPEN_POSITIONS
+        self._build_keyword_engine()
+        self.cache = cache
+
+    def _build_keyword_engine(self):
+        """
+        קומפילציה חד-פעמית של כל רשימות הכללים לאוטומט אחד
+
+        כל תבנית עוברת את אותו נרמול כמו הפוסטים, ולכל קטגוריה נשמרים
+        זוגות (מונח מקורי, מונח מנורמל) - ההתאמה לפי המנורמל,
+        והפלט (למשל matched_keywords) לפי המקורי.
+        """
+        self._keyword_engine = KeywordAutomaton()
+        self._terms: Dict[str, List[Tuple[str, str]]] = {}
+
+        term_lists = [
+            ("positive", self.positive_keywords),
+            ("negative", self.negative_keywords),
+            ("disqualify", ALWAYS_DISQUALIFY),
+            ("employer_only", EMPLOYER_ONLY_PATTERNS),
+            ("context_dependent", CONTEXT_DEPENDENT_PATTERNS),
+            ("employer_prefix", EMPLOYER_PREFIXES),
+            ("seeker", [phrase for phrase, _label in SEEKER_PHRASES]),
+            ("location", BONUS_LOCATIONS),
+            ("first_person", FIRST_PERSON_PATTERNS),
+            ("experience", EXPERIENCE_KEYWORDS),
+            ("info_location", INFO_LOCATIONS),
+            ("skill", SKILLS),
+        ]
+        for category, terms in term_lists:
+            pairs = [(term, normalize_text(term)) for term in terms]
+            self._terms[category] = pairs
+            for _term, normalized in pairs:
+                self._keyword_engine.add(normalized, category)
+
+        self._build_job_index()
+        self._keyword_engine.build()
+
+    def _build_job_index(self):
+        """
+        אינדקס הפוך: מילת מפתח/מיקום -> המשרות שמכילות אותם
+
+        המשרות ממוספרות לפי סדרן ב-OPEN_POSITIONS (לשבירת שוויון כמו קודם),
+        ומילות המפתח שלהן נרשמות באותו אוטומט תחת 'job_keyword' / 'job_location'.
+        """
+        self._job_keys = list(self.open_positions)
+        self._job_keywords: List[List[str]] = []
+        self._keyword_jobs: Dict[str, List[Tuple[int, int]]] = {}
+        self._location_jobs: Dict[str, List[int]] = {}
+
+        for job_index, job_key in enumerate(self._job_keys):
+            job_info = self.open_positions[job_key]
+            self._job_keywords.append(list(job_info['keywords']))
+
+            for position, keyword in enumerate(job_info['keywords']):
+                normalized = normalize_text(keyword)
+                self._keyword_jobs.setdefault(normalized, []).append((job_index, position))
+                self._keyword_engine.add(normalized, "job_keyword")
+
+            for location in job_info['locations']:
+                normalized = normalize_text(location)
+                jobs = self._location_jobs.setdefault(normalized, [])
+                if job_index not in jobs:
+                    jobs.append(job_index)
+                self._keyword_engine.add(normalized, "job_location")
+
+    def _found_terms(self, prepared: Dict, category: str) -> List[str]:
+        """המונחים המקוריים של קטגוריה שנמצאו בפוסט (בסדר הרשימה)"""
+        found = prepared['matches'].get(category, {})
+        return [term for term, normalized in self._terms[category] if normalized in found]
+
+    def _prepare_post(self, post_text: str, normalized: str = None) -> Dict:
+        """
+        חישוב משותף לכל שלבי הניתוח של פוסט אחד
+
+        Args:
+            post_text: הטקסט המקורי
+            normalized: הטקסט המנורמל אם כבר חושב
+
+        Returns:
+            dict: טקסט מקורי, טקסט מנורמל ותוצאות סריקת האוטומט עליו
+        """
+        if normalized is None:
+            normalized = normalize_text(post_text)
+        return {
+            "text": post_text or "",
+            "normalized": normalized,
+            "matches": self._keyword_engine.scan(normalized),
+        }
     
     def is_candidate_post(self, post_text: str) -> Tuple[bool, float, List[str]]:
         """
@@ -129,104 +361,40 @@ class CandidateMatcher:
         if not post_text:
             return False, 0.0, []
 
-        # נסה לנתח עם LLM אם זמין (לדיוק מקסימלי)
-        llm_result = analyze_with_llm(post_text)
-        if llm_result is not None:
-            return (
-                llm_result.get('is_candidate', False),
-                llm_result.get('score', 0.0),
-                llm_result.get('keywords', [])
-            )
+        return self._is_candidate(self._prepare_post(post_text))
 
-        # לא משנים ל-lower עבור עברית - בודקים את הטקסט המקורי
-        post_text_check = post_text.lower()  # לאנגלית
+    def _is_candidate(self, prepared: Dict) -> Tuple[bool, float, List[str]]:
+        """is_candidate_post על פוסט שכבר עבר _prepare_post"""
+        post_text = prepared['normalized']
+        if not post_text:
+            return False, 0.0, []
 
+        # מעבר יחיד על הטקסט כבר בוצע - כל הבדיקות למטה הן חיפושי מילון
+        matches = prepared['matches']
         # בדיקת מילות מפתח שליליות (מעסיק מחפש עובדים)
         # חכם יותר: בודק הקשר ולא רק קיום המילה
-        for negative_keyword in self.negative_keywords:
-            if negative_keyword in post_text_check or negative_keyword in post_text:
-                # מילים שתמיד פוסלות (לא תלויות הקשר)
-                always_disqualify = [
-                    "דרושים", "דרוש/ה", "דרושה", "מגייסים", "מגייסת",
-                    "חברתנו מחפשת", "החברה מחפשת", "אנחנו מחפשים",
-                    "hiring", "we are looking for", "recruiting"
-                ]
-                if any(word in post_text_check or word in post_text for word in always_disqualify):
-                    return False, 0.0, []
-
-        # סימנים של מודעת דרושים שתלויים בהקשר
-        context_dependent_patterns = [
-            "משכורת", "שכר גבוה", "בונוסים", "תנאים מעולים", "תנאים טובים"
-        ]
-
-        # סימנים שתמיד מעידים על מעסיק (לא תלויים בהקשר)
-        employer_only_patterns = [
-            "📞",  # טלפון בפוסט = כנראה מודעה
-            "☎",
-            "קו\"ח ל",
-            "שלחו ל",
-            "פנו ל",
-            "צרו קשר",
-            "נא לפנות",
-            "יש לשלוח",
-            "לשליחת",
-            "ניתן לפנות",
-            "מספר טלפון",
-            "להגיש מועמדות",
-            "לשלוח קורות חיים ל",
-            # מגייסים/חברות מחפשות עובדים
-            "מחפש מישהו",
-            "מחפשת מישהו",
-            "מחפשים את",
-            "מחפשת את ה",
-            "מחפש אותך",
-            "מחפשת אותך",
-            "בואו לעבוד",
-            "בוא לעבוד",
-            "הצטרפו לצוות",
-            "הצטרפו אל",
-            "מיזם",
-            "שותפות",
-            "שותפים",
-            "עובדים/ות",
-            "מומחי",
-            "מומחיות",
-        ]
+        if matches.get("negative") and matches.get("disqualify"):
+            return False, 0.0, []
 
-        for pattern in employer_only_patterns:
-            if pattern in post_text or pattern.lower() in post_text_check:
-                return False, 0.0, []
+        if matches.get("employer_only"):
+            return False, 0.0, []
 
-        # בדיקת דפוסים תלויי הקשר
-        for pattern in context_dependent_patterns:
-            if pattern in post_text or pattern.lower() in post_text_check:
+        # בדיקת דפוסים תלויי הקשר - כל ההופעות, מול הקידומות שכבר אונדקסו בסריקה
+        context_matches = matches.get("context_dependent")
+        if context_matches:
+            prefix_spans = _prefix_spans(matches.get("employer_prefix", {}))
+            for occurrences in context_matches.values():
                 # אם זה בהקשר של מעסיק - פסול
-                if is_employer_context(post_text, pattern):
-                    return False, 0.0, []
                 # אם זה בהקשר של מועמד (מחפש משכורת גבוהה) - זה בסדר
+                if has_employer_context(occurrences, prefix_spans):
+                    return False, 0.0, []
 
         # בדיקת מילות מפתח חיוביות (מועמד מחפש עבודה)
-        matched_keywords = []
-        for positive_keyword in self.positive_keywords:
-            if positive_keyword in post_text_check or positive_keyword in post_text:
-                matched_keywords.append(positive_keyword)
-
-        # ביטויים נוספים שמעידים על מחפש עבודה (לא מעסיק)
-        seeker_phrases = [
-            ("דרושה לי", "דרושה לי"),
-            ("חצי משרה", "חצי משרה"),
-            ("עבודה מהבית", "עבודה מהבית"),
-            ("ללא ניסיון", "ללא ניסיון"),
-            ("בלי ניסיון", "בלי ניסיון"),
-            ("מחפש עבודה", "מחפש עבודה (ביטוי)"),
-            ("מחפשת עבודה", "מחפשת עבודה (ביטוי)"),
-            ("מחפש משרה", "מחפש משרה (ביטוי)"),
-            ("מחפשת משרה", "מחפשת משרה (ביטוי)"),
-            ("מחפשת הזדמנות", "מחפשת הזדמנות"),
-            ("מחפש הזדמנות", "מחפש הזדמנות"),
-        ]
-        for phrase, label in seeker_phrases:
-            if phrase in post_text and label not in matched_keywords:
+        matched_keywords = self._found_terms(prepared, "positive")
+
+        found_seeker = set(self._found_terms(prepared, "seeker"))
+        for phrase, label in SEEKER_PHRASES:
+            if phrase in found_seeker and label not in matched_keywords:
                 matched_keywords.append(label)
 
         # חישוב ציון
@@ -241,22 +409,14 @@ class CandidateMatcher:
             score += 1.5
 
         # בונוס אם יש התייחסות למיקום
-        locations = ["פתח תקווה", "הוד השרון", "כפר סבא", "רעננה", "המרכז", "השרון"]
-        for location in locations:
-            if location in post_text:
-                score += 0.5
+        score += 0.5 * len(self._found_terms(prepared, "location"))
 
         # בונוס אם הפוסט בגוף ראשון (אני מחפש, אני צריך)
-        first_person_patterns = ["אני מחפש", "אני צריך", "אני רוצה", "אני מעוניין", "אני זמין",
-                                 "אני מחפשת", "אני מעוניינת", "אני זמינה"]
-        for pattern in first_person_patterns:
-            if pattern in post_text:
-                score += 2.0
-                break
+        if matches.get("first_person"):
+            score += 2.0
 
         # בונוס אם מציינים גיל (בן/בת XX) - מחפשי עבודה מציינים גיל
-        age_pattern = re.search(r'\bבן\s+\d{2}\b|\bבת\s+\d{2}\b', post_text)
-        if age_pattern:
+        if AGE_PATTERN.search(post_text):
             score += 1.5
 
         score = min(score, 10.0)  # מקסימום 10
@@ -272,32 +432,43 @@ class CandidateMatcher:
         Returns:
             dict: פרטי המשרה המתאימה ביותר או None אם אין התאמה
         """
-        post_text_lower = post_text.lower()
+        return self._match_job(self._prepare_post(post_text))
+
+    def _match_job(self, prepared: Dict) -> Optional[Dict]:
+        """match_to_job על פוסט שכבר עבר _prepare_post"""
+        matches = prepared['matches']
         best_match = None
         best_score = 0.0
         
-        for job_key, job_info in self.open_positions.items():
-            match_score = 0.0
-            matched_requirements = []
+        # רק משרות שמילות המפתח או המיקומים שלהן הופיעו בפוסט
+        keyword_hits: Dict[int, List[int]] = {}
+        for keyword in matches.get("job_keyword", {}):
+            for job_index, position in self._keyword_jobs[keyword]:
+                keyword_hits.setdefault(job_index, []).append(position)
+        
+        located_jobs = set()
+        for location in matches.get("job_location", {}):
+            located_jobs.update(self._location_jobs[location])
+        
+        # מעבר לפי סדר המשרות - בשוויון ציון המשרה הראשונה נשארת
+        for job_index in sorted(keyword_hits.keys() | located_jobs):
+            positions = sorted(keyword_hits.get(job_index, []))
             
             # התאמה לפי מילות מפתח של המשרה
-            for keyword in job_info['keywords']:
-                if keyword in post_text_lower:
-                    match_score += 2.0
-                    matched_requirements.append(keyword)
+            match_score = 2.0 * len(positions)
+            matched_requirements = [self._job_keywords[job_index][position] for position in positions]
             
             # בדיקת מיקום
-            for location in job_info['locations']:
-                if location in post_text:
-                    match_score += 1.5
-                    break
+            if job_index in located_jobs:
+                match_score += 1.5
             
             # אם יש התאמה טובה, שמור אותה
             if match_score > best_score:
+                job_key = self._job_keys[job_index]
                 best_score = match_score
                 best_match = {
                     "job_key": job_key,
-                    "job_info": job_info,
+                    "job_info": self.open_positions[job_key],
                     "match_score": match_score,
                     "matched_keywords": matched_requirements
                 }
@@ -326,6 +497,11 @@ class CandidateMatcher:
         Returns:
             dict: מידע על המועמד
         """
+        return self._extract_info(self._prepare_post(post_text), author_name)
+
+    def _extract_info(self, prepared: Dict, author_name: str = "") -> Dict:
+        """extract_candidate_info על פוסט שכבר עבר _prepare_post"""
+        matches = prepared['matches']
         info = {
             "name": author_name,
             "has_phone": False,
@@ -335,35 +511,29 @@ class CandidateMatcher:
         }
         
         # חיפוש מספר טלפון
-        phone_pattern = r'0\d{1,2}[-\s]?\d{7}'
-        if re.search(phone_pattern, post_text):
+        if PHONE_PATTERN.search(prepared['normalized']):
             info['has_phone'] = True
         
         # חיפוש ניסיון
-        experience_keywords = ["ניסיון", "עבדתי", "התנסות", "שנים", "שנות"]
-        for keyword in experience_keywords:
-            if keyword in post_text.lower():
-                info['has_experience'] = True
-                break
+        if matches.get("experience"):
+            info['has_experience'] = True
         
         # מיקומים
-        locations = ["פתח תקווה", "הוד השרון", "כפר סבא", "רעננה", "המרכז", "השרון", "תל אביב"]
-        for location in locations:
-            if location in post_text:
-                info['locations_mentioned'].append(location)
+        info['locations_mentioned'] = self._found_terms(prepared, "info_location")
         
         # מיומנויות רלוונטיות
-        skills = ["מכירות", "שירות", "ביטוח", "לקוחות", "מחשב", "משרד", "טלפון"]
-        for skill in skills:
-            if skill in post_text.lower():
-                info['skills_mentioned'].append(skill)
+        info['skills_mentioned'] = self._found_terms(prepared, "skill")
         
         return info
     
-    def should_respond(self, post_data: Dict) -> Tuple[bool, str]:
+    def should_respond(self, post_data: Dict, now: datetime = None) -> Tuple[bool, str]:
         """
         החלטה אם לענות לפוסט
         
+        Args:
+            post_data: ציון, משרה מותאמת ותאריך פרסום
+            now: זמן הייחוס לבדיקת גיל הפוסט (ברירת מחדל: עכשיו)
+
         Returns:
             tuple: (האם לענות, סיבה)
         """
@@ -374,7 +544,7 @@ class CandidateMatcher:
                 posted_date = datetime.fromisoformat(posted_at)
                 max_age = timedelta(days=config.AUTOMATION_SETTINGS['max_post_age_days'])
                 
-                if datetime.now() - posted_date > max_age:
+                if (now or datetime.now()) - posted_date > max_age:
                     return False, "הפוסט ישן מדי"
             except:
                 pass  # אם יש שגיאה בפרסור התאריך, נמשיך
@@ -390,20 +560,115 @@ class CandidateMatcher:
         return True, "מתאים למענה"
     
     def analyze_post(self, post_text: str, author_name: str = "", 
-                    posted_at: str = None) -> Dict:
+                    posted_at: str = None, model_result: Dict = None) -> Dict:
         """
         ניתוח מקיף של פוסט
         
+        Args:
+            model_result: תוצאת מסווג חיצוני שמחליפה את ציון הכללים
+                          (ראה classifierCascade.ClassifierCascade)
+
         Returns:
             dict: כל המידע המנותח על הפוסט
         """
-        # בדיקה אם זה מועמד
-        is_candidate, candidate_score, matched_keywords = self.is_candidate_post(post_text)
+        return self._analyze(post_text, author_name, posted_at, model_result=model_result)
+
+    def analyze_posts(self, posts: Iterable[Tuple]) -> Iterator[Dict]:
+        """
+        ניתוח אצווה של פוסטים - מחזיר generator של ניתוחים לפי הסדר
+
+        האוטומט והרשימות המקומפלות משותפים לכל האצווה, וזמן הייחוס
+        לבדיקת גיל הפוסט נקבע פעם אחת. התוצאות מוחזרות בעצלות, כך
+        שאפשר להזרים גם מיליוני פוסטים בלי להחזיק אותם בזיכרון.
+
+        Args:
+            posts: רשימה או iterator של (טקסט, מחבר, תאריך פרסום);
+                   מחבר ותאריך אופציונליים
+
+        Example:
+            analyses = list(matcher.analyze_posts([(text, author, posted_at), ...]))
+        """
+        now = datetime.now()
+        for post in posts:
+            post_text, author_name, posted_at = (tuple(post) + ("", None))[:3]
+            yield self._analyze(post_text, author_name or "", posted_at, now)
+
+    @property
+    def rules_fingerprint(self) -> str:
+        """טביעת אצבע של כל הכללים שמשפיעים על תוצאת הניתוח"""
+        return rules_fingerprint(
+            self.positive_keywords, self.negative_keywords, self.open_positions,
+            ALWAYS_DISQUALIFY, CONTEXT_DEPENDENT_PATTERNS, EMPLOYER_ONLY_PATTERNS,
+            EMPLOYER_PREFIXES, SEEKER_PHRASES, BONUS_LOCATIONS, FIRST_PERSON_PATTERNS,
+            EXPERIENCE_KEYWORDS, INFO_LOCATIONS, SKILLS,
+            AGE_PATTERN.pattern, PHONE_PATTERN.pattern, NORMALIZER_VERSION,
+        )
+
+    def _analyze_text(self, post_text: str, model_result: Dict = None) -> Dict:
+        """
+        החלק בניתוח שתלוי רק בטקסט - דרך המטמון אם הוגדר
+
+        Args:
+            post_text: טקסט הפוסט
+            model_result: תוצאת מסווג חיצוני (is_candidate, score, keywords)
+                          שגוברת על ציון הכללים - לא נשמרת במטמון
+
+        Returns:
+            dict: ציון, מילות מפתח, מידע מועמד (בלי שם) והתאמת משרה (לפי מפתח)
+        """
+        normalized = normalize_text(post_text)
+        key = None
+        if self.cache is not None and model_result is None:
+            key = text_hash(normalized)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        prepared = self._prepare_post(post_text, normalized)
+        if model_result is None:
+            is_candidate, candidate_score, matched_keywords = self._is_candidate(prepared)
+        else:
+            is_candidate = bool(model_result.get('is_candidate', False))
+            candidate_score = float(model_result.get('score', 0.0))
+            matched_keywords = list(model_result.get('keywords', []))
+
+        core = {
+            "is_candidate": is_candidate,
+            "candidate_score": candidate_score,
+            "matched_keywords": matched_keywords,
+            "candidate_info": None,
+            "job": None,
+        }
+
+        if is_candidate:
+            info = self._extract_info(prepared)
+            del info['name']
+            core['candidate_info'] = info
+
+            job_match = self._match_job(prepared)
+            if job_match:
+                core['job'] = {
+                    "job_key": job_match['job_key'],
+                    "match_score": job_match['match_score'],
+                    "matched_keywords": job_match['matched_keywords'],
+                }
+
+        if key is not None:
+            self.cache.put(key, core)
+        return core
+
+    def _analyze(self, post_text: str, author_name: str = "",
+                 posted_at: str = None, now: datetime = None,
+                 model_result: Dict = None) -> Dict:
+        """ניתוח מלא - החלק התלוי בטקסט + מחבר ותאריך פרסום"""
+        core = self._analyze_text(post_text, model_result)
+        is_candidate = core['is_candidate']
+        candidate_score = core['candidate_score']
         
         result = {
             "is_candidate": is_candidate,
             "candidate_score": candidate_score,
-            "matched_keywords": matched_keywords,
+            "matched_keywords": core['matched_keywords'],
             "candidate_info": None,
             "matched_job": None,
             "should_respond": False,
@@ -414,12 +679,18 @@ class CandidateMatcher:
             result['reason'] = "לא זוהה כמועמד"
             return result
         
-        # חילוץ מידע על המועמד
-        result['candidate_info'] = self.extract_candidate_info(post_text, author_name)
+        # מידע על המועמד
+        result['candidate_info'] = {"name": author_name, **core['candidate_info']}
         
         # התאמה למשרה
-        job_match = self.match_to_job(post_text, author_name)
-        if job_match:
+        job_match = None
+        if core['job']:
+            job_match = {
+                "job_key": core['job']['job_key'],
+                "job_info": self.open_positions[core['job']['job_key']],
+                "match_score": core['job']['match_score'],
+                "matched_keywords": core['job']['matched_keywords'],
+            }
             result['matched_job'] = job_match
         
         # החלטה אם לענות
@@ -428,7 +699,7 @@ class CandidateMatcher:
             'matched_job': job_match,
             'posted_at': posted_at
         }
-        should_respond, reason = self.should_respond(post_data)
+        should_respond, reason = self.should_respond(post_data, now)
         result['should_respond'] = should_respond
         result['reason'] = reason
         
@@ -436,9 +707,22 @@ class CandidateMatcher:
 
 
 # פונקציות עזר
-def get_matcher() -> CandidateMatcher:
-    """קבלת instance של מנוע ההתאמה"""
-    return CandidateMatcher()
+def get_matcher(persistent_cache: bool = None) -> CandidateMatcher:
+    """
+    קבלת instance של מנוע ההתאמה עם מטמון ניתוחים
+
+    Args:
+        persistent_cache: שמירת המטמון גם במסד הנתונים
+                          (ברירת מחדל: ANALYSIS_CACHE_SETTINGS['persistent'])
+    """
+    settings = config.ANALYSIS_CACHE_SETTINGS
+    if persistent_cache is None:
+        persistent_cache = settings['persistent']
+
+    matcher = CandidateMatcher()
+    db = get_db() if persistent_cache else None
+    matcher.cache = AnalysisCache(matcher.rules_fingerprint, db, settings['memory_entries'])
+    return matcher
 
 
 if __name__ == "__main__":
@@ -0,0 +1,310 @@
+"""
+מסווג מדורג (cascade) - כללים מהירים קודם, מסווג יקר רק לאזור האפור
+פוסטים ברורים מוכרעים מיד; רק ציונים בטווח מוגדר נשלחים ל-backend אסינכרוני
+עם הגבלת מקביליות, אצוות, timeout ומטמון תוצאות
+"""
+
+import asyncio
+import json
+import math
+import time
+import urllib.request
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import config
+from analysisCache import text_hash
+from candidatMatcher import CandidateMatcher, analyze_with_llm
+from textNormalizer import normalize_text
+
+
+def validate_result(result) -> Optional[Dict]:
+    """
+    תוצאת backend בצורה ש-CandidateMatcher מקבל (model_result), או None אם היא פגומה
+
+    score חובה ומספרי; is_candidate ו-keywords אופציונליים (False / רשימה ריקה).
+    """
+    if not isinstance(result, dict):
+        return None
+    score = result.get('score')
+    if isinstance(score, bool) or not isinstance(score, (int, float)) or not math.isfinite(score):
+        return None
+    keywords = result.get('keywords', [])
+    if not isinstance(keywords, (list, tuple)) or not all(isinstance(keyword, str) for keyword in keywords):
+        return None
+    return {
+        "is_candidate": bool(result.get('is_candidate', False)),
+        "score": float(score),
+        "keywords": list(keywords),
+    }
+
+
+class ClassifierBackend(ABC):
+    """ממשק ל-backend של סיווג - מחליפים אותו כדי לחבר מודל אחר"""
+
+    @abstractmethod
+    async def classify_batch(self, texts: List[str]) -> List[Optional[Dict]]:
+        """
+        סיווג אצווה של פוסטים
+
+        Returns:
+            list: לכל פוסט dict עם is_candidate, score, keywords - או None אם אין הכרעה
+        """
+
+
+class FunctionBackend(ClassifierBackend):
+    """backend שמריץ פונקציה סינכרונית (ברירת מחדל: analyze_with_llm) ב-thread"""
+
+    def __init__(self, function: Callable[[str], Optional[Dict]] = analyze_with_llm):
+        self.function = function
+
+    async def classify_batch(self, texts: List[str]) -> List[Optional[Dict]]:
+        return await asyncio.to_thread(lambda: [self.function(text) for text in texts])
+
+
+class HttpClassifierBackend(ClassifierBackend):
+    """
+    backend מעל HTTP - שרת מקומי או API
+
+    Request:  POST {"posts": ["...", "..."]}
+    Response: {"results": [{"is_candidate": true, "score": 7.5, "keywords": [...]}, null, ...]}
+    """
+
+    def __init__(self, endpoint: str, timeout: float = 10):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def _post(self, texts: List[str]) -> List[Optional[Dict]]:
+        payload = json.dumps({"posts": texts}, ensure_ascii=False).encode("utf-8")
+        request = urllib.request.Request(
+            self.endpoint, data=payload, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            results = json.loads(response.read().decode("utf-8")).get("results", [])
+
+        if len(results) != len(texts):
+            raise ValueError(f"expected {len(texts)} results, got {len(results)}")
+        return results
+
+    async def classify_batch(self, texts: List[str]) -> List[Optional[Dict]]:
+        return await asyncio.to_thread(self._post, texts)
+
+
+class CascadeMetrics:
+    """מדדים: כמה פוסטים הגיעו לשכבה היקרה וכמה זמן זה הוסיף"""
+
+    def __init__(self):
+        self.posts_total = 0
+        self.posts_escalated = 0
+        self.cache_hits = 0
+        self.backend_calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.overrides = 0
+        self.batch_latencies: List[float] = []
+        self.added_latency = 0.0
+
+    def summary(self) -> Dict:
+        """סיכום המדדים"""
+        latencies = sorted(self.batch_latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0
+        return {
+            "posts_total": self.posts_total,
+            "posts_escalated": self.posts_escalated,
+            "escalation_rate": round(self.posts_escalated / self.posts_total * 100, 2) if self.posts_total else 0.0,
+            "cache_hits": self.cache_hits,
+            "backend_calls": self.backend_calls,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "overrides": self.overrides,
+            "avg_batch_latency_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+            "p95_batch_latency_ms": round(p95 * 1000, 1),
+            "added_latency_ms": round(self.added_latency * 1000, 1),
+        }
+
+
+class ClassifierCascade:
+    """
+    ניתוח פוסטים בשתי שכבות
+
+    1. CandidateMatcher - מכריע מיד את כל הפוסטים הברורים
+    2. backend יקר - רק לפוסטים שציון הכללים שלהם בטווח
+       [ambiguous_score_min, ambiguous_score_max]; התוצאה שלו גוברת
+    """
+
+    def __init__(self, matcher: CandidateMatcher, backend: ClassifierBackend,
+                 settings: Dict = None):
+        self.matcher = matcher
+        self.backend = backend
+        self.settings = {**config.LLM_CASCADE_SETTINGS, **(settings or {})}
+        self.metrics = CascadeMetrics()
+        self._cache: "OrderedDict[str, Optional[Dict]]" = OrderedDict()
+        self._semaphore = asyncio.Semaphore(self.settings['max_concurrency'])
+
+    def is_ambiguous(self, analysis: Dict) -> bool:
+        """האם ציון הכללים באזור האפור"""
+        return (self.settings['ambiguous_score_min']
+                <= analysis['candidate_score']
+                <= self.settings['ambiguous_score_max'])
+
+    async def analyze_posts(self, posts: Iterable[Tuple]) -> List[Dict]:
+        """
+        ניתוח אצווה - כמו CandidateMatcher.analyze_posts, עם הסלמה לאזור האפור
+
+        הניתוח בכללים (כולל מטמון הניתוחים) רץ ב-thread, כמו בסורק בלי מסווג,
+        כך שהלולאה ממשיכה לשרת את שאר המשימות בזמן הניתוח.
+
+        Args:
+            posts: (טקסט, מחבר, תאריך פרסום) לכל פוסט
+
+        Returns:
+            list: ניתוח לכל פוסט, לפי הסדר
+        """
+        posts = [(tuple(post) + ("", None))[:3] for post in posts]
+        analyses = await asyncio.to_thread(lambda: list(self.matcher.analyze_posts(posts)))
+        self.metrics.posts_total += len(posts)
+
+        ambiguous = [index for index, analysis in enumerate(analyses) if self.is_ambiguous(analysis)]
+        if not ambiguous:
+            return analyses
+        self.metrics.posts_escalated += len(ambiguous)
+
+        started_at = time.perf_counter()
+
+        # מטמון קודם - רק מה שלא נמצא נשלח ל-backend
+        results: Dict[int, Optional[Dict]] = {}
+        to_classify: List[Tuple[int, str]] = []
+        for index in ambiguous:
+            key = text_hash(normalize_text(posts[index][0]))
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                results[index] = self._cache[key]
+                self.metrics.cache_hits += 1
+            else:
+                to_classify.append((index, key))
+
+        batch_size = self.settings['batch_size']
+        batches = [to_classify[i:i + batch_size] for i in range(0, len(to_classify), batch_size)]
+        batch_results = await asyncio.gather(
+            *(self._classify_batch([posts[index][0] for index, _key in batch]) for batch in batches)
+        )
+
+        for batch, batch_result in zip(batches, batch_results):
+            if batch_result is None:
+                continue  # timeout/שגיאה - נשארים עם החלטת הכללים
+            for (index, key), result in zip(batch, batch_result):
+                if result is not None:
+                    result = validate_result(result)
+                    if result is None:
+                        # תוצאה פגומה - נשארים עם החלטת הכללים (ולא שומרים במטמון)
+                        self.metrics.errors += 1
+                        continue
+                results[index] = result
+                self._remember(key, result)
+
+        self.metrics.added_latency += time.perf_counter() - started_at
+
+        overrides = {index: result for index, result in results.items() if result is not None}
+        if overrides:
+            def apply_overrides():
+                for index, result in overrides.items():
+                    post_text, author_name, posted_at = posts[index]
+                    analyses[index] = self.matcher.analyze_post(
+                        post_text, author_name or "", posted_at, model_result=result
+                    )
+            await asyncio.to_thread(apply_overrides)
+            self.metrics.overrides += len(overrides)
+
+        return analyses
+
+    async def _classify_batch(self, texts: List[str]) -> Optional[List[Optional[Dict]]]:
+        """קריאה אחת ל-backend, תחת הגבלת מקביליות ו-timeout"""
+        async with self._semaphore:
+            started_at = time.perf_counter()
+            self.metrics.backend_calls += 1
+            try:
+                return await asyncio.wait_for(
+                    self.backend.classify_batch(texts), self.settings['timeout_seconds']
+                )
+            except asyncio.TimeoutError:
+                self.metrics.timeouts += 1
+                print(f"   ⚠️ מסווג: timeout לאצווה של {len(texts)} פוסטים")
+            except Exception as e:
+                self.metrics.errors += 1
+                print(f"   ⚠️ מסווג: שגיאה - {str(e)[:80]}")
+            finally:
+                self.metrics.batch_latencies.append(time.perf_counter() - started_at)
+        return None
+
+    def _remember(self, key: str, result: Optional[Dict]):
+        """שמירת תוצאה במטמון עם פינוי הישן ביותר"""
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.settings['cache_entries']:
+            self._cache.popitem(last=False)
+
+
+# פונקציות עזר
+def get_cascade(matcher: CandidateMatcher) -> Optional[ClassifierCascade]:
+    """קבלת cascade לפי LLM_CASCADE_SETTINGS, או None אם כבוי"""
+    settings = config.LLM_CASCADE_SETTINGS
+    if not settings['enabled']:
+        return None
+
+    if settings['endpoint']:
+        backend = HttpClassifierBackend(settings['endpoint'], settings['timeout_seconds'])
+    else:
+        backend = FunctionBackend()
+    return ClassifierCascade(matcher, backend)
+
+
+if __name__ == "__main__":
+    # בדיקה מול שרת סיווג מדומה מקומי
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class StandInClassifier(BaseHTTPRequestHandler):
+        """שרת מדומה: מועמד אם יש גוף ראשון בפוסט"""
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            time.sleep(0.05)  # סימולציה של זמן מודל
+            results = [
+                {"is_candidate": "אני" in text, "score": 8.0 if "אני" in text else 1.0, "keywords": ["stand-in"]}
+                for text in body['posts']
+            ]
+            payload = json.dumps({"results": results}, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), StandInClassifier)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_port}/classify"
+
+    test_posts = [
+        ("היי, אני מחפש עבודה באזור פתח תקווה. יש לי ניסיון במכירות ושירות לקוחות.", "דני כהן", None),
+        ("דרושים מיידי! חברתנו מחפשת עובדים למכירות", "חברת XYZ", None),
+        ("מחפש עבודה", "יוסי", None),
+        ("מחפש עבודה " + "פרטים על עצמי " * 40, "רון", None),
+        ("אני מחפש עבודה " + "פרטים על עצמי " * 40, "רונית", None),
+    ]
+
+    async def demo():
+        cascade = ClassifierCascade(CandidateMatcher(), HttpClassifierBackend(endpoint))
+        for _ in range(2):  # הריצה השנייה אמורה להגיע מהמטמון
+            analyses = await cascade.analyze_posts(test_posts)
+        for (text, author, _), analysis in zip(test_posts, analyses):
+            print(f"{author}: מועמד={analysis['is_candidate']} ציון={analysis['candidate_score']:.1f}")
+        print("\n📊 מדדי cascade:")
+        for key, value in cascade.metrics.summary().items():
+            print(f"  {key}: {value}")
+
+    asyncio.run(demo())
+    server.shutdown()
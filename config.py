@@ -430,7 +430,9 @@ BROWSER_SETTINGS = {
     "headless": False,  # להתחלה נראה את הדפדפן (לבדיקה)
     "slow_mo": 100,     # האטה של 100ms בין פעולות (מהיר יותר)
     "viewport": None,  # חלון מלא ללא חיתוך תצוגה
-    "user_agent": get_random_user_agent()  # ייבחר אקראית בכל הפעלה
+    "user_agent": get_random_user_agent(),  # ייבחר אקראית בכל הפעלה
+    # חילוץ פוסטים: page.evaluate אחד לכל העמוד; True - הדרך הישנה (locator לכל שדה) להשוואה
+    "legacy_dom_extraction": False,
 }
 
 # ======================================
@@ -447,6 +449,81 @@ FACEBOOK_CREDENTIALS = {
 # ======================================
 DATABASE_FILE = DATA_DIR / "job_bot.db"
 
+# כמה זמן לשמור מצבות (hash) של פוסטים שנמחקו בניקוי - מונע תגובה חוזרת לפוסט ישן
+TOMBSTONE_RETENTION_DAYS = 365
+
+DATABASE_SETTINGS = {
+    "journal_mode": "WAL",      # קוראים (--stats) וכותב (scheduler) לא חוסמים זה את זה
+    "synchronous": "NORMAL",    # בטוח ב-WAL, חוסך fsync בכל commit
+    "cache_size_kb": 16384,     # page cache של 16MB לחיבור
+    "busy_timeout_ms": 5000,    # המתנה לנעילה לפני "database is locked"
+    "auto_vacuum": "INCREMENTAL",  # מסד חדש; מסד קיים מומר בהרצת --retention הראשונה
+    "text_compression_level": 6,   # zlib לגוף הפוסטים בטבלת post_contents (1 מהיר - 9 קטן)
+}
+
+# מדיניות שמירת נתונים (python main.py --retention)
+# days - גיל מקסימלי; archive - שמירה ל-data/archive/<table>/<date>.jsonl.gz לפני מחיקה
+RETENTION_POLICIES = {
+    # source - התצוגה שממנה נקראות השורות לארכיון (עם הטקסט המלא מ-post_contents)
+    "scanned_posts": {"days": 30, "time_column": "scanned_at", "key": "id", "source": "scanned_posts_text",
+                      "archive": True, "tombstones": True},
+    "responses": {"days": 365, "time_column": "sent_at", "archive": True},
+    "error_log": {"days": 90, "time_column": "timestamp", "archive": True},
+    "hourly_rollups": {"days": 730, "time_column": "hour", "archive": True},
+    "analysis_cache": {"days": 30, "time_column": "created_at", "key": "text_hash"},
+    "post_tombstones": {"days": TOMBSTONE_RETENTION_DAYS, "time_column": "deleted_on"},
+}
+
+RETENTION_SETTINGS = {
+    "batch_size": 1000,              # שורות בטרנזקציה - נעילת כתיבה קצרה
+    "archive_dir": DATA_DIR / "archive",
+    "vacuum_pages_per_step": 2000,   # דפים בכל incremental_vacuum
+}
+
+# ייצוא לניתוח (python main.py --export) - Parquet אם pyarrow מותקן, אחרת JSONL דחוס
+EXPORT_SETTINGS = {
+    "export_dir": DATA_DIR / "exports",
+    "batch_size": 5000,        # שורות בכל קריאה מהמסד (זיכרון חסום)
+    "format": "auto",          # auto / parquet / jsonl
+    "max_open_files": 8,       # קבצי partition פתוחים בו-זמנית
+}
+
+# צבירת שגיאות בזיכרון - נכתבות בטרנזקציה אחת
+STATS_AGGREGATOR_SETTINGS = {
+    "flush_interval_seconds": 30,  # כתיבה לפחות פעם בחצי דקה
+    "max_pending": 100,            # או אחרי 100 רישומים
+}
+
+# מסנן בזיכרון (Bloom) ל-post_ids שכבר עובדו - נטען מ-scanned_posts בהפעלה
+SEEN_FILTER_SETTINGS = {
+    "enabled": True,
+    "expected_posts": 100000,      # גודל מינימלי (נבנה מחדש כשעוברים אותו)
+    "false_positive_rate": 0.01,   # 1% מה"אולי" נבדקים במסד לשווא
+}
+
+# ======================================
+# מטמון ניתוחים
+# ======================================
+ANALYSIS_CACHE_SETTINGS = {
+    "memory_entries": 10000,  # גודל ה-LRU בזיכרון
+    "persistent": True,       # שמירה גם בטבלת analysis_cache במסד הנתונים
+}
+
+# ======================================
+# מסווג חיצוני (LLM / מודל מקומי) לפוסטים באזור האפור
+# ======================================
+LLM_CASCADE_SETTINGS = {
+    "enabled": False,
+    # כתובת שרת סיווג (POST JSON {"posts": [...]}); ריק = analyze_with_llm המקומי
+    "endpoint": os.getenv("LLM_CLASSIFIER_URL", ""),
+    "ambiguous_score_min": 3.0,   # רק ציונים בטווח הזה עוברים למסווג
+    "ambiguous_score_max": 6.0,
+    "max_concurrency": 4,         # בקשות מקבילות למסווג
+    "batch_size": 8,              # פוסטים בבקשה אחת
+    "timeout_seconds": 10,        # זמן מקסימלי לבקשה
+    "cache_entries": 5000,        # מטמון תוצאות בזיכרון
+}
+
 # ======================================
 # הגדרות לוגים
 # ======================================
@@ -0,0 +1,295 @@
+"""
+ייצוא הדרגתי של פוסטים, תגובות וסיכומים שעתיים לקבצים לניתוח
+קריאה במנות מהמסד (זיכרון חסום), קבצים לפי תאריך, והמשך מה-watermark האחרון
+
+ה-watermark הוא המפתח של השורה האחרונה שיוצאה, ולכן שורה שהשתנתה אחרי
+שיוצאה (פוסט שקיבל ציון מחדש, סיכום שעתי שעודכן באיחור) לא מיוצאת שוב
+בייצוא הדרגתי - לעדכון שלהן צריך --full (אחרי מחיקת תיקיית הייצוא הקודמת).
+
+Usage:
+    python main.py --export                  # רק מה שנוסף מאז הייצוא הקודם
+    python main.py --export --full           # ייצוא מלא מחדש
+"""
+
+import gzip
+import json
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import config
+from database import DatabaseManager, get_db
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# מה מייצאים מכל טבלה:
+#   source - טבלה/תצוגה לקריאה; key - עמודות המיון וה-watermark (ייחודיות, לא משתנות)
+#   date_column - לפי מה מחולקים הקבצים; ready - תנאי לשורות שכבר לא ישתנו
+# ready מכסה רק את השינויים הצפויים; שורה שמשתנה אחרי שעברה את ה-watermark
+# (candidate_score אחרי --rescore, שגיאה חוזרת או תגובה שאושרה באיחור בשעה
+# שכבר יוצאה, בנייה מחדש של hourly_rollups) מתעדכנת רק ב---full
+EXPORTS = {
+    "scanned_posts": {
+        "source": "scanned_posts_text",
+        "key": ("id",),
+        "date_column": "scanned_at",
+        "exclude": ("text_hash",),
+    },
+    "responses": {
+        "source": "responses",
+        "key": ("id",),
+        "date_column": "sent_at",
+        # תגובה 'pending' עוד תתעדכן - הייצוא נעצר לפניה (אלא אם היא נשארה מקריסה)
+        "ready": """id < COALESCE((
+            SELECT MIN(id) FROM responses WHERE status = 'pending' AND sent_epoch > :stale_epoch
+        ), 9223372036854775807)""",
+    },
+    "hourly_rollups": {
+        "source": "hourly_rollups",
+        "key": ("hour", "group_name"),
+        "date_column": "hour",
+        # שעה שעוד לא הסתיימה ממשיכה להתעדכן
+        "ready": "hour < :current_hour",
+    },
+}
+
+WATERMARK_PREFIX = "export_watermark:"
+
+# טיפוסים מוצהרים ב-SQLite -> טיפוסי Parquet
+_ARROW_TYPES = {
+    "INTEGER": "int64",
+    "REAL": "float64",
+    "BOOLEAN": "bool_",
+    "BLOB": "binary",
+}
+
+
+def resolve_format(requested: str = None) -> str:
+    """parquet אם pyarrow זמין (או התבקש במפורש), אחרת jsonl"""
+    requested = requested or config.EXPORT_SETTINGS['format']
+    if requested == "parquet" and pa is None:
+        raise RuntimeError("ייצוא Parquet דורש pyarrow (pip install pyarrow)")
+    if requested == "auto":
+        return "parquet" if pa is not None else "jsonl"
+    return requested
+
+
+def iter_batches(db: DatabaseManager, spec: Dict, after: Optional[List], batch_size: int,
+                 params: Dict) -> Iterator[Tuple[List[str], List[tuple]]]:
+    """
+    generator של מנות שורות לפי סדר המפתח, החל מאחרי after
+
+    keyset pagination - כל מנה היא שאילתה קצרה משלה (WHERE key > last ... LIMIT),
+    כך שלא מחזיקים טרנזקציית קריאה פתוחה ולא את כל הטבלה בזיכרון.
+    """
+    key = spec['key']
+    conditions = [spec['ready']] if spec.get('ready') else []
+    last = list(after) if after else None
+
+    while True:
+        columns, rows = db.fetch_rows_after(spec['source'], key, last, batch_size, conditions, params)
+        if not rows:
+            return
+
+        key_indexes = [columns.index(column) for column in key]
+        last = [rows[-1][i] for i in key_indexes]
+        yield columns, rows
+
+        if len(rows) < batch_size:
+            return
+
+
+class PartitionWriter:
+    """
+    כתיבת שורות לקבצים לפי תאריך: <dir>/<table>/date=<YYYY-MM-DD>/part-<run>-<n>.<ext>
+
+    עד max_open קבצים פתוחים; partition שנסגר ונפתח שוב מקבל קובץ part חדש.
+    הקבצים נכתבים בשם זמני ומקבלים את שמם הסופי רק ב-commit(), כך שייצוא
+    שנכשל באמצע לא משאיר קבצים חלקיים (וה-watermark לא מתקדם).
+    """
+
+    def __init__(self, table_dir: Path, file_format: str, columns: List[str], declared_types: Dict[str, str],
+                 run_id: str, max_open: int = 8):
+        self.table_dir = table_dir
+        self.file_format = file_format
+        self.columns = columns
+        self.run_id = run_id
+        self.max_open = max_open
+        self._open: Dict[str, tuple] = {}
+        self._parts: Dict[str, int] = {}
+        self._files: List[Path] = []
+        self._bool_columns = [i for i, column in enumerate(columns) if declared_types.get(column) == "BOOLEAN"]
+        self._schema = None
+        if file_format == "parquet":
+            self._schema = pa.schema([
+                (column, getattr(pa, _ARROW_TYPES.get(declared_types.get(column, ""), "string"))())
+                for column in columns
+            ])
+
+    def _path(self, partition: str) -> Path:
+        part = self._parts.get(partition, 0)
+        self._parts[partition] = part + 1
+        extension = "parquet" if self.file_format == "parquet" else "jsonl.gz"
+        return self.table_dir / f"date={partition}" / f"part-{self.run_id}-{part}.{extension}"
+
+    def _writer(self, partition: str):
+        if partition in self._open:
+            # LRU - הכי פחות בשימוש נסגר ראשון
+            self._open[partition] = self._open.pop(partition)
+            return self._open[partition][1]
+
+        if len(self._open) >= self.max_open:
+            self._close(next(iter(self._open)))
+
+        path = self._path(partition)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(path.name + ".tmp")
+        if path.exists() or temp_path.exists():
+            raise FileExistsError(f"קובץ הייצוא כבר קיים: {path}")
+        if self.file_format == "parquet":
+            writer = pq.ParquetWriter(temp_path, self._schema, compression="zstd")
+        else:
+            writer = gzip.open(temp_path, "wt", encoding="utf-8")
+        self._open[partition] = (path, writer)
+        self._files.append(path)
+        return writer
+
+    def _close(self, partition: str):
+        _, writer = self._open.pop(partition)
+        writer.close()
+
+    def write(self, partition: str, rows: List[tuple]):
+        """כתיבת שורות (באותו partition)"""
+        if self._bool_columns:
+            rows = [
+                tuple(bool(value) if i in self._bool_columns and value is not None else value
+                      for i, value in enumerate(row))
+                for row in rows
+            ]
+        writer = self._writer(partition)
+        if self.file_format == "parquet":
+            arrays = [list(column) for column in zip(*rows)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+        else:
+            for row in rows:
+                writer.write(json.dumps(dict(zip(self.columns, row)), ensure_ascii=False, default=str) + "\n")
+
+    def commit(self) -> List[Path]:
+        """סגירת כל הקבצים ומתן השם הסופי (בלי לדרוס קובץ קיים)"""
+        for partition in list(self._open):
+            self._close(partition)
+        existing = [path for path in self._files if path.exists()]
+        if existing:
+            raise FileExistsError(f"קובץ הייצוא כבר קיים: {existing[0]}")
+        for path in self._files:
+            path.with_name(path.name + ".tmp").rename(path)
+        return self._files
+
+    def abort(self):
+        """סגירה ומחיקת הקבצים הזמניים"""
+        for partition in list(self._open):
+            try:
+                self._close(partition)
+            except Exception:
+                pass
+        for path in self._files:
+            path.with_name(path.name + ".tmp").unlink(missing_ok=True)
+
+
+def export_table(db: DatabaseManager, table: str, file_format: str, full: bool = False,
+                 settings: Dict = None) -> Dict:
+    """
+    ייצוא טבלה אחת מה-watermark שלה והלאה
+
+    Returns:
+        dict: מספר שורות, קבצים וה-watermark החדש
+    """
+    settings = {**config.EXPORT_SETTINGS, **(settings or {})}
+    spec = EXPORTS[table]
+    watermark_key = WATERMARK_PREFIX + table
+    stored = None if full else db.get_state(watermark_key)
+    after = json.loads(stored) if stored else None
+
+    now = datetime.now()
+    params = {
+        "stale_epoch": int(time.time()) - 3600,
+        "current_hour": now.isoformat()[:13],
+    }
+    exclude = set(spec.get('exclude', ()))
+    declared = db.column_types(spec['source'])
+    # ייחודי גם לשתי הרצות באותה שנייה (או במקביל) - שמות הקבצים לא מתנגשים
+    run_id = f"{now.strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+
+    writer = None
+    exported = 0
+    last_key = after
+    try:
+        for columns, rows in iter_batches(db, spec, after, settings['batch_size'], params):
+            key_indexes = [columns.index(column) for column in spec['key']]
+            last_key = [rows[-1][i] for i in key_indexes]
+
+            keep = [i for i, column in enumerate(columns) if column not in exclude]
+            if writer is None:
+                writer = PartitionWriter(
+                    Path(settings['export_dir']) / table, file_format,
+                    [columns[i] for i in keep], declared, run_id, settings['max_open_files'],
+                )
+
+            date_index = columns.index(spec['date_column'])
+            by_partition: Dict[str, List[tuple]] = {}
+            for row in rows:
+                partition = str(row[date_index] or "unknown")[:10]
+                by_partition.setdefault(partition, []).append(tuple(row[i] for i in keep))
+            for partition, partition_rows in by_partition.items():
+                writer.write(partition, partition_rows)
+            exported += len(rows)
+
+        files = writer.commit() if writer else []
+    except BaseException:
+        if writer:
+            writer.abort()
+        raise
+
+    # ה-watermark מתקדם רק אחרי שכל הקבצים נכתבו
+    if exported:
+        db.set_state(watermark_key, json.dumps(last_key, ensure_ascii=False))
+
+    return {"table": table, "rows": exported, "files": len(files), "watermark": last_key}
+
+
+def run_export(tables: List[str] = None, full: bool = False, file_format: str = None,
+               db: DatabaseManager = None) -> List[Dict]:
+    """
+    ייצוא כל הטבלאות (או רשימה נתונה)
+
+    Args:
+        tables: שמות מתוך EXPORTS (ברירת מחדל - כולן)
+        full: התעלמות מה-watermark וייצוא הכל מחדש
+        file_format: auto / parquet / jsonl
+    """
+    db = db or get_db()
+    file_format = resolve_format(file_format)
+    export_dir = Path(config.EXPORT_SETTINGS['export_dir'])
+    print(f"📦 מייצא ל-{export_dir} ({file_format}{', מלא' if full else ''})")
+
+    results = []
+    for table in tables or list(EXPORTS):
+        started = time.perf_counter()
+        result = export_table(db, table, file_format, full)
+        results.append(result)
+        print(f"   {table}: {result['rows']:,} שורות ב-{result['files']} קבצים "
+              f"({time.perf_counter() - started:.1f}s)")
+
+    return results
+
+
+if __name__ == "__main__":
+    run_export()
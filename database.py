@@ -4,286 +4,1584 @@
 """
 
 import sqlite3
-from datetime import datetime
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, List, Optional, Tuple
 import json
+import re
+import zlib
 import config
+from analysisCache import text_hash
+from seenFilter import SeenFilter, post_id_hash
+
+
+def compress_post_text(text: str, level: int = 6) -> bytes:
+    """דחיסת גוף פוסט לאחסון ב-post_contents"""
+    return zlib.compress(text.encode("utf-8"), level)
+
+
+def decompress_post_text(body: Optional[bytes]) -> Optional[str]:
+    """פתיחת גוף פוסט דחוס"""
+    if body is None:
+        return None
+    return zlib.decompress(body).decode("utf-8")
+
+
+def decode_post_rows(columns: List[str], rows: List[tuple]) -> Tuple[List[str], List[tuple]]:
+    """
+    שורות מ-scanned_posts_text עם הטקסט המלא: post_text (שורה ישנה) או הגוף
+    הדחוס מ-text_body, שנפתח כאן בפייתון - והעמודה text_body מושמטת
+
+    Returns:
+        tuple: (שמות העמודות, שורות) - כמו שהתקבלו אם אין בהן text_body
+    """
+    if "text_body" not in columns:
+        return columns, rows
+    text_index = columns.index("post_text")
+    body_index = columns.index("text_body")
+    keep = [i for i in range(len(columns)) if i != body_index]
+    decoded = []
+    for row in rows:
+        row = list(row)
+        if row[text_index] is None:
+            row[text_index] = decompress_post_text(row[body_index])
+        decoded.append(tuple(row[i] for i in keep))
+    return [columns[i] for i in keep], decoded
+
+
+def _snippet(text: Optional[str], terms: List[str], width: int = 120) -> str:
+    """קטע מהטקסט סביב ההופעה הראשונה של מילת חיפוש, עם המילים בסוגריים מרובעים"""
+    text = text or ""
+    if not terms:
+        return text[:width]
+    pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    first = pattern.search(text)
+    start = max(0, first.start() - width // 3) if first else 0
+    piece = pattern.sub(lambda match: f"[{match.group(0)}]", text[start:start + width])
+    return ("…" if start else "") + piece + ("…" if start + width < len(text) else "")
+
+
+# ======================================
+# מיגרציות סכמה
+# ======================================
+# כל שלב רץ פעם אחת לכל מסד, לפי PRAGMA user_version.
+# שלבים חדשים נוספים רק בסוף הרשימה; כל שלב חייב להיות בטוח גם על מסד
+# שנוצר לפני שהיה ניהול גרסאות (IF NOT EXISTS / _add_column_if_missing).
+
+def _add_column_if_missing(cursor: sqlite3.Cursor, table: str, column: str, definition: str) -> bool:
+    """ALTER TABLE ADD COLUMN למסדים שנוצרו לפני שהעמודה נוספה"""
+    columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column in columns:
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+
+def _migration_initial_schema(cursor: sqlite3.Cursor):
+    """הטבלאות המקוריות"""
+    # טבלת פוסטים שנסרקו
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS scanned_posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_id TEXT UNIQUE NOT NULL,
+            group_name TEXT NOT NULL,
+            author_name TEXT,
+            post_text TEXT,
+            post_url TEXT,
+            posted_at TEXT,
+            scanned_at TEXT NOT NULL,
+            is_candidate BOOLEAN DEFAULT 0,
+            candidate_score REAL DEFAULT 0.0,
+            matched_keywords TEXT
+        )
+    """)
+    
+    # טבלת תגובות ששלחנו
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_id TEXT NOT NULL,
+            response_text TEXT NOT NULL,
+            matched_job TEXT,
+            match_score REAL,
+            sent_at TEXT NOT NULL,
+            status TEXT DEFAULT 'sent',
+            FOREIGN KEY (post_id) REFERENCES scanned_posts(post_id)
+        )
+    """)
+    
+    # טבלת סטטיסטיקות יומיות (היסטוריה בלבד - הסטטיסטיקות נספרות היום ב-hourly_rollups)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL UNIQUE,
+            posts_scanned INTEGER DEFAULT 0,
+            candidates_found INTEGER DEFAULT 0,
+            responses_sent INTEGER DEFAULT 0,
+            errors INTEGER DEFAULT 0
+        )
+    """)
+    
+    # טבלת לוג שגיאות
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS error_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            error_type TEXT,
+            error_message TEXT,
+            context TEXT
+        )
+    """)
+
+
+def _migration_state_and_cache(cursor: sqlite3.Cursor):
+    """מצב פנימי ומטמון ניתוחים"""
+    # טבלת מצב פנימי (checkpoints, watermarks)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS bot_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+    
+    # מטמון ניתוחים לפי (hash טקסט, טביעת אצבע של הכללים)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS analysis_cache (
+            text_hash TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            result TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (text_hash, fingerprint)
+        ) WITHOUT ROWID
+    """)
+
+
+def _migration_time_indexes(cursor: sqlite3.Cursor):
+    """
+    sent_epoch ואינדקסים לשאילתות החמות
+
+    כל השאילתות על עמודות זמן כתובות כטווח (>= / <) על העמודה עצמה
+    ולא כ-DATE(column) = ?, כדי שהאינדקס ישמש אותן.
+    """
+    if _add_column_if_missing(cursor, "responses", "sent_epoch", "INTEGER"):
+        # sent_at נשמר בזמן מקומי - 'utc' ממיר אותו ל-epoch אמיתי
+        cursor.execute("""
+            UPDATE responses
+            SET sent_epoch = CAST(strftime('%s', sent_at, 'utc') AS INTEGER)
+            WHERE sent_epoch IS NULL
+        """)
+    
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_responses_post_id ON responses(post_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_responses_sent_at ON responses(sent_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_responses_sent_epoch ON responses(sent_epoch)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scanned_posts_scanned_at ON scanned_posts(scanned_at)")
+
+
+def _migration_post_tombstones(cursor: sqlite3.Cursor):
+    """
+    מצבות לפוסטים שנמחקו ב-cleanup_old_data - hash של 64 ביט ותאריך בלבד,
+    כדי שפוסט ישן לא ייסרק ויקבל תגובה שוב אחרי הניקוי
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS post_tombstones (
+            id_hash INTEGER PRIMARY KEY,
+            deleted_on TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_post_tombstones_deleted_on ON post_tombstones(deleted_on)")
+
+
+def _migration_error_occurrences(cursor: sqlite3.Cursor):
+    """שגיאות זהות באותו יום נאספות לשורה אחת עם מונה"""
+    _add_column_if_missing(cursor, "error_log", "occurrences", "INTEGER NOT NULL DEFAULT 1")
+    if _add_column_if_missing(cursor, "error_log", "last_seen", "TEXT"):
+        cursor.execute("UPDATE error_log SET last_seen = timestamp WHERE last_seen IS NULL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_error_log_type_time ON error_log(error_type, timestamp)")
+
+
+def _migration_post_contents(cursor: sqlite3.Cursor):
+    """
+    גוף הפוסטים בטבלה נפרדת, דחוס ולפי hash - טקסט זהה (שיתוף חוזר) נשמר פעם אחת
+
+    הטקסט הקיים ב-scanned_posts.post_text מועבר בנפרד ובמנות
+    (python main.py --migrate-post-text), כדי שהמיגרציה לא תנעל מסד גדול.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS post_contents (
+            text_hash TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            raw_size INTEGER NOT NULL
+        )
+    """)
+    _add_column_if_missing(cursor, "scanned_posts", "text_hash", "TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scanned_posts_text_hash ON scanned_posts(text_hash)")
+    
+    _create_posts_text_view(cursor)
+
+
+def _create_posts_text_view(cursor: sqlite3.Cursor):
+    """
+    scanned_posts יחד עם גוף הפוסט - SQL בלבד, כך שהתצוגה עובדת מכל חיבור sqlite3
+
+    post_text מלא רק בשורות ישנות שעוד לא הועברו; בשאר השורות הטקסט נמצא
+    דחוס (zlib) ב-text_body, ונפתח בפייתון (decode_post_rows).
+    """
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS scanned_posts_text AS
+        SELECT
+            p.id, p.post_id, p.group_name, p.author_name,
+            p.post_text, c.body AS text_body,
+            p.post_url, p.posted_at, p.scanned_at, p.is_candidate,
+            p.candidate_score, p.matched_keywords, p.text_hash
+        FROM scanned_posts p
+        LEFT JOIN post_contents c ON c.text_hash = p.text_hash
+    """)
+
+
+def _index_posts(cursor: sqlite3.Cursor, after_id: int = 0, batch_size: int = 1000) -> int:
+    """
+    הכנסת פוסטים ל-posts_fts (הטקסט נפתח בפייתון), במנות לפי id
+
+    Returns:
+        int: מספר הפוסטים שנכנסו לאינדקס
+    """
+    indexed = 0
+    while True:
+        rows = cursor.execute("""
+            SELECT id, post_text, text_body, author_name FROM scanned_posts_text
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (after_id, batch_size)).fetchall()
+        if not rows:
+            return indexed
+        cursor.executemany(
+            "INSERT INTO posts_fts (rowid, post_text, author_name) VALUES (?, ?, ?)",
+            [
+                (row_id, post_text if post_text is not None else decompress_post_text(body), author_name)
+                for row_id, post_text, body, author_name in rows
+            ],
+        )
+        indexed += len(rows)
+        after_id = rows[-1][0]
+
+
+def _migration_posts_fts(cursor: sqlite3.Cursor):
+    """
+    אינדקס FTS5 על טקסט הפוסטים (contentless - רק האינדקס, בלי עותק של הטקסט)
+
+    tokenizer מסוג trigram - חיפוש תת-מחרוזת, כך ש"משרה" נמצא גם בתוך
+    "והמשרה" (אותיות השימוש בעברית צמודות למילה). SQLite לפני 3.34 - unicode61.
+
+    הטקסט שמור דחוס, ולכן האינדקס מתעדכן מפייתון (add_scanned_posts) ולא
+    בטריגרים. פוסט שנמחק לא נמחק מהאינדקס (מחיקה מאינדקס contentless דורשת
+    את הטקסט המקורי בדיוק) - החיפוש מצטרף ל-scanned_posts ומסנן אותו,
+    והאינדקס נבנה מחדש כשהשורות האלה מצטברות (prune_search_index).
+    """
+    for tokenizer in ("trigram", "unicode61 remove_diacritics 2"):
+        try:
+            cursor.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+                    post_text, author_name,
+                    content='',
+                    tokenize='{tokenizer}'
+                )
+            """)
+            break
+        except sqlite3.OperationalError:
+            continue
+    
+    _index_posts(cursor)
+
+
+# הקשר השגיאה בכשל סריקת קבוצה (facebookScraper) - ממנו נגזרת הקבוצה ב-hourly_rollups
+GROUP_CONTEXT_PREFIX = "סריקת קבוצה: "
+
+# 10 דליי ציון: [0,1), [1,2) ... [9,10]
+SCORE_BUCKETS = 10
+_SCORE_COLUMNS = [f"score_{bucket}" for bucket in range(SCORE_BUCKETS)]
+
+
+def _score_bucket_sql(score: str) -> str:
+    return f"MIN({SCORE_BUCKETS - 1}, MAX(0, CAST(COALESCE({score}, 0) AS INTEGER)))"
+
+
+def _post_group_sql(post_id: str) -> str:
+    """הקבוצה של פוסט לפי post_id ('' אם הפוסט לא במסד)"""
+    return f"COALESCE((SELECT group_name FROM scanned_posts WHERE post_id = {post_id}), '')"
+
+
+def _error_group_sql(context: str) -> str:
+    """הקבוצה של שגיאה: מהקשר "סריקת קבוצה: X", או מהפוסט שה-post_id שלו הוא ההקשר"""
+    return f"""CASE
+        WHEN {context} LIKE '{GROUP_CONTEXT_PREFIX}%' THEN substr({context}, {len(GROUP_CONTEXT_PREFIX) + 1})
+        ELSE {_post_group_sql(context)}
+    END"""
+
+
+def _rollup_upsert_sql(hour: str, group: str, posts: str = "0", candidates: str = "0",
+                       responses: str = "0", errors: str = "0", score: str = None, sign: str = "") -> str:
+    """
+    INSERT ... ON CONFLICT שמוסיף (או מחסיר, sign='-') ערכים לשורה (שעה, קבוצה) אחת ב-hourly_rollups
+
+    score - ביטוי הציון של פוסט; מוסיף 1 לדלי המתאים
+    """
+    buckets = [
+        f"({_score_bucket_sql(score)} = {bucket})" if score else "0"
+        for bucket in range(SCORE_BUCKETS)
+    ]
+    values = [posts, candidates, responses, errors, *buckets]
+    columns = ["posts", "candidates", "responses", "errors", *_SCORE_COLUMNS]
+    return f"""
+        INSERT INTO hourly_rollups (hour, group_name, {", ".join(columns)})
+        VALUES ({hour}, {group}, {", ".join(f"{sign}({value})" for value in values)})
+        ON CONFLICT(hour, group_name) DO UPDATE SET
+            {", ".join(f"{column} = {column} + excluded.{column}" for column in columns)};
+    """
+
+
+def _rebuild_hourly_rollups(cursor: sqlite3.Cursor, since: str = None):
+    """
+    חישוב hourly_rollups מחדש מהטבלאות הגולמיות
+
+    כל מדד מחושב מחדש רק מהשעה הראשונה שעוד קיימת בטבלה שלו (או מ-since) -
+    שעות ישנות יותר, שהשורות הגולמיות שלהן כבר נמחקו ב-retention, נשמרות.
+    """
+    sources = [
+        ("scanned_posts", "scanned_at", ["posts", "candidates", *_SCORE_COLUMNS], f"""
+            SELECT substr(scanned_at, 1, 13), group_name, COUNT(*), SUM(is_candidate != 0),
+                   {", ".join(f"SUM({_score_bucket_sql('candidate_score')} = {b})" for b in range(SCORE_BUCKETS))}
+            FROM scanned_posts WHERE scanned_at >= ? GROUP BY 1, 2
+        """),
+        ("responses", "sent_at", ["responses"], """
+            SELECT substr(sent_at, 1, 13), COALESCE(group_name, ''), COUNT(*)
+            FROM responses WHERE status = 'sent' AND sent_at >= ? GROUP BY 1, 2
+        """),
+        ("error_log", "timestamp", ["errors"], """
+            SELECT substr(timestamp, 1, 13), COALESCE(group_name, ''), SUM(occurrences)
+            FROM error_log WHERE timestamp >= ? GROUP BY 1, 2
+        """),
+    ]
+    for table, time_column, columns, select in sources:
+        start = since or cursor.execute(f"SELECT MIN({time_column}) FROM {table}").fetchone()[0]
+        if start is None:
+            continue
+        start = start[:13]
+        cursor.execute(f"""
+            UPDATE hourly_rollups SET {", ".join(f"{column} = 0" for column in columns)}
+            WHERE hour >= ?
+        """, (start,))
+        cursor.execute(f"""
+            INSERT INTO hourly_rollups (hour, group_name, {", ".join(columns)})
+            {select.strip()} ORDER BY 1
+            ON CONFLICT(hour, group_name) DO UPDATE SET
+                {", ".join(f"{column} = excluded.{column}" for column in columns)}
+        """, (start,))
+    cursor.execute("""
+        DELETE FROM hourly_rollups
+        WHERE posts = 0 AND candidates = 0 AND responses = 0 AND errors = 0
+    """)
+
+
+def _migration_hourly_rollups(cursor: sqlite3.Cursor):
+    """
+    סיכומים לפי (שעה, קבוצה) - מתעדכנים בטריגרים בכל כתיבה
+
+    get_statistics סוכם את השורות של הטווח המבוקש - מספר שורות קבוע לשעה,
+    בלי קשר לגודל הטבלאות הגולמיות. מחיקה מהטבלאות הגולמיות (retention)
+    לא מורידה מהסיכומים.
+
+    הקבוצה של תגובה ושל שגיאה נשמרת בשורה עצמה (group_name) בזמן הכתיבה -
+    פוסטים נמחקים הרבה לפני התגובות והשגיאות, ובנייה מחדש של הסיכומים
+    לא יכולה לגזור אותה מהם.
+    """
+    for table, group in (("responses", _post_group_sql("post_id")), ("error_log", _error_group_sql("context"))):
+        if _add_column_if_missing(cursor, table, "group_name", "TEXT"):
+            cursor.execute(f"UPDATE {table} SET group_name = {group}")
+    
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS hourly_rollups (
+            hour TEXT NOT NULL,
+            group_name TEXT NOT NULL,
+            posts INTEGER NOT NULL DEFAULT 0,
+            candidates INTEGER NOT NULL DEFAULT 0,
+            responses INTEGER NOT NULL DEFAULT 0,
+            errors INTEGER NOT NULL DEFAULT 0,
+            {", ".join(f"{column} INTEGER NOT NULL DEFAULT 0" for column in _SCORE_COLUMNS)},
+            PRIMARY KEY (hour, group_name)
+        )
+    """)
+    
+    post_hour, post_group = "substr(new.scanned_at, 1, 13)", "COALESCE(new.group_name, '')"
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS scanned_posts_rollup_insert AFTER INSERT ON scanned_posts BEGIN
+            {_rollup_upsert_sql(post_hour, post_group, "1", "new.is_candidate != 0", score="new.candidate_score")}
+        END
+    """)
+    # ציון מחדש (rescore) מעביר את הפוסט בין דליים
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS scanned_posts_rollup_rescore
+        AFTER UPDATE OF is_candidate, candidate_score ON scanned_posts
+        WHEN (old.is_candidate != 0) IS NOT (new.is_candidate != 0)
+          OR {_score_bucket_sql("old.candidate_score")} != {_score_bucket_sql("new.candidate_score")}
+        BEGIN
+            {_rollup_upsert_sql("substr(old.scanned_at, 1, 13)", "COALESCE(old.group_name, '')",
+                                "0", "old.is_candidate != 0", score="old.candidate_score", sign="-")}
+            {_rollup_upsert_sql(post_hour, post_group, "0", "new.is_candidate != 0", score="new.candidate_score")}
+        END
+    """)
+    
+    response_group = "COALESCE(new.group_name, '')"
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS responses_rollup_insert AFTER INSERT ON responses
+        WHEN new.status = 'sent'
+        BEGIN
+            {_rollup_upsert_sql("substr(new.sent_at, 1, 13)", response_group, responses="1")}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS responses_rollup_status AFTER UPDATE OF status ON responses
+        WHEN (old.status = 'sent') IS NOT (new.status = 'sent')
+        BEGIN
+            {_rollup_upsert_sql("substr(new.sent_at, 1, 13)", response_group,
+                                responses="CASE WHEN new.status = 'sent' THEN 1 ELSE -1 END")}
+        END
+    """)
+    
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS error_log_rollup_insert AFTER INSERT ON error_log BEGIN
+            {_rollup_upsert_sql("substr(new.timestamp, 1, 13)", "COALESCE(new.group_name, '')",
+                                errors="new.occurrences")}
+        END
+    """)
+    _create_error_rollup_update_trigger(cursor)
+    
+    _rebuild_hourly_rollups(cursor)
+
+
+def _create_error_rollup_update_trigger(cursor: sqlite3.Cursor):
+    """
+    שגיאה חוזרת מעדכנת occurrences בשורה הקיימת - ההפרש נספר בשעה של
+    timestamp (ההופעה הראשונה), כמו ב-_rebuild_hourly_rollups, כך שבנייה
+    מחדש של הסיכומים נותנת בדיוק את אותן שורות
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS error_log_rollup_update AFTER UPDATE OF occurrences ON error_log BEGIN
+            {_rollup_upsert_sql("substr(new.timestamp, 1, 13)",
+                                "COALESCE(new.group_name, '')", errors="new.occurrences - old.occurrences")}
+        END
+    """)
+
+
+# (גרסה, תיאור, פונקציה) - לפי הסדר
+MIGRATIONS = [
+    (1, "initial schema", _migration_initial_schema),
+    (2, "bot_state and analysis_cache", _migration_state_and_cache),
+    (3, "responses.sent_epoch and time indexes", _migration_time_indexes),
+    (4, "post_tombstones", _migration_post_tombstones),
+    (5, "error_log occurrences", _migration_error_occurrences),
+    (6, "post_contents", _migration_post_contents),
+    (7, "posts_fts", _migration_posts_fts),
+    (8, "hourly_rollups", _migration_hourly_rollups),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
 
 
 class DatabaseManager:
-    """מנהל את מסד הנתונים של הבוט"""
+    """
+    מנהל את מסד הנתונים של הבוט
+
+    מחזיק חיבור SQLite אחד לאורך כל חיי האובייקט (WAL, synchronous=NORMAL,
+    page cache ו-busy_timeout לפי DATABASE_SETTINGS). החיבור משותף בין threads
+    ומוגן ב-RLock; סגירה עם close() או שימוש כ-context manager.
+    """
     
-    def __init__(self, db_path: Path = config.DATABASE_FILE):
+    # מספר מזהים מקסימלי בשאילתת IN אחת
+    IN_CHUNK_SIZE = 500
+    
+    def __init__(self, db_path: Path = config.DATABASE_FILE, settings: Dict = None,
+                 with_seen_filter: bool = True):
         self.db_path = db_path
+        self.settings = {**config.DATABASE_SETTINGS, **(settings or {})}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._depth = 0  # עומק קינון של transaction()
+        self._rollback_callbacks: List[Callable[[], None]] = []
+        # המסנן נטען בבדיקת הפוסטים הראשונה - פקודות שלא בודקות פוסטים לא משלמות עליו
+        self.seen_filter: Optional[SeenFilter] = None
+        self._seen_filter_enabled = with_seen_filter and config.SEEN_FILTER_SETTINGS['enabled']
         self.init_database()
     
+    def connect(self) -> sqlite3.Connection:
+        """פתיחת החיבור הקבוע (אם עוד לא פתוח) והגדרת ה-pragmas"""
+        with self._lock:
+            if self._conn is None:
+                conn = sqlite3.connect(
+                    self.db_path,
+                    timeout=self.settings['busy_timeout_ms'] / 1000,
+                    check_same_thread=False,
+                )
+                # auto_vacuum נקבע רק לפני יצירת הטבלה הראשונה (מסד קיים - retention.py)
+                conn.execute(f"PRAGMA auto_vacuum = {self.settings['auto_vacuum']}")
+                conn.execute(f"PRAGMA journal_mode = {self.settings['journal_mode']}")
+                conn.execute(f"PRAGMA synchronous = {self.settings['synchronous']}")
+                # ערך שלילי = גודל ב-KiB ולא במספר דפים
+                conn.execute(f"PRAGMA cache_size = -{int(self.settings['cache_size_kb'])}")
+                conn.execute(f"PRAGMA busy_timeout = {int(self.settings['busy_timeout_ms'])}")
+                conn.execute("PRAGMA foreign_keys = OFF")
+                conn.create_function("post_id_hash", 1, post_id_hash, deterministic=True)
+                self._conn = conn
+            return self._conn
+    
+    def close(self):
+        """סגירת החיבור (פתיחה מחדש אוטומטית בשימוש הבא)"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    def __enter__(self) -> "DatabaseManager":
+        self.connect()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        טרנזקציה על החיבור הקבוע - commit בסיום, rollback בשגיאה
+
+        קריאה מקוננת (למשל מתוך unit_of_work) מצטרפת לטרנזקציה החיצונית
+        כ-SAVEPOINT: שגיאה בבלוק הפנימי מבטלת רק את הכתיבות שלו וממשיכה
+        לבלוק החיצוני, וה-commit מתבצע רק כשהבלוק החיצוני ביותר מסתיים.
+        """
+        with self._lock:
+            conn = self.connect()
+            if self._depth:
+                # RELEASE של savepoint מחוץ לטרנזקציה פתוחה היה עושה commit
+                if not conn.in_transaction:
+                    conn.execute("BEGIN")
+                savepoint = f"nested_{self._depth}"
+                callbacks_start = len(self._rollback_callbacks)
+                conn.execute(f"SAVEPOINT {savepoint}")
+                self._depth += 1
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                    callbacks = self._rollback_callbacks[callbacks_start:]
+                    del self._rollback_callbacks[callbacks_start:]
+                    for callback in callbacks:
+                        callback()
+                    raise
+                else:
+                    conn.execute(f"RELEASE {savepoint}")
+                finally:
+                    self._depth -= 1
+                return
+            
+            self._depth = 1
+            self._rollback_callbacks = []
+            try:
+                with conn:
+                    yield conn
+            except BaseException:
+                callbacks, self._rollback_callbacks = self._rollback_callbacks, []
+                for callback in callbacks:
+                    callback()
+                raise
+            finally:
+                self._depth = 0
+                self._rollback_callbacks = []
+    
+    def on_rollback(self, callback: Callable[[], None]):
+        """
+        פעולה שתרוץ אם הטרנזקציה הפתוחה מתבטלת (כולל commit שנכשל)
+
+        למי שמרוקן מאגר בזיכרון לתוך טרנזקציה של מישהו אחר - כך הנתונים
+        חוזרים למאגר אם הטרנזקציה החיצונית לא נשמרה. מחוץ לטרנזקציה אין השפעה.
+        """
+        with self._lock:
+            if self._depth:
+                self._rollback_callbacks.append(callback)
+    
+    def unit_of_work(self):
+        """
+        קיבוץ כמה כתיבות לטרנזקציה אחת (commit ו-fsync אחד)
+
+        Example:
+            with db.unit_of_work():
+                db.add_scanned_posts(posts)
+                cache.flush(db)
+        """
+        return self.transaction()
+    
+    def _fetchone(self, query: str, params: Tuple = ()) -> Optional[Tuple]:
+        """שאילתת קריאה - שורה אחת"""
+        with self._lock:
+            return self.connect().execute(query, params).fetchone()
+    
+    def _fetchall(self, query: str, params: Tuple = ()) -> List[Tuple]:
+        """שאילתת קריאה - כל השורות"""
+        with self._lock:
+            return self.connect().execute(query, params).fetchall()
+    
     def init_database(self):
-        """יצירת הטבלאות במסד הנתונים"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # טבלת פוסטים שנסרקו
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS scanned_posts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                post_id TEXT UNIQUE NOT NULL,
-                group_name TEXT NOT NULL,
-                author_name TEXT,
-                post_text TEXT,
-                post_url TEXT,
-                posted_at TEXT,
-                scanned_at TEXT NOT NULL,
-                is_candidate BOOLEAN DEFAULT 0,
-                candidate_score REAL DEFAULT 0.0,
-                matched_keywords TEXT
-            )
-        """)
-        
-        # טבלת תגובות ששלחנו
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS responses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                post_id TEXT NOT NULL,
-                response_text TEXT NOT NULL,
-                matched_job TEXT,
-                match_score REAL,
-                sent_at TEXT NOT NULL,
-                status TEXT DEFAULT 'sent',
-                FOREIGN KEY (post_id) REFERENCES scanned_posts(post_id)
-            )
-        """)
-        
-        # טבלת סטטיסטיקות יומיות
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS daily_stats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL UNIQUE,
-                posts_scanned INTEGER DEFAULT 0,
-                candidates_found INTEGER DEFAULT 0,
-                responses_sent INTEGER DEFAULT 0,
-                errors INTEGER DEFAULT 0
-            )
-        """)
-        
-        # טבלת לוג שגיאות
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS error_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                error_type TEXT,
-                error_message TEXT,
-                context TEXT
-            )
-        """)
-        
-        conn.commit()
-        conn.close()
+        """
+        הבאת הסכמה לגרסה העדכנית
+
+        במסד מעודכן זו בדיקת מספר אחת (PRAGMA user_version). אחרת כל שלב
+        חסר ב-MIGRATIONS רץ בטרנזקציה משלו יחד עם עדכון הגרסה.
+        """
+        with self._lock:
+            conn = self.connect()
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+                return
+            
+            for version, description, migrate in MIGRATIONS:
+                # BEGIN IMMEDIATE - גם DDL בתוך הטרנזקציה, ותהליך אחר ממתין
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                        conn.rollback()
+                        continue
+                    migrate(conn.cursor())
+                    conn.execute(f"PRAGMA user_version = {int(version)}")
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                print(f"🗄️ מיגרציה {version}: {description}")
     
     def add_scanned_post(self, post_data: Dict) -> bool:
         """הוספת פוסט שנסרק למסד הנתונים"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT OR IGNORE INTO scanned_posts 
-                (post_id, group_name, author_name, post_text, post_url, 
-                 posted_at, scanned_at, is_candidate, candidate_score, matched_keywords)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
+        return self.add_scanned_posts([post_data]) is not None
+    
+    def add_scanned_posts(self, posts: List[Dict]) -> Optional[int]:
+        """
+        הוספת אצווה של פוסטים בפקודת executemany אחת
+
+        Returns:
+            int: מספר הפוסטים החדשים שנוספו (None בשגיאה)
+
+        בתוך unit_of_work השגיאה לא נבלעת - היא מבטלת את כל הטרנזקציה
+        החיצונית (פוסטים, מונים ושגיאות של הקבוצה יחד).
+        """
+        scanned_at = datetime.now().isoformat()
+        level = self.settings['text_compression_level']
+        contents = {}
+        rows = []
+        for post_data in posts:
+            post_text = post_data.get('post_text')
+            content_hash = None
+            if post_text is not None:
+                content_hash = text_hash(post_text)
+                if content_hash not in contents:
+                    contents[content_hash] = (
+                        content_hash, compress_post_text(post_text, level), len(post_text.encode("utf-8"))
+                    )
+            rows.append((
                 post_data.get('post_id'),
                 post_data.get('group_name'),
                 post_data.get('author_name'),
-                post_data.get('post_text'),
+                content_hash,
                 post_data.get('post_url'),
                 post_data.get('posted_at'),
-                datetime.now().isoformat(),
+                scanned_at,
                 post_data.get('is_candidate', False),
                 post_data.get('candidate_score', 0.0),
                 json.dumps(post_data.get('matched_keywords', []))
             ))
-            
-            conn.commit()
-            conn.close()
-            return True
+        
+        with self._lock:
+            nested = bool(self._depth)
+        try:
+            with self.transaction() as conn:
+                conn.executemany("""
+                    INSERT OR IGNORE INTO post_contents (text_hash, body, raw_size)
+                    VALUES (?, ?, ?)
+                """, list(contents.values()))
+                # id הוא AUTOINCREMENT - כל שורה מעל ה-id הגבוה הקודם נוספה עכשיו
+                last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM scanned_posts").fetchone()[0]
+                conn.executemany("""
+                    INSERT OR IGNORE INTO scanned_posts 
+                    (post_id, group_name, author_name, text_hash, post_url, 
+                     posted_at, scanned_at, is_candidate, candidate_score, matched_keywords)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                new_ids = conn.execute(
+                    "SELECT id, post_id FROM scanned_posts WHERE id > ?", (last_id,)
+                ).fetchall()
+                
+                # אינדקס החיפוש - מהטקסט שכבר בזיכרון (בלי לפתוח את הגוף הדחוס)
+                by_post_id = {post_data.get('post_id'): post_data for post_data in posts}
+                conn.executemany(
+                    "INSERT INTO posts_fts (rowid, post_text, author_name) VALUES (?, ?, ?)",
+                    [
+                        (row_id, by_post_id[post_id].get('post_text'), by_post_id[post_id].get('author_name'))
+                        for row_id, post_id in new_ids
+                    ],
+                )
+                self._remember_seen([row[0] for row in rows if row[0]])
+                return len(new_ids)
         except Exception as e:
-            print(f"❌ שגיאה בהוספת פוסט למסד נתונים: {e}")
+            if nested:
+                raise
+            print(f"❌ שגיאה בהוספת פוסטים למסד נתונים: {e}")
+            return None
+    
+    def get_post_text(self, post_id: str) -> Optional[str]:
+        """טקסט הפוסט המלא (מ-post_contents, או מ-post_text בשורה שעוד לא הועברה)"""
+        row = self._fetchone("SELECT post_text, text_body FROM scanned_posts_text WHERE post_id = ?", (post_id,))
+        if not row:
+            return None
+        return row[0] if row[0] is not None else decompress_post_text(row[1])
+    
+    def search_posts(self, query: str, filters: Dict = None, limit: int = 50) -> List[Dict]:
+        """
+        חיפוש טקסט חופשי בפוסטים השמורים (FTS5)
+
+        כל מילה בשאילתה חייבת להופיע (כתת-מחרוזת) בטקסט או בשם המחבר.
+        מילים קצרות מ-3 תווים לא נכנסות לאינדקס ה-trigram ונבדקות ישירות
+        על הטקסט של השורות שנמצאו (אחרי פתיחת הגוף הדחוס, במנות).
+
+        Args:
+            query: מילים לחיפוש
+            filters: group_name, is_candidate, min_score, since, until (לפי scanned_at)
+            limit: מספר תוצאות מקסימלי
+
+        Returns:
+            list: פוסטים תואמים, הרלוונטיים ביותר קודם
+
+        Example:
+            db.search_posts("משרת", {"is_candidate": True, "since": "2024-01-01"})
+        """
+        filters = dict(filters or {})
+        conditions, params = [], []
+        
+        terms = query.split()
+        long_terms = [term for term in terms if len(term) >= 3]
+        short_terms = [term for term in terms if len(term) < 3]
+        if long_terms:
+            # כל מילה במירכאות - גרש וגרשיים בעברית (ת"א) לא יתפרשו כתחביר FTS
+            conditions.append("posts_fts MATCH ?")
+            params.append(" ".join('"' + term.replace('"', '""') + '"' for term in long_terms))
+        
+        columns = {
+            "group_name": "p.group_name = ?",
+            "is_candidate": "p.is_candidate = ?",
+            "min_score": "p.candidate_score >= ?",
+            "since": "p.scanned_at >= ?",
+            "until": "p.scanned_at < ?",
+        }
+        unknown = set(filters) - set(columns)
+        if unknown:
+            raise ValueError(f"unknown filters: {sorted(unknown)}")
+        for name, value in filters.items():
+            conditions.append(columns[name])
+            params.append(int(value) if name == "is_candidate" else value)
+        
+        where = " AND ".join(conditions) or "1"
+        select = """
+            SELECT p.post_id, p.group_name, p.author_name, p.scanned_at, p.is_candidate,
+                   p.candidate_score, p.post_url, p.post_text, p.text_body
+        """
+        if long_terms:
+            # JOIN מסנן גם פוסטים שנמחקו ועדיין באינדקס
+            query_sql = f"""
+                {select}
+                FROM posts_fts
+                JOIN scanned_posts_text p ON p.id = posts_fts.rowid
+                WHERE {where}
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+            """
+        else:
+            # בלי מילה שמתאימה לאינדקס - סריקה (רק עם מילים קצרות או פילטרים בלבד)
+            query_sql = f"""
+                {select}
+                FROM scanned_posts_text p
+                WHERE {where}
+                ORDER BY p.scanned_at DESC
+                LIMIT ? OFFSET ?
+            """
+        
+        # עם מילים קצרות חלק מהשורות נפסלות אחרי הקריאה - קוראים במנות עד שיש limit
+        page_size = max(limit * 4, 200) if short_terms else limit
+        results = []
+        offset = 0
+        while len(results) < limit:
+            rows = self._fetchall(query_sql, (*params, page_size, offset))
+            for row in rows:
+                post_text = row[7] if row[7] is not None else decompress_post_text(row[8])
+                if not all(term in (post_text or "") or term in (row[2] or "") for term in short_terms):
+                    continue
+                results.append({
+                    "post_id": row[0],
+                    "group_name": row[1],
+                    "author_name": row[2],
+                    "scanned_at": row[3],
+                    "is_candidate": bool(row[4]),
+                    "candidate_score": row[5],
+                    "post_url": row[6],
+                    "snippet": _snippet(post_text, terms),
+                })
+                if len(results) >= limit:
+                    break
+            if len(rows) < page_size:
+                break
+            offset += page_size
+        
+        return results
+    
+    def rebuild_search_index(self) -> int:
+        """
+        בנייה מחדש של אינדקס החיפוש מכל scanned_posts (פוסטים שנוספו ישירות
+        ב-SQL, בלי add_scanned_posts, וניקוי פוסטים שנמחקו)
+
+        Returns:
+            int: מספר הפוסטים באינדקס
+        """
+        with self.transaction() as conn:
+            conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('delete-all')")
+            return _index_posts(conn.cursor())
+    
+    def prune_search_index(self, max_stale_ratio: float = 0.25) -> bool:
+        """
+        בנייה מחדש של אינדקס החיפוש אם הצטברו בו יותר מדי פוסטים שנמחקו
+
+        Returns:
+            bool: True אם האינדקס נבנה מחדש
+        """
+        indexed = self._fetchone("SELECT COUNT(*) FROM posts_fts")[0]
+        posts = self._fetchone("SELECT COUNT(*) FROM scanned_posts")[0]
+        if indexed - posts <= max_stale_ratio * max(indexed, 1):
             return False
+        self.rebuild_search_index()
+        return True
+    
+    def migrate_post_text(self, batch_size: int = 1000) -> Dict:
+        """
+        העברה חד-פעמית של scanned_posts.post_text ל-post_contents
+
+        כל מנה בטרנזקציה משלה, כך שאפשר לעצור ולהמשיך (שורה שהועברה
+        כבר לא מחזיקה post_text).
+
+        Returns:
+            dict: מספר פוסטים שהועברו, גוף ייחודי חדש, בתים לפני ואחרי דחיסה
+        """
+        level = self.settings['text_compression_level']
+        result = {"posts": 0, "contents": 0, "raw_bytes": 0, "stored_bytes": 0}
+        last_id = 0
+        while True:
+            rows = self._fetchall("""
+                SELECT id, post_text FROM scanned_posts
+                WHERE post_text IS NOT NULL AND id > ?
+                ORDER BY id
+                LIMIT ?
+            """, (last_id, batch_size))
+            if not rows:
+                break
+            
+            contents = {}
+            updates = []
+            for row_id, post_text in rows:
+                content_hash = text_hash(post_text)
+                if content_hash not in contents:
+                    contents[content_hash] = (
+                        content_hash, compress_post_text(post_text, level), len(post_text.encode("utf-8"))
+                    )
+                updates.append((content_hash, row_id))
+                result["raw_bytes"] += len(post_text.encode("utf-8"))
+            
+            with self.transaction() as conn:
+                before = conn.total_changes
+                conn.executemany("""
+                    INSERT OR IGNORE INTO post_contents (text_hash, body, raw_size)
+                    VALUES (?, ?, ?)
+                """, list(contents.values()))
+                inserted = conn.total_changes - before
+                conn.executemany("""
+                    UPDATE scanned_posts SET text_hash = ?, post_text = NULL WHERE id = ?
+                """, updates)
+            
+            result["posts"] += len(rows)
+            result["contents"] += inserted
+            last_id = rows[-1][0]
+        
+        result["stored_bytes"] = self._fetchone("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM post_contents")[0]
+        return result
+    
+    def prune_post_contents(self) -> int:
+        """מחיקת גופי פוסטים שאף שורה ב-scanned_posts כבר לא מפנה אליהם"""
+        with self.transaction() as conn:
+            return conn.execute("""
+                DELETE FROM post_contents
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM scanned_posts WHERE scanned_posts.text_hash = post_contents.text_hash
+                )
+            """).rowcount
+    
+    def storage_bytes(self) -> int:
+        """גודל הנתונים במסד בפועל (דפים בשימוש, בלי דפים פנויים)"""
+        page_count, = self._fetchone("PRAGMA page_count")
+        freelist_count, = self._fetchone("PRAGMA freelist_count")
+        page_size, = self._fetchone("PRAGMA page_size")
+        return (page_count - freelist_count) * page_size
+    
+    def count_rows_before(self, table: str, time_column: str, cutoff: str) -> int:
+        """מספר השורות בטבלה שזמנן לפני cutoff"""
+        return self._fetchone(f"SELECT COUNT(*) FROM {table} WHERE {time_column} < ?", (cutoff,))[0]
+    
+    def fetch_rows_before(self, source: str, key: str, time_column: str, cutoff: str,
+                          limit: int) -> Tuple[List[str], List, List[tuple]]:
+        """
+        מנה של השורות הישנות ביותר (לפי time_column) שזמנן לפני cutoff
+        (מ-scanned_posts_text - עם post_text מלא, בלי text_body)
+
+        Args:
+            source: טבלה או תצוגה לקריאה
+            key: עמודה שמזהה את השורה בטבלה עצמה (למחיקה)
+
+        Returns:
+            tuple: (שמות העמודות, מפתחות, שורות)
+        """
+        with self._lock:
+            cursor = self.connect().execute(f"""
+                SELECT {key} AS _row_key, * FROM {source}
+                WHERE {time_column} < ?
+                ORDER BY {time_column}
+                LIMIT ?
+            """, (cutoff, limit))
+            columns = [description[0] for description in cursor.description][1:]
+            rows = cursor.fetchall()
+        # מ-scanned_posts_text - עם הטקסט המלא במקום הגוף הדחוס
+        columns, decoded = decode_post_rows(columns, [row[1:] for row in rows])
+        return columns, [row[0] for row in rows], decoded
+    
+    def fetch_rows_after(self, source: str, key: Tuple[str, ...], after: Optional[List], limit: int,
+                         conditions: List[str] = None, params: Dict = None) -> Tuple[List[str], List[tuple]]:
+        """
+        מנה של שורות לפי סדר המפתח, החל מאחרי after (keyset pagination)
+        (מ-scanned_posts_text - עם post_text מלא, בלי text_body)
+
+        Args:
+            key: עמודות המיון - ייחודיות; מפתח מרובה עמודות מושווה כ-row value
+            after: ערכי המפתח של השורה האחרונה במנה הקודמת (None - מההתחלה)
+            conditions: תנאי WHERE נוספים, עם פרמטרים בשם מתוך params
+
+        Returns:
+            tuple: (שמות העמודות, שורות)
+        """
+        where = list(conditions or [])
+        query_params = dict(params or {})
+        if after is not None:
+            placeholders = ", ".join(f":last_{i}" for i in range(len(key)))
+            where.append(f"({', '.join(key)}) > ({placeholders})" if len(key) > 1 else f"{key[0]} > :last_0")
+            query_params.update({f"last_{i}": value for i, value in enumerate(after)})
+        
+        with self._lock:
+            cursor = self.connect().execute(f"""
+                SELECT * FROM {source}
+                {"WHERE " + " AND ".join(where) if where else ""}
+                ORDER BY {", ".join(key)}
+                LIMIT :limit
+            """, {**query_params, "limit": limit})
+            columns = [description[0] for description in cursor.description]
+            rows = cursor.fetchall()
+        return decode_post_rows(columns, rows)
+    
+    def column_types(self, source: str) -> Dict[str, str]:
+        """טיפוס מוצהר לכל עמודה (גם בתצוגה - לפי עמודת המקור)"""
+        return {row[1]: (row[2] or "").upper() for row in self._fetchall(f"PRAGMA table_info({source})")}
+    
+    def delete_rows(self, table: str, key: str, keys: List, tombstones: bool = False) -> int:
+        """
+        מחיקת שורות לפי מפתח
+
+        Args:
+            tombstones: מצבה ב-post_tombstones לכל פוסט שנמחק (רק ל-scanned_posts),
+                        כדי שלא ייסרק ויקבל תגובה שוב
+        """
+        if not keys:
+            return 0
+        placeholders = ",".join("?" * len(keys))
+        with self.transaction() as conn:
+            if tombstones:
+                conn.execute(f"""
+                    INSERT OR IGNORE INTO post_tombstones (id_hash, deleted_on)
+                    SELECT post_id_hash(post_id), ? FROM {table} WHERE {key} IN ({placeholders})
+                """, (datetime.now().date().isoformat(), *keys))
+            return conn.execute(f"DELETE FROM {table} WHERE {key} IN ({placeholders})", keys).rowcount
+    
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        מעבר ל-auto_vacuum=INCREMENTAL במסד שנוצר בלעדיו (VACUUM מלא חד-פעמי)
+
+        Returns:
+            bool: True אם בוצעה המרה
+        """
+        if self._fetchone("PRAGMA auto_vacuum")[0] == 2:
+            return False
+        
+        print("🧹 מעביר את המסד ל-auto_vacuum=INCREMENTAL (VACUUM מלא חד-פעמי)...")
+        with self._lock:
+            conn = self.connect()
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        return True
+    
+    def incremental_vacuum(self, pages_per_step: int) -> int:
+        """
+        החזרת דפים פנויים למערכת הקבצים במנות קטנות (נעילת כתיבה קצרה בכל מנה)
+
+        Returns:
+            int: מספר הבתים שהוחזרו
+        """
+        page_size = self._fetchone("PRAGMA page_size")[0]
+        pages_before = self._fetchone("PRAGMA page_count")[0]
+        while True:
+            free_pages = self._fetchone("PRAGMA freelist_count")[0]
+            if not free_pages:
+                break
+            with self._lock:
+                # executescript מריץ את ה-PRAGMA עד הסוף; execute() משחרר רק דף אחד לכל step
+                self.connect().executescript(f"PRAGMA incremental_vacuum({int(min(free_pages, pages_per_step))})")
+            if self._fetchone("PRAGMA freelist_count")[0] >= free_pages:
+                break
+        return (pages_before - self._fetchone("PRAGMA page_count")[0]) * page_size
+    
+    def load_seen_filter(self):
+        """
+        בניית מסנן ה-post_ids בזיכרון מכל scanned_posts ו-post_tombstones
+
+        הגודל מחושב לפי הגדול מבין expected_posts ופי 2 ממספר הפוסטים הקיים,
+        כך שיש מקום לגדילה עד הבנייה מחדש הבאה.
+
+        המסנן מכיר רק את מה שהיה במסד בזמן הטעינה ואת ההכנסות של המופע הזה -
+        פוסט שנכתב בתהליך או חיבור אחר נראה "לא עובד" עד הטעינה הבאה
+        (הסורק טוען מחדש בתחילת כל סשן).
+        """
+        settings = config.SEEN_FILTER_SETTINGS
+        with self._lock:
+            existing = self._fetchone("""
+                SELECT (SELECT COUNT(*) FROM scanned_posts) + (SELECT COUNT(*) FROM post_tombstones)
+            """)[0]
+            seen_filter = SeenFilter(
+                max(settings['expected_posts'], existing * 2),
+                settings['false_positive_rate'],
+            )
+            for (post_id,) in self.connect().execute("SELECT post_id FROM scanned_posts"):
+                seen_filter.add(post_id)
+            for (id_hash,) in self.connect().execute("SELECT id_hash FROM post_tombstones"):
+                seen_filter.add_hash(id_hash)
+            self.seen_filter = seen_filter
+    
+    def refresh_seen_filter(self):
+        """טעינת המסנן מחדש מהמסד (אם מופעל) - למשל בתחילת סשן סריקה"""
+        if self._seen_filter_enabled:
+            self.load_seen_filter()
+    
+    def _loaded_seen_filter(self) -> Optional[SeenFilter]:
+        """המסנן - נטען בשימוש הראשון (None אם כבוי)"""
+        if self.seen_filter is None and self._seen_filter_enabled:
+            with self._lock:
+                if self.seen_filter is None:
+                    self.load_seen_filter()
+        return self.seen_filter
+    
+    def _remember_seen(self, post_ids: List[str]):
+        """עדכון המסנן אחרי הכנסה (נבנה מחדש אם עבר את הקיבולת)"""
+        if self.seen_filter is None:
+            return
+        self.seen_filter.add_many(post_ids)
+        if self.seen_filter.is_saturated:
+            self.load_seen_filter()
     
     def is_post_processed(self, post_id: str) -> bool:
         """בדיקה אם פוסט כבר עובד"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT id FROM scanned_posts WHERE post_id = ?", (post_id,))
-        result = cursor.fetchone()
+        seen_filter = self._loaded_seen_filter()
+        if seen_filter is not None and not seen_filter.might_contain(post_id):
+            return False
         
-        conn.close()
+        result = self._fetchone("""
+            SELECT 1 FROM scanned_posts WHERE post_id = ?
+            UNION ALL
+            SELECT 1 FROM post_tombstones WHERE id_hash = ?
+            LIMIT 1
+        """, (post_id, post_id_hash(post_id)))
+        if result is None and seen_filter is not None:
+            seen_filter.record_false_positive()
         return result is not None
     
-    def has_responded_to_post(self, post_id: str) -> bool:
-        """בדיקה אם כבר הגבנו לפוסט זה"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def filter_unprocessed(self, post_ids: List[str]) -> set:
+        """
+        בדיקת "כבר עובד" לאצווה שלמה של פוסטים
+
+        Returns:
+            set: ה-post_ids שעוד לא נשמרו במסד
+        """
+        unique_ids = list(dict.fromkeys(post_ids))
         
-        cursor.execute("SELECT id FROM responses WHERE post_id = ?", (post_id,))
-        result = cursor.fetchone()
+        # רק מזהים שהמסנן לא שולל בוודאות נבדקים מול המסד
+        seen_filter = self._loaded_seen_filter()
+        candidates = unique_ids
+        if seen_filter is not None:
+            candidates = [post_id for post_id in unique_ids if seen_filter.might_contain(post_id)]
         
-        conn.close()
+        seen = set()
+        # IN במנות - מתחת למגבלת המשתנים של SQLite גם בגרסאות ישנות (999)
+        for start in range(0, len(candidates), self.IN_CHUNK_SIZE):
+            chunk = candidates[start:start + self.IN_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            seen.update(row[0] for row in self._fetchall(
+                f"SELECT post_id FROM scanned_posts WHERE post_id IN ({placeholders})", tuple(chunk)
+            ))
+        
+        # מה שלא נמצא בפוסטים - אולי נמחק בניקוי ונשארה לו מצבה
+        remaining = {post_id_hash(post_id): post_id for post_id in candidates if post_id not in seen}
+        hashes = list(remaining)
+        for start in range(0, len(hashes), self.IN_CHUNK_SIZE):
+            chunk = hashes[start:start + self.IN_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            seen.update(remaining[row[0]] for row in self._fetchall(
+                f"SELECT id_hash FROM post_tombstones WHERE id_hash IN ({placeholders})", tuple(chunk)
+            ))
+        
+        if seen_filter is not None:
+            seen_filter.record_false_positive(len(candidates) - len(seen))
+        return set(unique_ids) - seen
+    
+    def has_responded_to_post(self, post_id: str) -> bool:
+        """בדיקה אם כבר הגבנו לפוסט זה"""
+        result = self._fetchone("SELECT 1 FROM responses WHERE post_id = ? LIMIT 1", (post_id,))
         return result is not None
     
     def add_response(self, response_data: Dict) -> bool:
         """הוספת תגובה ששלחנו"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO responses 
-                (post_id, response_text, matched_job, match_score, sent_at, status)
-                VALUES (?, ?, ?, ?, ?, ?)
+            sent_at = datetime.now()
+            with self.transaction() as conn:
+                conn.execute(f"""
+                    INSERT INTO responses 
+                    (post_id, response_text, matched_job, match_score, sent_at, sent_epoch, status, group_name)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, {_post_group_sql("?")})
+                """, (
+                    response_data.get('post_id'),
+                    response_data.get('response_text'),
+                    response_data.get('matched_job'),
+                    response_data.get('match_score'),
+                    sent_at.isoformat(),
+                    int(sent_at.timestamp()),
+                    response_data.get('status', 'sent'),
+                    response_data.get('post_id'),
+                ))
+            return True
+        except Exception as e:
+            print(f"❌ שגיאה בהוספת תגובה למסד נתונים: {e}")
+            return False
+    
+    def reserve_response(self, post_id: str) -> Tuple[int, int]:
+        """
+        שמירת מקום לתגובה (status='pending') לפני השליחה בפועל
+
+        אם התהליך קורס בין השליחה לאישור, השורה נשארת 'pending' - נספרת
+        במגבלות ובבדיקת "כבר הגבנו", כך שלא חורגים מהמכסה ולא מגיבים פעמיים.
+
+        Returns:
+            tuple: (id השורה, sent_epoch)
+        """
+        sent_at = datetime.now()
+        epoch = int(sent_at.timestamp())
+        with self.transaction() as conn:
+            cursor = conn.execute(f"""
+                INSERT INTO responses (post_id, response_text, sent_at, sent_epoch, status, group_name)
+                VALUES (:post_id, '', :sent_at, :epoch, 'pending', {_post_group_sql(":post_id")})
+            """, {"post_id": post_id, "sent_at": sent_at.isoformat(), "epoch": epoch})
+            return cursor.lastrowid, epoch
+    
+    def confirm_response(self, reservation_id: int, response_data: Dict):
+        """עדכון שורת ה-pending לתגובה שנשלחה"""
+        with self.transaction() as conn:
+            conn.execute("""
+                UPDATE responses
+                SET response_text = ?, matched_job = ?, match_score = ?, status = ?
+                WHERE id = ?
             """, (
-                response_data.get('post_id'),
                 response_data.get('response_text'),
                 response_data.get('matched_job'),
                 response_data.get('match_score'),
-                datetime.now().isoformat(),
-                response_data.get('status', 'sent')
+                response_data.get('status', 'sent'),
+                reservation_id,
             ))
-            
-            conn.commit()
-            conn.close()
-            return True
-        except Exception as e:
-            print(f"❌ שגיאה בהוספת תגובה למסד נתונים: {e}")
-            return False
     
-    def get_daily_response_count(self, date: str = None) -> int:
-        """קבלת מספר התגובות שנשלחו היום"""
+    def release_response(self, reservation_id: int):
+        """ביטול שמירת מקום של תגובה שלא נשלחה"""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM responses WHERE id = ? AND status = 'pending'", (reservation_id,))
+    
+    def get_daily_response_count(self, date: str = None, statuses: Tuple[str, ...] = None) -> int:
+        """
+        קבלת מספר התגובות שנשלחו היום
+
+        Args:
+            date: תאריך (ברירת מחדל היום)
+            statuses: רק תגובות בסטטוסים אלה (ברירת מחדל - כולן)
+        """
         if date is None:
             date = datetime.now().date().isoformat()
+        next_date = (datetime.fromisoformat(date) + timedelta(days=1)).date().isoformat()
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT COUNT(*) FROM responses 
-            WHERE DATE(sent_at) = ?
-        """, (date,))
-        
-        count = cursor.fetchone()[0]
-        conn.close()
-        
-        return count
+        # טווח על sent_at (ISO ממוין לקסיקוגרפית) - משתמש ב-idx_responses_sent_at
+        query = "SELECT COUNT(*) FROM responses WHERE sent_at >= ? AND sent_at < ?"
+        params = (date, next_date)
+        if statuses:
+            query += f" AND status IN ({','.join('?' * len(statuses))})"
+            params += tuple(statuses)
+        return self._fetchone(query, params)[0]
     
-    def update_daily_stats(self, posts_scanned: int = 0, candidates_found: int = 0, 
-                          responses_sent: int = 0, errors: int = 0):
-        """עדכון סטטיסטיקות יומיות"""
-        today = datetime.now().date().isoformat()
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO daily_stats (date, posts_scanned, candidates_found, responses_sent, errors)
-            VALUES (?, ?, ?, ?, ?)
-            ON CONFLICT(date) DO UPDATE SET
-                posts_scanned = posts_scanned + ?,
-                candidates_found = candidates_found + ?,
-                responses_sent = responses_sent + ?,
-                errors = errors + ?
-        """, (today, posts_scanned, candidates_found, responses_sent, errors,
-              posts_scanned, candidates_found, responses_sent, errors))
-        
-        conn.commit()
-        conn.close()
+    def get_response_epochs_since(self, epoch: int, statuses: Tuple[str, ...] = ("sent", "pending")) -> List[int]:
+        """זמני התגובות (sent_epoch) מאז epoch, לפי הסדר"""
+        return [row[0] for row in self._fetchall(f"""
+            SELECT sent_epoch FROM responses
+            WHERE sent_epoch >= ? AND status IN ({','.join('?' * len(statuses))})
+            ORDER BY sent_epoch
+        """, (epoch, *statuses))]
     
     def log_error(self, error_type: str, error_message: str, context: str = ""):
         """רישום שגיאה"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO error_log (timestamp, error_type, error_message, context)
-            VALUES (?, ?, ?, ?)
-        """, (datetime.now().isoformat(), error_type, error_message, context))
-        
-        conn.commit()
-        conn.close()
+        now = datetime.now().isoformat()
+        self.log_errors([(error_type, error_message, context, 1, now, now)])
     
-    def get_statistics(self, days: int = 7) -> Dict:
-        """קבלת סטטיסטיקות לימים האחרונים"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # סטטיסטיקות כלליות
-        cursor.execute("""
-            SELECT 
-                SUM(posts_scanned) as total_posts,
-                SUM(candidates_found) as total_candidates,
-                SUM(responses_sent) as total_responses,
-                SUM(errors) as total_errors
-            FROM daily_stats
-            WHERE date >= date('now', '-' || ? || ' days')
-        """, (days,))
+    def log_errors(self, errors: List[Tuple[str, str, str, int, str, str]]):
+        """
+        רישום שגיאות מקובצות
+
+        שגיאה זהה (סוג, הודעה, הקשר) שכבר נרשמה באותו יום מעדכנת את המונה
+        ואת last_seen של השורה הקיימת במקום להוסיף שורה.
+
+        Args:
+            errors: רשימת (סוג, הודעה, הקשר, מספר הופעות, הופעה ראשונה, הופעה אחרונה)
+        """
+        with self.transaction() as conn:
+            for error_type, error_message, context, occurrences, first_seen, last_seen in errors:
+                day = first_seen[:10]
+                next_day = (datetime.fromisoformat(day) + timedelta(days=1)).date().isoformat()
+                updated = conn.execute("""
+                    UPDATE error_log
+                    SET occurrences = occurrences + ?, last_seen = MAX(COALESCE(last_seen, timestamp), ?)
+                    WHERE id = (
+                        SELECT id FROM error_log
+                        WHERE error_type IS ? AND timestamp >= ? AND timestamp < ?
+                          AND error_message IS ? AND context IS ?
+                        LIMIT 1
+                    )
+                """, (occurrences, last_seen, error_type, day, next_day, error_message, context)).rowcount
+                
+                if not updated:
+                    conn.execute(f"""
+                        INSERT INTO error_log
+                        (timestamp, error_type, error_message, context, occurrences, last_seen, group_name)
+                        VALUES (:first_seen, :error_type, :error_message, :context, :occurrences, :last_seen,
+                                {_error_group_sql(":context")})
+                    """, {
+                        "first_seen": first_seen, "error_type": error_type, "error_message": error_message,
+                        "context": context, "occurrences": occurrences, "last_seen": last_seen,
+                    })
+    
+    def get_statistics(self, days: int = 7, since: str = None, until: str = None,
+                       by_group: bool = False, by_hour: bool = False) -> Dict:
+        """
+        סטטיסטיקות לטווח תאריכים מתוך hourly_rollups
+
+        Args:
+            days: מספר הימים האחרונים (אם since לא ניתן)
+            since: תאריך התחלה (YYYY-MM-DD)
+            until: תאריך סיום, כולל (YYYY-MM-DD, ברירת מחדל היום)
+            by_group: פירוט לפי קבוצה
+            by_hour: פירוט לפי שעה
+
+        Returns:
+            dict: סיכומים, שיעור המרה והתפלגות ציונים (ופירוט אם התבקש)
+        """
+        today = datetime.now().date()
+        until_date = datetime.fromisoformat(until).date() if until else today
+        since_date = datetime.fromisoformat(since).date() if since else today - timedelta(days=days)
+        # טווח על hour (המפתח הראשי) - סורק רק את השעות של הטווח
+        bounds = (since_date.isoformat(), (until_date + timedelta(days=1)).isoformat())
+        totals = f"""
+            SUM(posts), SUM(candidates), SUM(responses), SUM(errors),
+            {", ".join(f"SUM({column})" for column in _SCORE_COLUMNS)}
+        """
         
-        stats = cursor.fetchone()
+        def summarize(row: Tuple) -> Dict:
+            summary = {
+                "total_posts_scanned": row[0] or 0,
+                "total_candidates_found": row[1] or 0,
+                "total_responses_sent": row[2] or 0,
+                "total_errors": row[3] or 0,
+                "candidate_score_histogram": [value or 0 for value in row[4:4 + SCORE_BUCKETS]],
+            }
+            # שיעור המרה
+            if summary["total_candidates_found"] > 0:
+                summary["conversion_rate"] = round(
+                    summary["total_responses_sent"] / summary["total_candidates_found"] * 100, 2
+                )
+            else:
+                summary["conversion_rate"] = 0
+            return summary
         
         result = {
-            "period_days": days,
-            "total_posts_scanned": stats[0] or 0,
-            "total_candidates_found": stats[1] or 0,
-            "total_responses_sent": stats[2] or 0,
-            "total_errors": stats[3] or 0
+            "period_days": (until_date - since_date).days,
+            "since": bounds[0],
+            "until": until_date.isoformat(),
+            **summarize(self._fetchone(
+                f"SELECT {totals} FROM hourly_rollups WHERE hour >= ? AND hour < ?", bounds
+            )),
         }
         
-        # שיעור המרה
-        if result["total_candidates_found"] > 0:
-            result["conversion_rate"] = round(
-                result["total_responses_sent"] / result["total_candidates_found"] * 100, 2
-            )
-        else:
-            result["conversion_rate"] = 0
+        if by_group:
+            result["groups"] = {
+                row[0]: summarize(row[1:])
+                for row in self._fetchall(f"""
+                    SELECT group_name, {totals} FROM hourly_rollups
+                    WHERE hour >= ? AND hour < ?
+                    GROUP BY group_name
+                    ORDER BY SUM(posts) DESC
+                """, bounds)
+            }
+        
+        if by_hour:
+            result["hours"] = [
+                {"hour": row[0], **summarize(row[1:])}
+                for row in self._fetchall(f"""
+                    SELECT hour, {totals} FROM hourly_rollups
+                    WHERE hour >= ? AND hour < ?
+                    GROUP BY hour
+                    ORDER BY hour
+                """, bounds)
+            ]
         
-        conn.close()
         return result
     
-    def cleanup_old_data(self, days: int = 30):
-        """ניקוי נתונים ישנים"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def rebuild_hourly_rollups(self, since: str = None):
+        """
+        חישוב hourly_rollups מחדש מ-scanned_posts, responses ו-error_log
+
+        Args:
+            since: תאריך/שעה (YYYY-MM-DD[THH]) - רק ממנו והלאה; ברירת מחדל כל מה
+                   שעוד קיים בטבלאות הגולמיות
+        """
+        with self.transaction() as conn:
+            _rebuild_hourly_rollups(conn.cursor(), since)
+    
+    def get_state(self, key: str, default: str = None) -> str:
+        """קריאת ערך מטבלת המצב הפנימי"""
+        row = self._fetchone("SELECT value FROM bot_state WHERE key = ?", (key,))
+        return row[0] if row else default
+    
+    def set_state(self, key: str, value: str = None):
+        """שמירת ערך בטבלת המצב הפנימי (None מוחק את המפתח)"""
+        with self.transaction() as conn:
+            if value is None:
+                conn.execute("DELETE FROM bot_state WHERE key = ?", (key,))
+            else:
+                conn.execute("""
+                    INSERT INTO bot_state (key, value) VALUES (?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """, (key, str(value)))
+    
+    def count_posts_after(self, after_id: int = 0) -> int:
+        """מספר הפוסטים השמורים אחרי id נתון"""
+        return self._fetchone("SELECT COUNT(*) FROM scanned_posts WHERE id > ?", (after_id,))[0]
+    
+    def fetch_posts_for_rescore(self, after_id: int, limit: int) -> List[Tuple[int, str]]:
+        """קריאת chunk של פוסטים (id, טקסט) לפי סדר id, החל מאחרי after_id"""
+        rows = self._fetchall("""
+            SELECT id, post_text, text_body FROM scanned_posts_text
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (after_id, limit))
+        return [
+            (row_id, post_text if post_text is not None else decompress_post_text(body))
+            for row_id, post_text, body in rows
+        ]
+    
+    def update_post_scores(self, scores: List[Tuple[int, bool, float, List[str]]],
+                           checkpoint_key: str = None):
+        """
+        עדכון ציוני פוסטים בטרנזקציה אחת
+
+        Args:
+            scores: רשימת (id, is_candidate, candidate_score, matched_keywords)
+            checkpoint_key: אם ניתן - ה-id האחרון נשמר ב-bot_state באותה טרנזקציה
+        """
+        if not scores:
+            return
         
-        # מחיקת פוסטים ישנים
-        cursor.execute("""
-            DELETE FROM scanned_posts 
-            WHERE DATE(scanned_at) < date('now', '-' || ? || ' days')
-        """, (days,))
+        with self.transaction() as conn:
+            conn.executemany("""
+                UPDATE scanned_posts
+                SET is_candidate = ?, candidate_score = ?, matched_keywords = ?
+                WHERE id = ?
+            """, [(is_candidate, score, json.dumps(keywords), post_id)
+                  for post_id, is_candidate, score, keywords in scores])
+            
+            if checkpoint_key:
+                conn.execute("""
+                    INSERT INTO bot_state (key, value) VALUES (?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """, (checkpoint_key, str(scores[-1][0])))
+    
+    def get_cached_analysis(self, text_hash: str, fingerprint: str) -> Optional[str]:
+        """קריאת ניתוח שמור (JSON) או None"""
+        row = self._fetchone("""
+            SELECT result FROM analysis_cache
+            WHERE text_hash = ? AND fingerprint = ?
+        """, (text_hash, fingerprint))
+        return row[0] if row else None
+    
+    def put_cached_analyses(self, fingerprint: str, results: Dict[str, str]):
+        """שמירת ניתוחים (hash טקסט -> JSON) במטמון הקבוע, בתוך הטרנזקציה הפתוחה אם יש"""
+        created_at = datetime.now().isoformat()
+        with self.transaction() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO analysis_cache (text_hash, fingerprint, result, created_at)
+                VALUES (?, ?, ?, ?)
+            """, [(key, fingerprint, result, created_at) for key, result in results.items()])
+    
+    def prune_analysis_cache(self, fingerprint: str):
+        """מחיקת ניתוחים שנשמרו עם סט כללים אחר"""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM analysis_cache WHERE fingerprint != ?", (fingerprint,))
+    
+    def cleanup_old_data(self, days: int = 30, tombstone_days: int = None):
+        """
+        ניקוי נתונים ישנים
+
+        לכל פוסט שנמחק נשארת מצבה (hash + תאריך) ב-post_tombstones, שנמחקת רק
+        אחרי tombstone_days (ברירת מחדל TOMBSTONE_RETENTION_DAYS) - כך הניקוי
+        מקטין את המסד בלי שפוסטים ישנים ייחשבו חדשים.
+        """
+        tombstone_days = tombstone_days or config.TOMBSTONE_RETENTION_DAYS
+        today = datetime.now().date()
+        cutoff = (today - timedelta(days=days)).isoformat()
+        tombstone_cutoff = (today - timedelta(days=tombstone_days)).isoformat()
         
-        # מחיקת סטטיסטיקות ישנות
-        cursor.execute("""
-            DELETE FROM daily_stats 
-            WHERE date < date('now', '-' || ? || ' days')
-        """, (days,))
+        with self.transaction() as conn:
+            # מצבות לפוסטים שעומדים להימחק
+            conn.execute("""
+                INSERT OR IGNORE INTO post_tombstones (id_hash, deleted_on)
+                SELECT post_id_hash(post_id), ? FROM scanned_posts
+                WHERE scanned_at < ?
+            """, (today.isoformat(), cutoff))
+            
+            # מחיקת פוסטים ישנים
+            conn.execute("""
+                DELETE FROM scanned_posts 
+                WHERE scanned_at < ?
+            """, (cutoff,))
+            
+            # גופי פוסטים שכבר אין להם הפניה
+            self.prune_post_contents()
+            
+            # מחיקת סטטיסטיקות ישנות
+            conn.execute("""
+                DELETE FROM daily_stats 
+                WHERE date < date('now', '-' || ? || ' days')
+            """, (days,))
+            
+            # מחיקת מצבות ישנות (אופק ארוך בהרבה)
+            conn.execute("DELETE FROM post_tombstones WHERE deleted_on < ?", (tombstone_cutoff,))
+        
+        self.prune_search_index()
         
-        conn.commit()
-        conn.close()
         print(f"✅ נתונים מלפני {days} ימים נוקו מהמסד נתונים")
+    
+    def explain_query_plans(self) -> Dict[str, List[str]]:
+        """
+        EXPLAIN QUERY PLAN לשאילתות החמות
+
+        Returns:
+            dict: שם שאילתה -> שורות ה-detail של התוכנית
+        """
+        today = datetime.now().date().isoformat()
+        queries = {
+            "is_post_processed": ("SELECT id FROM scanned_posts WHERE post_id = ?", ("",)),
+            "filter_unprocessed": ("SELECT post_id FROM scanned_posts WHERE post_id IN (?, ?)", ("", "")),
+            "post_contents_refs": ("SELECT 1 FROM scanned_posts WHERE text_hash = ?", ("",)),
+            "tombstone_lookup": ("SELECT 1 FROM post_tombstones WHERE id_hash = ?", (0,)),
+            "has_responded_to_post": ("SELECT 1 FROM responses WHERE post_id = ? LIMIT 1", ("",)),
+            "log_errors_dedup": ("""
+                SELECT id FROM error_log
+                WHERE error_type IS ? AND timestamp >= ? AND timestamp < ? AND error_message IS ? AND context IS ?
+                LIMIT 1
+            """, ("", today, today, "", "")),
+            "get_daily_response_count": (
+                "SELECT COUNT(*) FROM responses WHERE sent_at >= ? AND sent_at < ?", (today, today)
+            ),
+            "statistics_range": ("SELECT SUM(posts) FROM hourly_rollups WHERE hour >= ? AND hour < ?", (today, today)),
+            "responses_since_epoch": ("SELECT COUNT(*) FROM responses WHERE sent_epoch >= ?", (0,)),
+            "cleanup_old_data": ("DELETE FROM scanned_posts WHERE scanned_at < ?", (today,)),
+        }
+        return {
+            name: [row[-1] for row in self._fetchall(f"EXPLAIN QUERY PLAN {query}", params)]
+            for name, (query, params) in queries.items()
+        }
+    
+    def verify_query_plans(self) -> List[str]:
+        """בדיקה שכל שאילתה חמה משתמשת באינדקס (רשימה ריקה = תקין)"""
+        return [
+            f"{name}: {' | '.join(plan)}"
+            for name, plan in self.explain_query_plans().items()
+            if not any("USING" in detail and ("INDEX" in detail or "PRIMARY KEY" in detail) for detail in plan)
+        ]
 
 
 # פונקציות עזר
-def get_db() -> DatabaseManager:
-    """קבלת instance של מנהל מסד הנתונים"""
-    return DatabaseManager()
+_instances: Dict[str, DatabaseManager] = {}
+_instances_lock = threading.Lock()
+
+
+def get_db(db_path: Path = None) -> DatabaseManager:
+    """קבלת instance משותף של מנהל מסד הנתונים (אחד לכל קובץ מסד בתהליך)"""
+    db_path = Path(db_path or config.DATABASE_FILE)
+    key = str(db_path.resolve())
+    
+    with _instances_lock:
+        if key not in _instances:
+            _instances[key] = DatabaseManager(db_path)
+        return _instances[key]
 
 
 if __name__ == "__main__":
     # בדיקה של מסד הנתונים
-    db = DatabaseManager()
-    print("✅ מסד הנתונים אותחל בהצלחה!")
-    
-    # הצגת סטטיסטיקות
-    stats = db.get_statistics(7)
-    print("\n📊 סטטיסטיקות ל-7 ימים אחרונים:")
-    for key, value in stats.items():
-        print(f"  {key}: {value}")
\ No newline at end of file
+    with DatabaseManager() as db:
+        print("✅ מסד הנתונים אותחל בהצלחה!")
+        print(f"   journal_mode: {db._fetchone('PRAGMA journal_mode')[0]}")
+        
+        # בדיקת תוכניות השאילתות
+        problems = db.verify_query_plans()
+        if problems:
+            print("❌ שאילתות בלי אינדקס:")
+            for problem in problems:
+                print(f"   - {problem}")
+        else:
+            print("✅ כל השאילתות החמות משתמשות באינדקסים")
+        
+        if db._loaded_seen_filter() is not None:
+            seen_stats = db.seen_filter.stats()
+            print(f"🧮 מסנן פוסטים: {seen_stats['items']:,} מזהים, {seen_stats['memory_bytes'] / 1024:,.1f}KB, "
+                  f"false positive צפוי {seen_stats['estimated_fp_rate']}%")
+        
+        # הצגת סטטיסטיקות
+        stats = db.get_statistics(7)
+        print("\n📊 סטטיסטיקות ל-7 ימים אחרונים:")
+        for key, value in stats.items():
+            print(f"  {key}: {value}")
\ No newline at end of file
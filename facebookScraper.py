@@ -9,6 +9,7 @@ import random
 import hashlib
 import os
 import re
+import time
 from datetime import datetime
 from typing import List, Dict, Optional
 from pathlib import Path
@@ -17,9 +18,57 @@ from playwright.async_api import async_playwright, Page, Browser
 from playwright_stealth import Stealth
 
 import config
-from database import get_db
+from database import GROUP_CONTEXT_PREFIX, get_db
+from asyncDatabase import AsyncDatabase, LoopLagMonitor
 from candidatMatcher import get_matcher
+from classifierCascade import get_cascade
 from responseGenerator import get_generator
+from rateLimiter import get_limiter
+
+
+# סלקטורים לפוסטים בעמוד קבוצה - הראשון שמחזיר תוצאות
+POST_SELECTORS = [
+    '[role="article"]',
+    'div[data-ad-comet-preview="message"]',
+    'div.x1yztbdb',
+    'div[role="feed"] > div',
+]
+
+POST_URL_SELECTOR = 'a[href*="/posts/"], a[href*="/permalink/"], a[href*="story_fbid="]'
+
+# מאפיין שמסמן כל פוסט בעמוד - ממנו נבנה locator רק לפוסט שצריך להגיב אליו
+POST_INDEX_ATTRIBUTE = "data-fbagent-idx"
+
+# סריקה אחת של ה-DOM בתוך הדפדפן: טקסט, קישור, זמן ומחבר לכל הפוסטים
+EXTRACT_POSTS_JS = """
+({selectors, urlSelector, indexAttribute, batch, maxPosts}) => {
+    let nodes = [];
+    let selector = null;
+    for (const candidate of selectors) {
+        nodes = Array.from(document.querySelectorAll(candidate));
+        if (nodes.length) { selector = candidate; break; }
+    }
+    const attribute = (node, query, name) => {
+        const element = node.querySelector(query);
+        return element ? element.getAttribute(name) : null;
+    };
+    const posts = nodes.slice(0, maxPosts).map((node, index) => {
+        const token = `${batch}-${index}`;
+        node.setAttribute(indexAttribute, token);
+        const author = node.querySelector('a[role="link"]');
+        return {
+            index,
+            token,
+            text: node.innerText || "",
+            url: attribute(node, urlSelector, "href"),
+            utime: attribute(node, 'abbr[data-utime], span[data-utime]', "data-utime"),
+            datetime: attribute(node, 'time[datetime]', "datetime"),
+            author: author ? author.innerText : null,
+        };
+    });
+    return {selector, total: nodes.length, posts};
+}
+"""
 
 
 def cleanup_old_screenshots(screenshot_dir: Path, max_files: int = 50):
@@ -98,13 +147,19 @@ class FacebookScraper:
     
     def __init__(self):
         self.db = get_db()
+        # כל הגישה למסד מתוך הלולאה עוברת דרך adb (threads נפרדים לכתיבה ולקריאה)
+        self.adb = AsyncDatabase(self.db)
         self.matcher = get_matcher()
+        self.cascade = get_cascade(self.matcher)
         self.generator = get_generator()
+        self.limiter = get_limiter(self.db)
         self.playwright = None
         self.context = None
         self.browser: Optional[Browser] = None
         self.page: Optional[Page] = None
         self.is_logged_in = False
+        self._extraction_batch = 0
+        self.extraction_timings: List[Dict] = []
     
     async def start(self):
         """הפעלת הדפדפן והתחברות"""
@@ -262,7 +317,7 @@ class FacebookScraper:
 
         except Exception as e:
             print(f"❌ שגיאה בהתחברות: {e}")
-            self.db.log_error("login_error", str(e), "התחברות לפייסבוק")
+            await self.adb.log_error("login_error", str(e), "התחברות לפייסבוק")
             return False
     
     async def scan_group(self, group_info: Dict) -> List[Dict]:
@@ -314,87 +369,78 @@ class FacebookScraper:
             
             print(f"✅ נמצאו {len(posts)} פוסטים בקבוצה")
             
-            # עדכון סטטיסטיקות
-            self.db.update_daily_stats(posts_scanned=len(posts))
-            
+            # הסטטיסטיקות נספרות מהפוסטים שנשמרים ב-process_and_respond_to_posts
             return posts
             
         except Exception as e:
             print(f"❌ שגיאה בסריקת קבוצה {group_name}: {e}")
-            self.db.log_error("scan_error", str(e), f"סריקת קבוצה: {group_name}")
-            self.db.update_daily_stats(errors=1)
+            await self.adb.log_error("scan_error", str(e), f"{GROUP_CONTEXT_PREFIX}{group_name}")
             return []
     
     async def extract_posts_from_page(self, group_name: str, max_posts: int) -> List[Dict]:
         """חילוץ פוסטים מהעמוד הנוכחי"""
         posts = []
+        legacy = config.BROWSER_SETTINGS.get('legacy_dom_extraction', False)
+        started = time.perf_counter()
         
         try:
-            # מציאת כל הפוסטים בעמוד
-            post_elements = await self.page.locator('[role="article"]').all()
-            print(f"   🔎 נמצאו {len(post_elements)} אלמנטי article בעמוד")
-
-            # אם אין article, ננסה סלקטורים חלופיים
-            if len(post_elements) == 0:
-                alt_selectors = [
-                    'div[data-ad-comet-preview="message"]',
-                    'div.x1yztbdb',
-                    'div[role="feed"] > div',
-                ]
-                for sel in alt_selectors:
-                    post_elements = await self.page.locator(sel).all()
-                    if len(post_elements) > 0:
-                        print(f"   🔎 נמצאו {len(post_elements)} פוסטים עם סלקטור: {sel[:40]}")
-                        break
-
-            for i, post_element in enumerate(post_elements[:max_posts]):
+            # שלב 1: טקסט, קישור, זמן ו-ID לכל פוסט
+            if legacy:
+                extracted = await self._extract_posts_with_locators(max_posts)
+            else:
+                extracted = await self._extract_posts_with_evaluate(max_posts)
+            
+            for item in extracted:
+                # יצירת ID יציב לפוסט (URL אם קיים, אחרת hash יציב)
+                item['post_id'] = self.build_post_id(group_name, item['text'], item['url'])
+            
+            extraction_ms = (time.perf_counter() - started) * 1000
+            self.extraction_timings.append({
+                "group": group_name, "posts": len(extracted), "ms": extraction_ms, "legacy": legacy,
+            })
+            print(f"   ⏱️ חילוץ {len(extracted)} פוסטים: {extraction_ms:.0f}ms "
+                  f"({'locators' if legacy else 'evaluate'})")
+            
+            # שלב 2: סינון כל הפוסטים שכבר עובדו בשאילתה אחת
+            unprocessed = await self.adb.filter_unprocessed([item['post_id'] for item in extracted])
+            
+            for item in extracted:
+                if item['post_id'] not in unprocessed:
+                    continue
+                
                 try:
-                    # חילוץ טקסט הפוסט
-                    post_text = await post_element.inner_text()
-                    
-                    # דילוג על פוסטים קצרים מדי
-                    if len(post_text) < 10:
-                        continue
-                    
-                    post_url = await self.extract_post_url(post_element)
-                    posted_at = await self.extract_post_timestamp(post_element)
-
-                    # יצירת ID יציב לפוסט (URL אם קיים, אחרת hash יציב)
-                    post_id = self.build_post_id(group_name, post_text, post_url)
-                    
-                    # בדיקה אם כבר עיבדנו את הפוסט הזה
-                    if self.db.is_post_processed(post_id):
-                        continue
-                    
-                    # נסיון לחלץ שם מחבר (אופציונלי)
-                    author_name = ""
-                    try:
+                    post_text = item['text']
+                    author_raw = item['author']
+                    if legacy:
                         # נסיון מספר 1: חיפוש קישור עם התפקיד link
-                        author_element = await post_element.locator('a[role="link"]').first.inner_text()
-                        author_name = clean_author_name(author_element)
-                    except:
                         try:
-                            # נסיון מספר 2: השורה הראשונה בפוסט (לרוב השם)
-                            first_line = post_text.split('\n')[0].strip()
-                            author_name = clean_author_name(first_line)
+                            author_raw = await item['element'].locator('a[role="link"]').first.inner_text()
                         except:
-                            pass
+                            author_raw = None
+                    
+                    # נסיון מספר 2: השורה הראשונה בפוסט (לרוב השם)
+                    if author_raw is None:
+                        author_raw = post_text.split('\n')[0].strip()
+                    author_name = clean_author_name(author_raw)
                     
                     # יצירת אובייקט פוסט
                     post = {
-                        'post_id': post_id,
+                        'post_id': item['post_id'],
                         'group_name': group_name,
                         'author_name': author_name,
                         'post_text': post_text,
-                        'post_url': post_url or self.page.url,
-                        'posted_at': posted_at,
-                        'element': post_element  # שמירת האלמנט לשימוש מאוחר יותר
+                        'post_url': item['url'] or self.page.url,
+                        'posted_at': item['posted_at'],
+                        # הסימון בעמוד - ה-locator נבנה ממנו רק לפוסט שמגיבים אליו
+                        'dom_token': item.get('token'),
                     }
+                    if legacy:
+                        post['element'] = item['element']
                     
                     posts.append(post)
                     
                 except Exception as e:
-                    print(f"⚠️ שגיאה בחילוץ פוסט #{i}: {e}")
+                    print(f"⚠️ שגיאה בחילוץ פוסט #{item['index']}: {e}")
                     continue
             
         except Exception as e:
@@ -402,34 +448,141 @@ class FacebookScraper:
         
         return posts
     
-    async def process_and_respond_to_posts(self, posts: List[Dict]):
-        """עיבוד והגבה לפוסטים"""
-        candidates_found = 0
-        responses_sent = 0
+    async def _extract_posts_with_evaluate(self, max_posts: int) -> List[Dict]:
+        """
+        חילוץ כל הפוסטים ב-page.evaluate אחד (קריאת CDP אחת לעמוד)
+
+        כל פוסט מסומן ב-data-fbagent-idx, כך שאפשר לבנות אליו locator בהמשך
+        בלי לשמור handle לכל article בעמוד.
+        """
+        self._extraction_batch += 1
+        result = await self.page.evaluate(EXTRACT_POSTS_JS, {
+            "selectors": POST_SELECTORS,
+            "urlSelector": POST_URL_SELECTOR,
+            "indexAttribute": POST_INDEX_ATTRIBUTE,
+            "batch": self._extraction_batch,
+            "maxPosts": max_posts,
+        })
         
-        for post in posts:
+        if result['selector'] == POST_SELECTORS[0]:
+            print(f"   🔎 נמצאו {result['total']} אלמנטי article בעמוד")
+        elif result['selector']:
+            print(f"   🔎 נמצאו {result['total']} פוסטים עם סלקטור: {result['selector'][:40]}")
+        else:
+            print("   🔎 נמצאו 0 אלמנטי article בעמוד")
+        
+        extracted = []
+        for raw in result['posts']:
+            # דילוג על פוסטים קצרים מדי
+            if len(raw['text']) < 10:
+                continue
+            
+            posted_at = None
+            if raw['utime'] and raw['utime'].isdigit():
+                posted_at = datetime.fromtimestamp(int(raw['utime'])).isoformat()
+            elif raw['datetime']:
+                posted_at = raw['datetime']
+            
+            extracted.append({
+                "index": raw['index'],
+                "token": raw['token'],
+                "text": raw['text'],
+                "url": raw['url'] or None,
+                "posted_at": posted_at,
+                "author": raw['author'],
+            })
+        return extracted
+    
+    async def _extract_posts_with_locators(self, max_posts: int) -> List[Dict]:
+        """החילוץ הישן - כמה קריאות לדפדפן לכל פוסט (להשוואה, legacy_dom_extraction)"""
+        # מציאת כל הפוסטים בעמוד
+        post_elements = await self.page.locator(POST_SELECTORS[0]).all()
+        print(f"   🔎 נמצאו {len(post_elements)} אלמנטי article בעמוד")
+
+        # אם אין article, ננסה סלקטורים חלופיים
+        if len(post_elements) == 0:
+            for sel in POST_SELECTORS[1:]:
+                post_elements = await self.page.locator(sel).all()
+                if len(post_elements) > 0:
+                    print(f"   🔎 נמצאו {len(post_elements)} פוסטים עם סלקטור: {sel[:40]}")
+                    break
+
+        extracted = []
+        for i, post_element in enumerate(post_elements[:max_posts]):
             try:
-                # ניתוח הפוסט
-                analysis = self.matcher.analyze_post(
-                    post['post_text'],
-                    post.get('author_name', ''),
-                    post.get('posted_at')
-                )
-                
-                # שמירה במסד נתונים
-                post_data = {
-                    **post,
-                    'is_candidate': analysis['is_candidate'],
-                    'candidate_score': analysis['candidate_score'],
-                    'matched_keywords': analysis.get('matched_keywords', [])
-                }
-                self.db.add_scanned_post(post_data)
+                # חילוץ טקסט הפוסט
+                post_text = await post_element.inner_text()
                 
-                # אם זה לא מועמד, ממשיכים הלאה
-                if not analysis['is_candidate']:
+                # דילוג על פוסטים קצרים מדי
+                if len(post_text) < 10:
                     continue
                 
-                candidates_found += 1
+                extracted.append({
+                    "index": i,
+                    "text": post_text,
+                    "url": await self.extract_post_url(post_element),
+                    "posted_at": await self.extract_post_timestamp(post_element),
+                    "author": None,
+                    "element": post_element,
+                })
+                
+            except Exception as e:
+                print(f"⚠️ שגיאה בחילוץ פוסט #{i}: {e}")
+                continue
+        return extracted
+    
+    async def process_and_respond_to_posts(self, posts: List[Dict]):
+        """עיבוד והגבה לפוסטים"""
+        responses_sent = 0
+        
+        # ניתוח כל הפוסטים של הקבוצה באצווה אחת (מצב מקומפל משותף)
+        post_inputs = [
+            (post['post_text'], post.get('author_name', ''), post.get('posted_at'))
+            for post in posts
+        ]
+        # הניתוח רץ ב-thread כדי לא לחסום את הלולאה; מטמון הניתוחים נכתב למסד
+        # רק ב-unit_of_work למטה, דרך ה-thread הכותב
+        if self.cascade is not None:
+            # רק פוסטים באזור האפור נשלחים למסווג - ברקע, בלי לחסום את הלולאה
+            analyses = await self.cascade.analyze_posts(post_inputs)
+        else:
+            analyses = await asyncio.to_thread(lambda: list(self.matcher.analyze_posts(post_inputs)))
+        
+        candidates = [
+            (post, analysis) for post, analysis in zip(posts, analyses)
+            if analysis['is_candidate']
+        ]
+        candidates_found = len(candidates)
+        
+        # שמירת כל הפוסטים של הקבוצה והמונים שנצברו בטרנזקציה אחת
+        post_rows = [
+            {
+                **post,
+                'is_candidate': analysis['is_candidate'],
+                'candidate_score': analysis['candidate_score'],
+                'matched_keywords': analysis.get('matched_keywords', [])
+            }
+            for post, analysis in zip(posts, analyses)
+        ]
+        cache = self.matcher.cache
+
+        def save_group(db):
+            inserted = db.add_scanned_posts(post_rows)
+            # ניתוחים חדשים ממטמון הניתוחים - באותה טרנזקציה, לא commit לכל החטאה
+            if cache is not None:
+                cache.flush(db)
+            return inserted
+
+        try:
+            await self.adb.unit_of_work(save_group)
+        except Exception as e:
+            # שום דבר מהקבוצה לא נשמר - לא מגיבים לפוסטים שלא נרשמו כמעובדים
+            print(f"❌ שגיאה בשמירת הפוסטים למסד נתונים: {e}")
+            await self.adb.log_error("db_error", str(e), f"{GROUP_CONTEXT_PREFIX}{posts[0].get('group_name', '')}")
+            return
+        
+        for post, analysis in candidates:
+            try:
                 print(f"\n✅ מצאנו מועמד! ציון: {analysis['candidate_score']:.1f}/10")
                 print(f"   מחבר: {post.get('author_name', 'לא ידוע')}")
                 print(f"   טקסט: {post['post_text'][:100]}...")
@@ -439,16 +592,14 @@ class FacebookScraper:
                     print(f"   ⏭️ לא עונים: {analysis['reason']}")
                     continue
                 
-                # בדיקת מגבלות יומיות
-                daily_count = self.db.get_daily_response_count()
-                max_daily = config.AUTOMATION_SETTINGS['max_responses_per_day']
-                
-                if daily_count >= max_daily:
-                    print(f"   ⏸️ הגענו למגבלה היומית ({max_daily} תגובות)")
+                # מגבלות שעה ויום (בזיכרון, בלי שאילתה)
+                limit_reason = self.limiter.check()
+                if limit_reason:
+                    print(f"   ⏸️ {limit_reason}")
                     break
                 
                 # בדיקה אם כבר הגבנו לפוסט זה (מיד לפני תגובה)
-                if self.db.has_responded_to_post(post['post_id']):
+                if await self.adb.has_responded_to_post(post['post_id']):
                     print("   ⏭️ Already responded")
                     continue
                 
@@ -469,22 +620,23 @@ class FacebookScraper:
                     
             except Exception as e:
                 print(f"❌ שגיאה בעיבוד פוסט: {e}")
-                self.db.log_error("process_error", str(e), post.get('post_id', ''))
+                await self.adb.log_error("process_error", str(e), post.get('post_id', ''))
                 continue
         
-        # עדכון סטטיסטיקות
-        self.db.update_daily_stats(
-            candidates_found=candidates_found,
-            responses_sent=responses_sent
-        )
-        
         print(f"\n📊 סיכום: {candidates_found} מועמדים, {responses_sent} תגובות נשלחו")
     
+    def _attach_element(self, post: Dict):
+        """locator לפוסט לפי הסימון מ-page.evaluate - רק לפוסט שבאמת מגיבים אליו"""
+        if 'element' not in post and post.get('dom_token'):
+            post['element'] = self.page.locator(f'[{POST_INDEX_ATTRIBUTE}="{post["dom_token"]}"]')
+    
     async def create_and_send_response(self, post: Dict, analysis: Dict) -> bool:
         """יצירה ושליחת תגובה"""
+        reservation = None
+        sent = False
         try:
             # בדיקה אחרונה לפני שליחה - למניעת תגובות כפולות
-            if self.db.has_responded_to_post(post['post_id']):
+            if await self.adb.has_responded_to_post(post['post_id']):
                 print("   ⏭️ Already responded")
                 return False
 
@@ -508,6 +660,7 @@ class FacebookScraper:
             print(f"   {response_text}\n")
 
             # שליחת התגובה (אם יש element)
+            self._attach_element(post)
             if 'element' in post:
                 # צילום מסך לפני הניסיון
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -673,6 +826,10 @@ class FacebookScraper:
                 # המתנה לוודא שתיבת התגובה מוכנה
                 await self.human_delay(1, 2)
 
+                # שמירת מקום במסד לפני השליחה - קריסה מכאן והלאה נספרת במגבלות
+                reservation = await self.adb.reserve_response(post['post_id'])
+                self.limiter.record(reservation[1])
+
                 # הקלדה אנושית
                 print("   ⌨️ מקליד את התגובה...")
                 await self.human_type(comment_box, response_text)
@@ -681,6 +838,7 @@ class FacebookScraper:
                 # שליחת התגובה - Enter שולח תגובה בפייסבוק
                 print("   📤 שולח תגובה...")
                 await comment_box.press('Enter')
+                sent = True
                 await self.human_delay(3, 4)
 
                 # צילום מסך אחרי שליחה
@@ -699,13 +857,18 @@ class FacebookScraper:
                     'match_score': matched_job['match_score'],
                     'status': 'sent'
                 }
-                self.db.add_response(response_data)
+                await self.adb.confirm_response(reservation[0], response_data)
 
                 return True
 
         except Exception as e:
             print(f"❌ שגיאה בשליחת תגובה: {e}")
-            self.db.log_error("response_error", str(e), post.get('post_id', ''))
+            await self.adb.log_error("response_error", str(e), post.get('post_id', ''))
+
+            # התגובה לא נשלחה - שחרור המקום. אחרי Enter נשארת 'pending' (אולי פורסמה)
+            if reservation and not sent:
+                await self.adb.release_response(reservation[0])
+                self.limiter.forget(reservation[1])
 
             # צילום מסך של שגיאה
             try:
@@ -733,9 +896,7 @@ class FacebookScraper:
     async def extract_post_url(self, post_element) -> Optional[str]:
         """חילוץ URL של פוסט מתוך האלמנט"""
         try:
-            link_candidates = post_element.locator(
-                'a[href*="/posts/"], a[href*="/permalink/"], a[href*="story_fbid="]'
-            )
+            link_candidates = post_element.locator(POST_URL_SELECTOR)
             if await link_candidates.count() > 0:
                 href = await link_candidates.first.get_attribute("href")
                 if href:
@@ -818,12 +979,16 @@ class FacebookScraper:
             if self.playwright:
                 await self.playwright.stop()
                 self.playwright = None
+            await self.adb.close()
+            self.db.close()
 
 
 # פונקציה ראשית להרצה
 async def run_scan_session():
     """הרצת סשן סריקה אחד"""
     scraper = FacebookScraper()
+    loop_lag = LoopLagMonitor()
+    loop_lag.start()
     
     try:
         # הפעלה והתחברות
@@ -833,6 +998,9 @@ async def run_scan_session():
             print("❌ לא הצלחנו להתחבר לפייסבוק")
             return
         
+        # המסנן נטען מחדש בכל סשן - כולל פוסטים שנשמרו מאז בתהליך אחר
+        await scraper.adb.refresh_seen_filter()
+        
         # סריקת כל הקבוצות - עיבוד פוסטים בכל קבוצה מיד
         # (אלמנטים הופכים ללא תקפים אחרי ניווט לעמוד אחר)
         total_candidates = 0
@@ -857,12 +1025,40 @@ async def run_scan_session():
                 )
                 print(f"⏳ ממתין {delay} שניות לפני הקבוצה הבאה...")
                 await asyncio.sleep(delay)
+
+        if scraper.matcher.cache is not None:
+            cache_stats = scraper.matcher.cache.stats()
+            print(f"🗃️ מטמון ניתוחים: {cache_stats['hit_rate']}% פגיעות "
+                  f"(זיכרון {cache_stats['memory_hits']}, מסד {cache_stats['persistent_hits']}, "
+                  f"החטאות {cache_stats['misses']})")
+
+        if scraper.db.seen_filter is not None:
+            seen_stats = scraper.db.seen_filter.stats()
+            print(f"🧮 מסנן פוסטים: {seen_stats['items']:,} מזהים, {seen_stats['memory_bytes'] / 1024:,.1f}KB, "
+                  f"false positive {seen_stats['observed_fp_rate']}% (צפוי {seen_stats['estimated_fp_rate']}%)")
+
+        if scraper.extraction_timings:
+            total_ms = sum(timing['ms'] for timing in scraper.extraction_timings)
+            total_posts = sum(timing['posts'] for timing in scraper.extraction_timings)
+            method = "locators" if scraper.extraction_timings[0]['legacy'] else "evaluate"
+            print(f"🧩 חילוץ DOM ({method}): {total_ms / len(scraper.extraction_timings):.0f}ms לקבוצה, "
+                  f"{total_ms / max(total_posts, 1):.1f}ms לפוסט")
+
+        if scraper.cascade is not None:
+            cascade_stats = scraper.cascade.metrics.summary()
+            print(f"🧠 מסווג: {cascade_stats['posts_escalated']}/{cascade_stats['posts_total']} פוסטים "
+                  f"({cascade_stats['escalation_rate']}%), {cascade_stats['overrides']} הכרעות, "
+                  f"+{cascade_stats['added_latency_ms']}ms")
         
     except Exception as e:
         print(f"❌ שגיאה כללית: {e}")
-        scraper.db.log_error("general_error", str(e), "run_scan_session")
+        await scraper.adb.log_error("general_error", str(e), "run_scan_session")
     
     finally:
+        await loop_lag.stop()
+        lag_stats = loop_lag.stats()
+        print(f"⏱️ עיכוב לולאת האירועים: ממוצע {lag_stats['avg_ms']}ms, "
+              f"p99 {lag_stats['p99_ms']}ms, מקסימום {lag_stats['max_ms']}ms")
         await scraper.close()
 
 
@@ -0,0 +1,175 @@
+"""
+מנוע חיפוש מילות מפתח מרובות במעבר אחד
+כל רשימות הכללים מקומפלות פעם אחת, וכל פוסט נסרק פעם אחת בלבד -
+הלולאה על התווים רצה ב-C: אוטומט Aho-Corasick של pyahocorasick אם מותקן,
+ואחרת ביטוי רגולרי אחד בצורת trie
+"""
+
+import re
+from typing import Dict, Iterator, List, Tuple
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# המנוע שבפועל סורק את הטקסט (המהירות שונה מאוד בין השניים)
+ENGINE = "pyahocorasick" if ahocorasick is not None else "regex"
+
+
+# סימון סוף תבנית בצומת ה-trie (מחרוזת ריקה - לא יכולה להיות תו בטקסט)
+_END = ""
+
+
+def _trie_regex(node: Dict) -> str:
+    """
+    ביטוי רגולרי מ-trie: ענף לכל תו, וסוף תבנית בצומת פנימי הופך את ההמשך לאופציונלי
+
+    ה-? חמדן, כך שבכל מיקום נתפסת התבנית הארוכה ביותר שמתחילה בו,
+    ובכל צומת רק הענף של התו הבא נבדק (אין מעבר על כל התבניות).
+    """
+    branches = [re.escape(char) + _trie_regex(child) for char, child in sorted(node.items()) if char != _END]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if _END in node:
+        body = "(?:" + body + ")?"
+    return body
+
+
+class KeywordAutomaton:
+    """
+    חיפוש כל מילות המפתח בטקסט במעבר יחיד
+
+    כל תבנית נרשמת יחד עם קטגוריה (למשל 'negative', 'positive'),
+    ואותה תבנית יכולה להשתייך לכמה קטגוריות.
+
+    עם pyahocorasick האוטומט מחזיר בעצמו את כל ההופעות, כולל חופפות.
+    בלעדיו החיפוש הבא מתחיל תו אחד אחרי תחילת ההתאמה הקודמת, כך שנמצאות גם
+    הופעות חופפות, ומנוע ה-re מדלג בעצמו על מיקומים שהתו בהם לא פותח אף תבנית.
+    בכל מיקום מתקבלת ההתאמה הארוכה ביותר, וכל תבנית קצרה יותר שמתחילה
+    באותו מיקום היא בהכרח קידומת שלה - את רשימת הקידומות של כל תבנית
+    מחשבים פעם אחת ב-build().
+
+    Example:
+        automaton = KeywordAutomaton()
+        automaton.add("מחפש עבודה", "positive")
+        automaton.add("דרושים", "negative")
+        automaton.build()
+        automaton.scan("אני מחפש עבודה")
+        # -> {"positive": {"מחפש עבודה": [4]}}
+    """
+
+    def __init__(self):
+        self._trie: Dict = {}
+        self._categories: Dict[str, List[str]] = {}
+        self._outputs: Dict[str, List[Tuple[str, str]]] = {}
+        self._regex = None
+        self._automaton = None
+        self._built = False
+
+    def add(self, pattern: str, category: str):
+        """הוספת תבנית תחת קטגוריה"""
+        if not pattern:
+            return
+
+        node = self._trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[_END] = True
+
+        categories = self._categories.setdefault(pattern, [])
+        if category not in categories:
+            categories.append(category)
+        self._built = False
+
+    def add_many(self, patterns, category: str):
+        """הוספת רשימת תבניות תחת אותה קטגוריה"""
+        for pattern in patterns:
+            self.add(pattern, category)
+
+    def build(self):
+        """
+        קומפילציית האוטומט (או הביטוי) וחישוב הפלטים לכל תבנית
+
+        באוטומט - הפלט של תבנית הוא (קטגוריה, תבנית) לכל הקטגוריות שלה.
+        בביטוי - גם לכל תבנית רשומה שהיא קידומת שלה, כי בכל מיקום בטקסט
+        מתקבלת רק ההתאמה הארוכה ביותר.
+        """
+        self._regex = None
+        self._automaton = None
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for pattern, categories in self._categories.items():
+                self._automaton.add_word(pattern, (len(pattern) - 1, [(category, pattern) for category in categories]))
+            if self._categories:
+                self._automaton.make_automaton()
+            else:
+                self._automaton = None
+            self._built = True
+            return
+
+        self._outputs = {}
+        for pattern in self._categories:
+            outputs = []
+            node = self._trie
+            for length, char in enumerate(pattern, 1):
+                node = node[char]
+                if _END in node:
+                    prefix = pattern[:length]
+                    outputs.extend((category, prefix) for category in self._categories[prefix])
+            self._outputs[pattern] = outputs
+
+        self._regex = re.compile(_trie_regex(self._trie)) if self._trie else None
+        self._built = True
+
+    def _iter_starts(self, text: str) -> Iterator[Tuple[int, List[Tuple[str, str]]]]:
+        """(מיקום התחלה, פלטים) לכל מיקום שמתחילה בו התאמה"""
+        if not self._built:
+            self.build()
+
+        if self._automaton is not None:
+            for end, (offset, outputs) in self._automaton.iter(text):
+                yield end - offset, outputs
+            return
+
+        if self._regex is None:
+            return
+        outputs = self._outputs
+        search = self._regex.search
+        match = search(text)
+        while match:
+            start = match.start()
+            yield start, outputs[match.group()]
+            # ההתאמה הבאה יכולה להתחיל בתוך הנוכחית (הופעות חופפות)
+            match = search(text, start + 1)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str, str]]:
+        """
+        מעבר יחיד על הטקסט
+
+        Yields:
+            tuple: (מיקום התחלה, קטגוריה, תבנית) לכל הופעה
+        """
+        for start, outputs in self._iter_starts(text):
+            for category, pattern in outputs:
+                yield start, category, pattern
+
+    def scan(self, text: str) -> Dict[str, Dict[str, List[int]]]:
+        """
+        סריקת טקסט והחזרת כל ההתאמות לפי קטגוריה
+
+        Returns:
+            dict: קטגוריה -> {תבנית: רשימת מיקומי התחלה (בסדר עולה)}
+        """
+        matches: Dict[str, Dict[str, List[int]]] = {}
+        for start, outputs in self._iter_starts(text):
+            for category, pattern in outputs:
+                found = matches.get(category)
+                if found is None:
+                    matches[category] = {pattern: [start]}
+                elif pattern in found:
+                    found[pattern].append(start)
+                else:
+                    found[pattern] = [start]
+        return matches
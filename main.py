@@ -16,6 +16,7 @@ from apscheduler.triggers.cron import CronTrigger
 import config
 from facebookScraper import run_scan_session
 from database import get_db
+from rateLimiter import get_limiter
 
 
 # הגדרות Retry
@@ -89,17 +90,19 @@ async def scheduled_scan():
         print("⏸️ לא בזמן פעיל - מדלג על סריקה")
         return
     
-    # בדיקת מגבלה יומית
+    # בדיקת מגבלות שעה ויום
     db = get_db()
-    daily_responses = db.get_daily_response_count()
-    max_daily = config.AUTOMATION_SETTINGS['max_responses_per_day']
+    limiter = get_limiter(db)
+    limit = limiter.status()
+    limit_reason = limiter.check()
     
-    if daily_responses >= max_daily:
-        print(f"⏸️ הגענו למגבלה היומית ({max_daily} תגובות)")
-        print(f"   תגובות היום: {daily_responses}/{max_daily}")
+    if limit_reason:
+        print(f"⏸️ {limit_reason}")
+        print(f"   תגובות היום: {limit['day']}/{limit['max_per_day']}, בשעה האחרונה: {limit['hour']}/{limit['max_per_hour']}")
         return
     
-    print(f"📊 תגובות היום עד כה: {daily_responses}/{max_daily}")
+    print(f"📊 תגובות היום עד כה: {limit['day']}/{limit['max_per_day']} "
+          f"(בשעה האחרונה: {limit['hour']}/{limit['max_per_hour']})")
     print("\n🚀 מתחיל סשן סריקה...\n")
     
     try:
@@ -124,6 +127,7 @@ async def run_scheduler():
     print(f"\n📅 ימי פעילות: {config.AUTOMATION_SETTINGS['active_days']}")
     print(f"🕐 שעות פעילות: {config.AUTOMATION_SETTINGS['active_hours_start']:02d}:00 - {config.AUTOMATION_SETTINGS['active_hours_end']:02d}:00")
     print(f"📊 מגבלה יומית: {config.AUTOMATION_SETTINGS['max_responses_per_day']} תגובות")
+    print(f"⏱️ מגבלה שעתית: {config.AUTOMATION_SETTINGS['max_responses_per_hour']} תגובות")
     print(f"\n💾 מסד נתונים: {config.DATABASE_FILE}")
     print(f"📝 לוגים: {config.LOG_FILE}")
     print("\n" + "=" * 60 + "\n")
@@ -174,13 +178,16 @@ async def run_scheduler():
         print("✅ הבוט נעצר בהצלחה")
 
 
-def show_statistics(days: int = 7):
+def show_statistics(days: int = 7, since: str = None, until: str = None, by_group: bool = False):
     """הצגת סטטיסטיקות"""
     db = get_db()
-    stats = db.get_statistics(days)
+    stats = db.get_statistics(days, since=since, until=until, by_group=by_group)
     
     print("\n" + "=" * 60)
-    print(f" 📊 סטטיסטיקות ל-{days} ימים אחרונים")
+    if since or until:
+        print(f" 📊 סטטיסטיקות {stats['since']} - {stats['until']}")
+    else:
+        print(f" 📊 סטטיסטיקות ל-{days} ימים אחרונים")
     print("=" * 60 + "\n")
     
     print(f"📄 פוסטים שנסרקו:        {stats['total_posts_scanned']}")
@@ -193,9 +200,64 @@ def show_statistics(days: int = 7):
         response_rate = (stats['total_responses_sent'] / stats['total_candidates_found']) * 100
         print(f"📊 שיעור תגובה למועמדים: {response_rate:.1f}%")
     
+    histogram = stats['candidate_score_histogram']
+    if any(histogram):
+        print("\n🎯 התפלגות ציונים:")
+        widest = max(histogram)
+        for bucket, count in enumerate(histogram):
+            bar = "█" * round(count / widest * 30)
+            print(f"   {bucket:>2}-{bucket + 1:<2} {bar} {count}")
+    
+    if by_group:
+        print("\n👥 לפי קבוצה:")
+        for group_name, group_stats in stats['groups'].items():
+            print(f"   {group_name or '(ללא קבוצה)'}: {group_stats['total_posts_scanned']} פוסטים, "
+                  f"{group_stats['total_candidates_found']} מועמדים, "
+                  f"{group_stats['total_responses_sent']} תגובות, {group_stats['total_errors']} שגיאות")
+    
     print("\n" + "=" * 60 + "\n")
 
 
+def migrate_post_text():
+    """העברת טקסט הפוסטים ל-post_contents (דחוס, בלי כפילויות) ודיווח על החיסכון"""
+    db = get_db()
+    size_before = db.storage_bytes()
+    print("🗜️ מעביר טקסט פוסטים ל-post_contents...")
+    result = db.migrate_post_text()
+    db.enable_incremental_vacuum()
+    freed = db.incremental_vacuum(config.RETENTION_SETTINGS['vacuum_pages_per_step'])
+    size_after = db.storage_bytes()
+
+    print(f"📄 הועברו {result['posts']:,} פוסטים ({result['contents']:,} גופי טקסט ייחודיים חדשים)")
+    if result['raw_bytes']:
+        print(f"   טקסט: {result['raw_bytes'] / 1024 / 1024:,.2f}MB -> "
+              f"{result['stored_bytes'] / 1024 / 1024:,.2f}MB דחוס בטבלה")
+    reduction = (1 - size_after / size_before) * 100 if size_before else 0
+    print(f"💾 גודל המסד: {size_before / 1024 / 1024:,.2f}MB -> {size_after / 1024 / 1024:,.2f}MB "
+          f"({reduction:.1f}% פחות, {freed / 1024 / 1024:,.2f}MB הוחזרו לדיסק)")
+
+
+def search_posts(query: str, group: str = None, candidates_only: bool = False, limit: int = 20):
+    """חיפוש טקסט חופשי בפוסטים השמורים"""
+    db = get_db()
+    filters = {}
+    if group:
+        filters['group_name'] = group
+    if candidates_only:
+        filters['is_candidate'] = True
+
+    results = db.search_posts(query, filters, limit)
+    print(f"\n🔍 {len(results)} תוצאות עבור: {query}\n")
+    for post in results:
+        mark = "👤" if post['is_candidate'] else "  "
+        print(f"{mark} [{post['scanned_at'][:16]}] {post['group_name']} | {post['author_name'] or '-'} "
+              f"| ציון {post['candidate_score'] or 0:.0f}")
+        print(f"   {post['snippet']}")
+        if post['post_url']:
+            print(f"   {post['post_url']}")
+    print()
+
+
 def setup_environment():
     """וידוא שהסביבה מוגדרת נכון"""
     # בדיקת משתני סביבה
@@ -245,12 +307,121 @@ def main():
         help='הצג סטטיסטיקות (ברירת מחדל: 7 ימים)'
     )
     
+    parser.add_argument(
+        '--by-group',
+        action='store_true',
+        help='עם --stats: פירוט לפי קבוצה'
+    )
+
+    parser.add_argument(
+        '--from',
+        dest='since',
+        metavar='YYYY-MM-DD',
+        help='עם --stats: תאריך התחלה'
+    )
+
+    parser.add_argument(
+        '--to',
+        dest='until',
+        metavar='YYYY-MM-DD',
+        help='עם --stats: תאריך סיום (כולל, ברירת מחדל היום)'
+    )
+
     parser.add_argument(
         '--debug',
         action='store_true',
         help='מצב דיבוג'
     )
 
+    parser.add_argument(
+        '--rescore',
+        action='store_true',
+        help='ציון מחדש של כל הפוסטים השמורים (אחרי שינוי מילות מפתח)'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        metavar='N',
+        help='מספר תהליכים ל-rescore (ברירת מחדל: מספר הליבות)'
+    )
+
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=2000,
+        metavar='N',
+        help='מספר פוסטים ב-chunk ל-rescore (ברירת מחדל: 2000)'
+    )
+
+    parser.add_argument(
+        '--restart',
+        action='store_true',
+        help='rescore מההתחלה, בלי להמשיך מ-checkpoint'
+    )
+
+    parser.add_argument(
+        '--retention',
+        action='store_true',
+        help='ארכוב ומחיקת נתונים ישנים לפי RETENTION_POLICIES והחזרת מקום בדיסק'
+    )
+
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='עם --retention: רק הצגת כמה שורות היו נמחקות'
+    )
+
+    parser.add_argument(
+        '--migrate-post-text',
+        action='store_true',
+        help='העברה חד-פעמית של טקסט הפוסטים לטבלה דחוסה והצגת החיסכון בגודל המסד'
+    )
+
+    parser.add_argument(
+        '--search',
+        metavar='QUERY',
+        help='חיפוש טקסט חופשי בפוסטים השמורים'
+    )
+
+    parser.add_argument(
+        '--group',
+        metavar='NAME',
+        help='עם --search: רק פוסטים מקבוצה זו'
+    )
+
+    parser.add_argument(
+        '--candidates-only',
+        action='store_true',
+        help='עם --search: רק פוסטים שסומנו כמועמדים'
+    )
+
+    parser.add_argument(
+        '--limit',
+        type=int,
+        default=20,
+        metavar='N',
+        help='עם --search: מספר תוצאות מקסימלי (ברירת מחדל: 20)'
+    )
+
+    parser.add_argument(
+        '--rebuild-fts',
+        action='store_true',
+        help='בנייה מחדש של אינדקס החיפוש (למשל אחרי עריכה ידנית של המסד)'
+    )
+
+    parser.add_argument(
+        '--export',
+        action='store_true',
+        help='ייצוא פוסטים, תגובות וסיכומים שעתיים ל-data/exports (רק מה שנוסף מאז הייצוא הקודם)'
+    )
+
+    parser.add_argument(
+        '--full',
+        action='store_true',
+        help='עם --export: ייצוא מלא מחדש, בלי watermark'
+    )
+
     parser.add_argument(
         '--reset-session',
         action='store_true',
@@ -260,8 +431,43 @@ def main():
     args = parser.parse_args()
 
     # הצגת סטטיסטיקות
-    if args.stats is not None:
-        show_statistics(args.stats)
+    if args.stats is not None or args.since or args.until or args.by_group:
+        show_statistics(args.stats or 7, args.since, args.until, args.by_group)
+        return
+
+    # ציון מחדש של פוסטים היסטוריים
+    if args.rescore:
+        from postRescorer import rescore_posts
+        rescore_posts(args.workers, args.chunk_size, args.restart)
+        return
+
+    # ארכוב ומחיקת נתונים ישנים
+    if args.retention:
+        from retention import run_retention
+        run_retention(args.dry_run)
+        return
+
+    # העברת טקסט הפוסטים לאחסון דחוס
+    if args.migrate_post_text:
+        migrate_post_text()
+        return
+
+    # חיפוש בפוסטים השמורים
+    if args.search:
+        search_posts(args.search, args.group, args.candidates_only, args.limit)
+        return
+
+    # בניית אינדקס החיפוש מחדש
+    if args.rebuild_fts:
+        print("🔍 בונה מחדש את אינדקס החיפוש...")
+        indexed = get_db().rebuild_search_index()
+        print(f"✅ {indexed:,} פוסטים באינדקס")
+        return
+
+    # ייצוא לניתוח
+    if args.export:
+        from dataExporter import run_export
+        run_export(full=args.full)
         return
 
     # איפוס סשן דפדפן
@@ -0,0 +1,235 @@
+"""
+בנצ'מרק למנוע ההתאמה - מהירות ודיוק מול קורפוס מתויג
+מודד פוסטים/שנייה, latency (p50/p99) לכל analyze_post ו-precision/recall,
+ומשווה לקובץ baseline כדי ששינוי שפוגע במהירות או בדיוק יכשיל את ההרצה.
+המהירות מושווית רק מול baseline שנמדד עם אותו מנוע סריקה (keywordEngine.ENGINE).
+
+Usage:
+    python matcherBenchmark.py                     # הרצה והשוואה ל-baseline (אם קיים)
+    python matcherBenchmark.py --update-baseline   # שמירת התוצאות כ-baseline חדש
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from candidatMatcher import CandidateMatcher
+from keywordEngine import ENGINE
+
+
+BENCHMARK_DIR = Path(__file__).parent / "benchmarks"
+CORPUS_PATH = BENCHMARK_DIR / "matcher_corpus.jsonl"
+BASELINE_PATH = BENCHMARK_DIR / "matcher_baseline.json"
+
+# פוסט ארוך (תיאור ניסיון מפורט, מודעת דרושים מלאה) - נמדד גם בנפרד,
+# כי זמן הסריקה שלו תלוי באורך הטקסט ולא בתקורה הקבועה של analyze_post
+LONG_POST_CHARS = 800
+
+# תוויות שנחשבות מועמד (כל השאר - מודעות דרושים ורעש - אמורות להיפסל)
+CANDIDATE_LABELS = {"seeker"}
+
+# ספי רגרסיה ביחס ל-baseline
+DEFAULT_THRESHOLDS = {
+    "max_throughput_drop": 0.20,   # ירידה של עד 20% בפוסטים/שנייה
+    "max_p99_increase": 0.50,      # עלייה של עד 50% ב-p99 (רועש יותר מהממוצע)
+    "max_precision_drop": 0.0,     # הקורפוס דטרמיניסטי - כל ירידה בדיוק היא רגרסיה
+    "max_recall_drop": 0.0,
+}
+
+
+def load_corpus(path: Path = CORPUS_PATH) -> List[Dict]:
+    """טעינת הקורפוס המתויג (שורת JSON לכל פוסט: id, label, lang, author, text)"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """אחוזון מרשימה ממוינת (nearest-rank)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(percent / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def measure_accuracy(matcher: CandidateMatcher, corpus: List[Dict]) -> Dict:
+    """precision/recall של is_candidate מול התוויות"""
+    true_positive = false_positive = false_negative = true_negative = 0
+    mistakes = []
+
+    for post in corpus:
+        expected = post['label'] in CANDIDATE_LABELS
+        predicted = matcher.analyze_post(post['text'], post.get('author', ''))['is_candidate']
+
+        if predicted and expected:
+            true_positive += 1
+        elif predicted:
+            false_positive += 1
+            mistakes.append({"id": post['id'], "label": post['label'], "error": "false_positive"})
+        elif expected:
+            false_negative += 1
+            mistakes.append({"id": post['id'], "label": post['label'], "error": "false_negative"})
+        else:
+            true_negative += 1
+
+    precision = true_positive / (true_positive + false_positive) if true_positive + false_positive else 0.0
+    recall = true_positive / (true_positive + false_negative) if true_positive + false_negative else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    return {
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(f1, 4),
+        "true_positive": true_positive,
+        "false_positive": false_positive,
+        "false_negative": false_negative,
+        "true_negative": true_negative,
+        "mistakes": mistakes,
+    }
+
+
+def measure_speed(matcher: CandidateMatcher, corpus: List[Dict], rounds: int = 20, warmup: int = 2) -> Dict:
+    """
+    זמן ריצה של analyze_post על כל הקורפוס, rounds פעמים
+
+    המנוע נבנה בלי מטמון ניתוחים - אחרת כל סבב אחרי הראשון היה נמדד כפגיעת מטמון.
+    """
+    for _ in range(warmup):
+        for post in corpus:
+            matcher.analyze_post(post['text'], post.get('author', ''))
+
+    latencies = []
+    started_at = time.perf_counter()
+    for _ in range(rounds):
+        for post in corpus:
+            post_started = time.perf_counter()
+            matcher.analyze_post(post['text'], post.get('author', ''))
+            latencies.append(time.perf_counter() - post_started)
+    elapsed = time.perf_counter() - started_at
+
+    latencies.sort()
+    return {
+        "posts": len(latencies),
+        "elapsed_seconds": round(elapsed, 4),
+        "posts_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 4),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 4),
+    }
+
+
+def run_benchmark(corpus: List[Dict], rounds: int = 20) -> Dict:
+    """הרצת הבנצ'מרק המלא"""
+    matcher = CandidateMatcher()
+    long_posts = [post for post in corpus if len(post['text']) >= LONG_POST_CHARS]
+    return {
+        "corpus_size": len(corpus),
+        "rules_fingerprint": matcher.rules_fingerprint,
+        "engine": ENGINE,
+        "speed": measure_speed(matcher, corpus, rounds),
+        "speed_long": measure_speed(matcher, long_posts, rounds) if long_posts else None,
+        "accuracy": measure_accuracy(matcher, corpus),
+    }
+
+
+def same_engine(results: Dict, baseline: Dict) -> bool:
+    """האם ה-baseline נמדד עם אותו מנוע סריקה (רק אז משווים מהירות)"""
+    return results.get('engine') == baseline.get('engine')
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, thresholds: Dict = None) -> List[str]:
+    """
+    השוואה ל-baseline
+
+    Returns:
+        list: תיאור לכל רגרסיה שחרגה מהסף (ריק = עבר)
+    """
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    accuracy, base_accuracy = results['accuracy'], baseline['accuracy']
+    regressions = []
+
+    for section, label in (("speed", ""), ("speed_long", "long posts ")):
+        speed, base_speed = results.get(section), baseline.get(section)
+        if not speed or not base_speed or not same_engine(results, baseline):
+            continue
+
+        min_throughput = base_speed['posts_per_second'] * (1 - thresholds['max_throughput_drop'])
+        if speed['posts_per_second'] < min_throughput:
+            regressions.append(
+                f"{label}throughput {speed['posts_per_second']:,.0f} < {min_throughput:,.0f} posts/sec "
+                f"(baseline {base_speed['posts_per_second']:,.0f})"
+            )
+
+        max_p99 = base_speed['p99_ms'] * (1 + thresholds['max_p99_increase'])
+        if speed['p99_ms'] > max_p99:
+            regressions.append(
+                f"{label}p99 {speed['p99_ms']:.3f}ms > {max_p99:.3f}ms (baseline {base_speed['p99_ms']:.3f}ms)"
+            )
+
+    for metric in ("precision", "recall"):
+        floor = base_accuracy[metric] - thresholds[f"max_{metric}_drop"]
+        if accuracy[metric] < floor - 1e-9:
+            regressions.append(f"{metric} {accuracy[metric]:.4f} < {floor:.4f} (baseline {base_accuracy[metric]:.4f})")
+
+    return regressions
+
+
+def print_report(results: Dict):
+    """הדפסת תוצאות"""
+    speed = results['speed']
+    accuracy = results['accuracy']
+
+    print(f"📚 קורפוס: {results['corpus_size']} פוסטים (כללים {results['rules_fingerprint']}, "
+          f"מנוע {results['engine']})")
+    print(f"⚡ מהירות: {speed['posts_per_second']:,.0f} פוסטים/שנייה | "
+          f"p50 {speed['p50_ms']:.3f}ms | p99 {speed['p99_ms']:.3f}ms")
+    long_speed = results.get('speed_long')
+    if long_speed:
+        print(f"📜 פוסטים ארוכים (≥{LONG_POST_CHARS} תווים): {long_speed['posts_per_second']:,.0f} פוסטים/שנייה | "
+              f"p50 {long_speed['p50_ms']:.3f}ms | p99 {long_speed['p99_ms']:.3f}ms")
+    print(f"🎯 דיוק: precision {accuracy['precision']:.3f} | recall {accuracy['recall']:.3f} | "
+          f"f1 {accuracy['f1']:.3f} (TP {accuracy['true_positive']}, FP {accuracy['false_positive']}, "
+          f"FN {accuracy['false_negative']}, TN {accuracy['true_negative']})")
+
+    for mistake in accuracy['mistakes']:
+        print(f"   ⚠️ #{mistake['id']} ({mistake['label']}): {mistake['error']}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="בנצ'מרק מהירות ודיוק למנוע ההתאמה")
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH, help="קובץ הקורפוס המתויג")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="קובץ baseline")
+    parser.add_argument("--rounds", type=int, default=20, help="מספר מעברים על הקורפוס למדידת מהירות")
+    parser.add_argument("--update-baseline", action="store_true", help="שמירת התוצאות כ-baseline")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(load_corpus(args.corpus), args.rounds)
+    print_report(results)
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(results, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"\n💾 baseline נשמר: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print("\nℹ️ אין baseline להשוואה (הריצו עם --update-baseline)")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if not same_engine(results, baseline):
+        print(f"\nℹ️ ה-baseline נמדד עם מנוע {baseline.get('engine', 'לא ידוע')} - "
+              f"משווים רק דיוק (למהירות: --update-baseline עם {results['engine']})")
+    regressions = compare_to_baseline(results, baseline)
+    if regressions:
+        print("\n❌ רגרסיה ביחס ל-baseline:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        return 1
+
+    print("\n✅ אין רגרסיה ביחס ל-baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+ציון מחדש של פוסטים היסטוריים (scanned_posts) במקביל על כל ליבות המעבד
+משמש אחרי כל שינוי ב-CANDIDATE_KEYWORDS - כולל התקדמות, checkpoint וקצב עיבוד
+"""
+
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from database import get_db
+from candidatMatcher import get_matcher
+
+
+# מפתח ה-checkpoint בטבלת bot_state (ה-id האחרון שעודכן)
+CHECKPOINT_KEY = "rescore_last_id"
+
+# מנוע התאמה לכל תהליך worker (נבנה פעם אחת ב-initializer)
+_worker_matcher = None
+
+
+def _init_worker():
+    """אתחול תהליך worker - קומפילציית הכללים פעם אחת לתהליך"""
+    global _worker_matcher
+    # מטמון בזיכרון בלבד - ה-workers לא כותבים למסד הנתונים
+    _worker_matcher = get_matcher(persistent_cache=False)
+
+
+def _score_chunk(rows: List[Tuple[int, str]]) -> List[Tuple[int, bool, float, List[str]]]:
+    """ציון chunk של פוסטים בתוך תהליך worker"""
+    analyses = _worker_matcher.analyze_posts((post_text or "",) for _, post_text in rows)
+    return [
+        (post_id, analysis['is_candidate'], analysis['candidate_score'], analysis['matched_keywords'])
+        for (post_id, _), analysis in zip(rows, analyses)
+    ]
+
+
+def _print_progress(done: int, total: int, started_at: float):
+    """הדפסת שורת התקדמות אחת (נדרסת בכל עדכון)"""
+    elapsed = max(time.perf_counter() - started_at, 1e-9)
+    rate = done / elapsed
+    percent = (done / total * 100) if total else 100.0
+    remaining = (total - done) / rate if rate else 0
+    sys.stdout.write(
+        f"\r   ⏳ {done:,}/{total:,} ({percent:5.1f}%) | {rate:,.0f} פוסטים/שנייה | נותרו ~{remaining:,.0f} שניות"
+    )
+    sys.stdout.flush()
+
+
+def rescore_posts(workers: int = None, chunk_size: int = 2000, restart: bool = False) -> dict:
+    """
+    ציון מחדש של כל הפוסטים השמורים
+
+    הקריאה מהמסד נעשית ב-chunks לפי id, הציון רץ ב-process pool,
+    וכל chunk נכתב בחזרה בטרנזקציה אחת יחד עם ה-checkpoint - כך שאפשר
+    לעצור (Ctrl+C) ולהמשיך מאותה נקודה בהרצה הבאה.
+
+    Args:
+        workers: מספר תהליכים (ברירת מחדל: מספר הליבות)
+        chunk_size: מספר פוסטים ב-chunk
+        restart: התעלמות מ-checkpoint קיים והתחלה מההתחלה
+
+    Returns:
+        dict: מספר פוסטים שעודכנו, זמן וקצב
+    """
+    db = get_db()
+    workers = workers or os.cpu_count() or 1
+
+    if restart:
+        db.set_state(CHECKPOINT_KEY, None)
+    last_id = int(db.get_state(CHECKPOINT_KEY, 0))
+
+    total = db.count_posts_after(last_id)
+    if last_id:
+        print(f"↩️ ממשיך מ-checkpoint (id > {last_id})")
+    print(f"🔁 ציון מחדש של {total:,} פוסטים ב-{workers} תהליכים (chunk={chunk_size})")
+
+    done = 0
+    started_at = time.perf_counter()
+    max_pending = workers * 2
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = deque()
+        exhausted = False
+
+        while pending or not exhausted:
+            # מילוי התור עד max_pending chunks (זיכרון חסום)
+            while not exhausted and len(pending) < max_pending:
+                rows = db.fetch_posts_for_rescore(last_id, chunk_size)
+                if not rows:
+                    exhausted = True
+                    break
+                last_id = rows[-1][0]
+                pending.append(pool.submit(_score_chunk, rows))
+
+            if not pending:
+                break
+
+            # כתיבה לפי הסדר - ה-checkpoint תמיד מצביע על רצף שהושלם
+            scores = pending.popleft().result()
+            db.update_post_scores(scores, checkpoint_key=CHECKPOINT_KEY)
+            done += len(scores)
+            _print_progress(done, total, started_at)
+
+    elapsed = time.perf_counter() - started_at
+    rate = done / elapsed if elapsed else 0.0
+
+    # הרצה שהושלמה - ההרצה הבאה תתחיל מההתחלה
+    db.set_state(CHECKPOINT_KEY, None)
+
+    print(f"\n✅ עודכנו {done:,} פוסטים ב-{elapsed:.1f} שניות ({rate:,.0f} פוסטים/שנייה)")
+    return {"posts_rescored": done, "elapsed_seconds": elapsed, "posts_per_second": rate}
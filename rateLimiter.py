@@ -0,0 +1,147 @@
+"""
+מגבלת קצב תגובות - max_responses_per_hour ו-max_responses_per_day
+חלון שעה מתגלגל וחלון יומי בזיכרון, שנטענים מטבלת responses פעם אחת בהפעלה
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import config
+from database import DatabaseManager, get_db
+
+
+HOUR_SECONDS = 3600
+
+# תגובות שנספרות במגבלה - כולל שמירות מקום שלא אושרו (קריסה באמצע שליחה)
+COUNTED_STATUSES = ("sent", "pending")
+
+
+class ResponseLimiter:
+    """
+    מגבלת תגובות לשעה (חלון מתגלגל) וליום (לפי תאריך)
+
+    - חלון השעה: deque של זמני שליחה; זמנים שיצאו מהחלון נזרקים מהתחילה,
+      כך שכל בדיקה היא O(1) בממוצע.
+    - החלון היומי: מונה שמתאפס כשהתאריך מתחלף.
+
+    המסד הוא מקור האמת: כל תגובה נשמרת קודם כשורת 'pending'
+    (DatabaseManager.reserve_response) ורק אז נספרת כאן, ולכן טעינה מחדש
+    אחרי קריסה סופרת גם תגובה שנשלחה ולא אושרה.
+
+    Example:
+        limiter = get_limiter()
+        if limiter.may_proceed():
+            reservation_id, epoch = db.reserve_response(post_id)
+            limiter.record(epoch)
+    """
+
+    def __init__(self, db: DatabaseManager, max_per_hour: int = None, max_per_day: int = None):
+        self.max_per_hour = max_per_hour or config.AUTOMATION_SETTINGS['max_responses_per_hour']
+        self.max_per_day = max_per_day or config.AUTOMATION_SETTINGS['max_responses_per_day']
+        self._lock = threading.Lock()
+        self._hour: deque = deque()
+        self._day: Optional[str] = None
+        self._day_count = 0
+        self.seed(db)
+
+    def seed(self, db: DatabaseManager):
+        """טעינת החלונות מטבלת responses (שתי שאילתות טווח על אינדקס)"""
+        now = time.time()
+        today = datetime.now().date().isoformat()
+        epochs = db.get_response_epochs_since(int(now) - HOUR_SECONDS, COUNTED_STATUSES)
+        day_count = db.get_daily_response_count(today, COUNTED_STATUSES)
+        with self._lock:
+            self._hour = deque(epochs)
+            self._day = today
+            self._day_count = day_count
+
+    def _advance(self, now: float):
+        """הוצאת שליחות שיצאו מחלון השעה ואיפוס המונה היומי במעבר תאריך"""
+        cutoff = now - HOUR_SECONDS
+        hour = self._hour
+        while hour and hour[0] <= cutoff:
+            hour.popleft()
+
+        today = datetime.fromtimestamp(now).date().isoformat()
+        if today != self._day:
+            self._day = today
+            self._day_count = 0
+
+    def check(self, now: float = None) -> Optional[str]:
+        """
+        האם מותר לשלוח תגובה עכשיו
+
+        Returns:
+            None אם מותר, אחרת הסיבה
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._advance(now)
+            if self._day_count >= self.max_per_day:
+                return f"הגענו למגבלה היומית ({self.max_per_day} תגובות)"
+            if len(self._hour) >= self.max_per_hour:
+                wait_minutes = int((self._hour[0] + HOUR_SECONDS - now) // 60) + 1
+                return f"הגענו למגבלה השעתית ({self.max_per_hour} תגובות) - מתפנה מקום בעוד ~{wait_minutes} דקות"
+            return None
+
+    def may_proceed(self, now: float = None) -> bool:
+        """True אם אפשר לשלוח תגובה נוספת"""
+        return self.check(now) is None
+
+    def record(self, epoch: float = None):
+        """רישום תגובה (אחרי שמירת המקום במסד)"""
+        epoch = time.time() if epoch is None else epoch
+        with self._lock:
+            self._advance(epoch)
+            self._hour.append(epoch)
+            self._day_count += 1
+
+    def forget(self, epoch: float):
+        """ביטול רישום של תגובה שלא נשלחה (אחרי release_response)"""
+        with self._lock:
+            if self._hour and self._hour[-1] == epoch:
+                self._hour.pop()
+            elif epoch in self._hour:
+                self._hour.remove(epoch)
+            if datetime.fromtimestamp(epoch).date().isoformat() == self._day:
+                self._day_count = max(0, self._day_count - 1)
+
+    def status(self, now: float = None) -> Dict:
+        """מספר התגובות בחלונות הנוכחיים"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._advance(now)
+            return {
+                "hour": len(self._hour),
+                "max_per_hour": self.max_per_hour,
+                "day": self._day_count,
+                "max_per_day": self.max_per_day,
+            }
+
+
+# מופע משותף לכל קובץ מסד (scheduler והסורק באותו תהליך)
+_limiters: Dict[str, ResponseLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(db: DatabaseManager = None) -> ResponseLimiter:
+    """קבלת instance משותף של מגבלת התגובות (נטען מהמסד בקריאה הראשונה)"""
+    db = db or get_db()
+    key = str(Path(db.db_path).resolve())
+
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = ResponseLimiter(db)
+        return _limiters[key]
+
+
+if __name__ == "__main__":
+    limiter = get_limiter()
+    status = limiter.status()
+    print(f"⏱️ תגובות בשעה האחרונה: {status['hour']}/{status['max_per_hour']}")
+    print(f"📅 תגובות היום: {status['day']}/{status['max_per_day']}")
+    print(f"{'✅ מותר להגיב' if limiter.may_proceed() else '⏸️ ' + limiter.check()}")
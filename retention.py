@@ -0,0 +1,112 @@
+"""
+מדיניות שמירת נתונים (retention) לכל הטבלאות
+שורות ישנות נשמרות לארכיון JSONL דחוס לפי תאריך, נמחקות במנות קטנות,
+והמקום בדיסק מוחזר בהדרגה עם incremental_vacuum
+"""
+
+import gzip
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+import config
+from database import DatabaseManager, get_db
+
+
+def _archive_rows(archive_dir: Path, table: str, time_column: str, columns: List[str], rows: List[tuple]) -> int:
+    """
+    הוספת שורות לקובצי ארכיון לפי יום: <archive_dir>/<table>/<YYYY-MM-DD>.jsonl.gz
+
+    כל מנה נכתבת כ-gzip member נוסף באותו קובץ (gzip/zcat קוראים את הכל ברצף).
+    """
+    by_day: Dict[str, List[dict]] = {}
+    time_index = columns.index(time_column)
+    for row in rows:
+        day = str(row[time_index] or "unknown")[:10]
+        by_day.setdefault(day, []).append(dict(zip(columns, row)))
+
+    table_dir = archive_dir / table
+    table_dir.mkdir(parents=True, exist_ok=True)
+    for day, records in by_day.items():
+        with gzip.open(table_dir / f"{day}.jsonl.gz", "at", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    return len(rows)
+
+
+def apply_policy(db: DatabaseManager, table: str, policy: Dict, settings: Dict, dry_run: bool = False) -> Dict:
+    """
+    החלת מדיניות על טבלה אחת
+
+    כל מנה (batch_size שורות) נקראת, נכתבת לארכיון ונמחקת בטרנזקציה קצרה משלה,
+    כך שהסורק לא ממתין לנעילת כתיבה ארוכה. הארכיון נכתב לפני המחיקה -
+    קריסה באמצע יכולה לכל היותר לשכפל מנה בארכיון, לא לאבד אותה.
+    """
+    time_column = policy['time_column']
+    key = policy.get('key', 'rowid')
+    source = policy.get('source', table)
+    cutoff = (datetime.now().date() - timedelta(days=policy['days'])).isoformat()
+    batch_size = settings['batch_size']
+
+    if dry_run:
+        count = db.count_rows_before(table, time_column, cutoff)
+        return {"table": table, "cutoff": cutoff, "deleted": 0, "archived": 0, "would_delete": count}
+
+    deleted = archived = 0
+    while True:
+        with db.transaction():
+            columns, keys, rows = db.fetch_rows_before(source, key, time_column, cutoff, batch_size)
+            if not rows:
+                break
+
+            if policy.get('archive'):
+                archived += _archive_rows(Path(settings['archive_dir']), table, time_column, columns, rows)
+
+            # פוסטים שנמחקים משאירים מצבה כדי שלא ייסרקו ויקבלו תגובה שוב
+            deleted += db.delete_rows(table, key, keys, tombstones=policy.get('tombstones', False))
+
+        if len(keys) < batch_size:
+            break
+
+    return {"table": table, "cutoff": cutoff, "deleted": deleted, "archived": archived}
+
+
+def run_retention(dry_run: bool = False, db: DatabaseManager = None) -> List[Dict]:
+    """
+    הרצת כל מדיניות ה-retention מ-config.RETENTION_POLICIES
+
+    Args:
+        dry_run: רק ספירה של מה שהיה נמחק
+    """
+    db = db or get_db()
+    settings = config.RETENTION_SETTINGS
+    results = []
+
+    if not dry_run:
+        db.enable_incremental_vacuum()
+
+    for table, policy in config.RETENTION_POLICIES.items():
+        result = apply_policy(db, table, policy, settings, dry_run)
+        results.append(result)
+        if dry_run:
+            print(f"   {table}: {result['would_delete']:,} שורות לפני {result['cutoff']}")
+        else:
+            archived = f", {result['archived']:,} לארכיון" if policy.get('archive') else ""
+            print(f"   {table}: נמחקו {result['deleted']:,} שורות לפני {result['cutoff']}{archived}")
+
+    if not dry_run:
+        pruned = db.prune_post_contents()
+        if pruned:
+            print(f"   post_contents: נמחקו {pruned:,} גופי פוסטים בלי הפניה")
+        if db.prune_search_index():
+            print("   posts_fts: האינדקס נבנה מחדש בלי הפוסטים שנמחקו")
+        freed = db.incremental_vacuum(settings['vacuum_pages_per_step'])
+        print(f"✅ retention הושלם - הוחזרו {freed / 1024 / 1024:,.1f}MB לדיסק")
+
+    return results
+
+
+if __name__ == "__main__":
+    run_retention(dry_run=True)
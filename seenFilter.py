@@ -0,0 +1,111 @@
+"""
+מסנן בזיכרון לפוסטים שכבר עובדו (Bloom filter)
+תשובה "לא" היא ודאית ולא צריכה את המסד; תשובה "אולי" נבדקת מול SQLite
+"""
+
+import hashlib
+import math
+from typing import Dict, Iterable
+
+
+def post_id_hash(post_id: str) -> int:
+    """
+    hash יציב של 64 ביט ל-post_id (signed, מתאים ל-INTEGER של SQLite)
+
+    משמש גם כמפתח בטבלת post_tombstones וגם כבסיס למיקומים במסנן,
+    כך שאפשר לטעון למסנן tombstones בלי המזהה המקורי.
+    """
+    digest = hashlib.blake2b(post_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class SeenFilter:
+    """
+    Bloom filter ל-post_ids
+
+    bytearray של m ביטים ו-k פונקציות hash (double hashing מעל post_id_hash).
+    אין מחיקה - פוסט שנמחק מהמסד נשאר "אולי" ונפסל בבדיקה המדויקת.
+
+    Example:
+        seen = SeenFilter(expected_items=100000, false_positive_rate=0.01)
+        seen.add("post_123")
+        seen.might_contain("post_123")  # True
+        seen.might_contain("post_999")  # False (כמעט תמיד)
+    """
+
+    def __init__(self, expected_items: int = 100000, false_positive_rate: float = 0.01):
+        expected_items = max(1, expected_items)
+        self.capacity = expected_items
+        self.false_positive_rate = false_positive_rate
+
+        # m = -n*ln(p) / ln(2)^2,  k = m/n * ln(2)
+        self.num_bits = max(8, int(math.ceil(-expected_items * math.log(false_positive_rate) / math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / expected_items * math.log(2))))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.items = 0
+
+        # מדדים
+        self.lookups = 0
+        self.possible_positives = 0
+        self.false_positives = 0
+
+    def _positions(self, value: int):
+        # שני חצאי ה-hash כ-h1, h2 (Kirsch-Mitzenmacher)
+        value &= 0xFFFFFFFFFFFFFFFF
+        h1 = value & 0xFFFFFFFF
+        h2 = (value >> 32) | 1
+        num_bits = self.num_bits
+        return [(h1 + i * h2) % num_bits for i in range(self.num_hashes)]
+
+    def add(self, key: str):
+        """הוספת מזהה"""
+        self.add_hash(post_id_hash(key))
+
+    def add_hash(self, value: int):
+        """הוספת מזהה לפי ה-hash שלו (למשל מטבלת tombstones)"""
+        bits = self._bits
+        for position in self._positions(value):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.items += 1
+
+    def add_many(self, keys: Iterable[str]):
+        """הוספת רשימת מזהים"""
+        for key in keys:
+            self.add(key)
+
+    def might_contain(self, key: str) -> bool:
+        """False = בוודאות לא נראה; True = אולי (צריך בדיקה מדויקת)"""
+        self.lookups += 1
+        bits = self._bits
+        for position in self._positions(post_id_hash(key)):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        self.possible_positives += 1
+        return True
+
+    def record_false_positive(self, count: int = 1):
+        """עדכון מונה ה-false positives אחרי בדיקה מדויקת"""
+        self.false_positives += count
+
+    @property
+    def is_saturated(self) -> bool:
+        """האם עברנו את הקיבולת שלפיה חושב גודל המסנן"""
+        return self.items > self.capacity
+
+    def estimated_false_positive_rate(self) -> float:
+        """הסתברות false positive צפויה לפי מספר הפריטים: (1 - e^(-kn/m))^k"""
+        return (1 - math.exp(-self.num_hashes * self.items / self.num_bits)) ** self.num_hashes
+
+    def stats(self) -> Dict:
+        """גודל בזיכרון ושיעור false positives (צפוי ונמדד)"""
+        negatives = self.lookups - self.possible_positives + self.false_positives
+        return {
+            "items": self.items,
+            "capacity": self.capacity,
+            "memory_bytes": len(self._bits),
+            "num_hashes": self.num_hashes,
+            "estimated_fp_rate": round(self.estimated_false_positive_rate() * 100, 4),
+            "observed_fp_rate": round(self.false_positives / negatives * 100, 4) if negatives else 0.0,
+            "lookups": self.lookups,
+            "false_positives": self.false_positives,
+        }
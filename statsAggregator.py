@@ -0,0 +1,107 @@
+"""
+צבירת שגיאות בזיכרון וכתיבה מרוכזת (write-behind)
+רשומות error_log נכתבות בטרנזקציה אחת לפי זמן, כמות או סיום סשן
+(מוני הפוסטים, המועמדים והתגובות נספרים ב-hourly_rollups מהשורות עצמן)
+"""
+
+import atexit
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Tuple
+
+import config
+from database import DatabaseManager
+
+
+class StatsAggregator:
+    """
+    מצבר שגיאות
+
+    - record_error(): שגיאות זהות (סוג, הודעה, הקשר) מקובצות לרשומה אחת עם מונה
+    - flush(): כותב הכל בטרנזקציה אחת; נקרא אוטומטית ביציאה תקינה מהתהליך
+
+    Example:
+        stats = StatsAggregator(db)
+        stats.record_error("scan_error", "timeout", "group A")
+        if stats.should_flush():
+            stats.flush()
+    """
+
+    def __init__(self, db: DatabaseManager, settings: Dict = None):
+        self.db = db
+        self.settings = {**config.STATS_AGGREGATOR_SETTINGS, **(settings or {})}
+        self._lock = threading.Lock()
+        self._errors: Dict[Tuple[str, str, str], list] = {}
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+        self.flushes = 0
+        self.records = 0
+
+        atexit.register(self.flush)
+
+    def record_error(self, error_type: str, error_message: str, context: str = ""):
+        """רישום שגיאה - הופעה חוזרת רק מעלה את המונה"""
+        now = datetime.now().isoformat()
+        key = (error_type, error_message, context)
+        with self._lock:
+            entry = self._errors.get(key)
+            if entry is None or entry[1][:10] != now[:10]:
+                if entry is not None:
+                    # שגיאה שנמשכת אחרי חצות - הרשומה של אתמול נשמרת בנפרד
+                    self._errors[key + (entry[1],)] = entry
+                self._errors[key] = [1, now, now]
+            else:
+                entry[0] += 1
+                entry[2] = now
+            self._pending += 1
+            self.records += 1
+
+    def should_flush(self) -> bool:
+        """האם עברנו את סף הכמות או הזמן"""
+        return bool(self._pending) and (
+            self._pending >= self.settings['max_pending']
+            or time.monotonic() - self._last_flush >= self.settings['flush_interval_seconds']
+        )
+
+    def flush(self, db: DatabaseManager = None) -> int:
+        """
+        כתיבת כל מה שנצבר בטרנזקציה אחת
+
+        Returns:
+            int: מספר הרישומים שנכתבו
+        """
+        with self._lock:
+            errors, self._errors = self._errors, {}
+            pending, self._pending = self._pending, 0
+            self._last_flush = time.monotonic()
+
+        if not pending:
+            return 0
+
+        db = db or self.db
+        with db.unit_of_work():
+            # אם הטרנזקציה מתבטלת - כאן או בטרנזקציה החיצונית שה-flush רץ בתוכה,
+            # גם אחרי שה-flush עצמו הסתיים - הנתונים חוזרים לתור וה-flush הבא ינסה שוב
+            db.on_rollback(lambda: self._restore(errors, pending))
+            db.log_errors([
+                (key[0], key[1], key[2], occurrences, first_seen, last_seen)
+                for key, (occurrences, first_seen, last_seen) in errors.items()
+            ])
+
+        self.flushes += 1
+        return pending
+
+    def _restore(self, errors: Dict, pending: int):
+        with self._lock:
+            for key, entry in errors.items():
+                if key in self._errors:
+                    key = key + (entry[1],)
+                self._errors[key] = entry
+            self._pending += pending
+
+    def close(self):
+        """flush אחרון והסרת ה-atexit"""
+        self.flush()
+        atexit.unregister(self.flush)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# המודולים יושבים בשורש הריפו (בלי package)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,48 @@
+"""
+השאילתות החמות משתמשות באינדקסים - אף אחת לא סורקת טבלה שלמה (SCAN),
+גם במסד ריק וגם אחרי ANALYZE על מסד עם נתונים
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import DatabaseManager
+
+
+@pytest.fixture(params=["empty", "analyzed"])
+def db(request, tmp_path):
+    manager = DatabaseManager(tmp_path / "job_bot.db", with_seen_filter=False)
+    if request.param == "analyzed":
+        manager.add_scanned_posts([
+            {"post_id": f"p{i}", "group_name": f"g{i % 3}", "post_text": f"מחפש עבודה {i}"}
+            for i in range(500)
+        ])
+        for i in range(50):
+            manager.add_response({"post_id": f"p{i}", "response_text": "היי"})
+            manager.log_error("scan_error", f"timeout {i % 5}", f"p{i}")
+        with manager.transaction() as conn:
+            # סיכומים של כמה חודשים - בטבלה של כמה שורות SCAN באמת זול יותר
+            start = datetime(2026, 1, 1)
+            conn.executemany(
+                "INSERT OR IGNORE INTO hourly_rollups (hour, group_name, posts) VALUES (?, ?, 1)",
+                [
+                    ((start + timedelta(hours=hour)).isoformat()[:13], f"g{group}")
+                    for hour in range(24 * 90) for group in range(3)
+                ],
+            )
+            conn.execute("ANALYZE")
+    yield manager
+    manager.close()
+
+
+def test_hot_queries_do_not_scan(db):
+    scans = {
+        name: plan for name, plan in db.explain_query_plans().items()
+        if any(detail.startswith("SCAN") for detail in plan)
+    }
+    assert scans == {}
+
+
+def test_hot_queries_use_an_index(db):
+    assert db.verify_query_plans() == []
@@ -0,0 +1,56 @@
+"""
+נרמול טקסט של פוסטים - מחושב פעם אחת לכל פוסט ומשמש את כל שלבי ההתאמה
+lower, כיווץ רווחים, הסרת ניקוד ותווי כיווניות, ואיחוד גרש/גרשיים ומרכאות
+"""
+
+import re
+
+# גרסת הנרמול - נכללת בטביעת האצבע של מטמון הניתוחים
+NORMALIZER_VERSION = 1
+
+# ניקוד וטעמים (U+0591-U+05C7), בלי סימני פיסוק עבריים (מקף, פסק, סוף פסוק, נון הפוכה)
+_HEBREW_MARKS = [
+    code for code in range(0x0591, 0x05C8)
+    if code not in (0x05BE, 0x05C0, 0x05C3, 0x05C6)
+]
+
+# תווים בלתי נראים: zero-width, soft hyphen ובקרת כיווניות (bidi)
+_INVISIBLE_CHARS = [
+    0x00AD, 0x061C, 0x180E,
+    0x200B, 0x200C, 0x200D, 0x200E, 0x200F,
+    0x202A, 0x202B, 0x202C, 0x202D, 0x202E,
+    0x2060, 0x2066, 0x2067, 0x2068, 0x2069,
+    0xFEFF,
+]
+
+# גרשיים ומרכאות -> ", גרש ואפוסטרופים -> '
+_DOUBLE_QUOTES = "״“”„‟″«»＂"
+_SINGLE_QUOTES = "׳‘’‚‛′´`＇"
+
+_REPLACEMENTS = {chr(code): "" for code in _HEBREW_MARKS + _INVISIBLE_CHARS}
+_REPLACEMENTS.update({char: '"' for char in _DOUBLE_QUOTES})
+_REPLACEMENTS.update({char: "'" for char in _SINGLE_QUOTES})
+
+# רוב הפוסטים לא מכילים אף תו מיוחד - regex אחד מאתר את אלה שכן
+_SPECIAL_CHARS = re.compile("[" + re.escape("".join(_REPLACEMENTS)) + "]")
+
+
+def _replace_special(match: "re.Match") -> str:
+    return _REPLACEMENTS[match.group()]
+
+
+def normalize_text(text: str) -> str:
+    """
+    נרמול טקסט להתאמה
+
+    Examples:
+        "קו״ח"            -> 'קו"ח'
+        "מְחַפֵּשׂ  עבודה\n"  -> "מחפש עבודה"
+        "Looking For A Job" -> "looking for a job"
+    """
+    if not text:
+        return ""
+
+    text = _SPECIAL_CHARS.sub(_replace_special, text)
+    # split() בלי פרמטרים מפצל לפי כל רווח Unicode ומדלג על רווחים בקצוות
+    return " ".join(text.lower().split())